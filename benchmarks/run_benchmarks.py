@@ -0,0 +1,256 @@
+##############################################
+# Benchmark suite of OctaDist PyPI functions #
+##############################################
+
+# Time file parsers, octahedron extraction, bond and face finding, and calc_* kernels
+# at several scales, append the results to a JSON Lines history file,
+# and compare them with the previous run to catch performance regressions.
+#
+# Usage:
+#     python run_benchmarks.py                     # default scales, append to history.jsonl
+#     python run_benchmarks.py --scales 1 10 100 1000
+#     python run_benchmarks.py --compare --threshold 1.2
+#     python run_benchmarks.py --only calc --no-save
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import octadist as oc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+TEMPLATE = os.path.join(HERE, "..", "example-input", "[Fe(1-bpp)2][BF4]2-HS-Full.xyz")
+HISTORY = os.path.join(HERE, "history.jsonl")
+SEED = 20190513
+
+
+#########################
+# Deterministic inputs  #
+#########################
+
+def make_complex(n_copy):
+    """Tile the template complex n_copy times on a cubic grid, 20 Angstroms apart."""
+    atom, coord = oc.coord.extract_file(TEMPLATE)
+    coord = np.asarray(coord)
+
+    side = int(np.ceil(n_copy ** (1 / 3)))
+    shifts = np.array([[i, j, k] for i in range(side) for j in range(side) for k in range(side)][:n_copy]) * 20.0
+
+    atom_full = atom * n_copy
+    coord_full = (coord[np.newaxis, :, :] + shifts[:, np.newaxis, :]).reshape(-1, 3)
+
+    return atom_full, coord_full
+
+
+def make_octahedra(n_octa):
+    """Randomly perturbed copies of the octahedron of template complex."""
+    _, c_octa = oc.generate.read_template(TEMPLATE)
+
+    return oc.generate.perturb_octa(c_octa, n_octa, stretch=0.05, angle=3.0, seed=SEED)
+
+
+##############
+# Benchmarks #
+##############
+
+def best_time(func, repeat):
+    """Best wall time of func() over repeat runs, in seconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    return min(times)
+
+
+def bench_parsers(scales, repeat, tmpdir):
+    results = {}
+    for fmt, (writer, ext) in oc.generate.WRITERS.items():
+        results[f"extract_file.{fmt}"] = {}
+        for n in scales:
+            atom, coord = make_complex(n)
+            path = os.path.join(tmpdir, f"bench_{fmt}_{n}{ext}")
+            writer(path, atom, coord)
+
+            a_full, _ = oc.coord.extract_file(path)
+            if len(a_full) != len(atom):
+                raise RuntimeError(f"{fmt} file was not parsed correctly")
+
+            results[f"extract_file.{fmt}"][n] = best_time(lambda: oc.coord.extract_file(path), repeat)
+
+    return results
+
+
+def bench_structure(scales, repeat):
+    results = {"extract_octa": {}, "find_bonds": {}}
+    for n in scales:
+        atom, coord = make_complex(n)
+        results["extract_octa"][n] = best_time(lambda: oc.coord.extract_octa(atom, coord), repeat)
+        results["find_bonds"][n] = best_time(lambda: oc.tools.find_bonds(atom, coord), repeat)
+
+    return results
+
+
+def bench_kernels(scales, repeat):
+    # Kernels taking one octahedron per call
+    scalar = {
+        "find_faces_octa": oc.tools.find_faces_octa,
+        "calc_d_bond": oc.calc.calc_d_bond,
+        "calc_d_mean": oc.calc.calc_d_mean,
+        "calc_zeta": oc.calc.calc_zeta,
+        "calc_delta": oc.calc.calc_delta,
+        "calc_bond_angle": oc.calc.calc_bond_angle,
+        "calc_sigma": oc.calc.calc_sigma,
+        "calc_theta": oc.calc.calc_theta,
+    }
+    # Kernels taking a stack of octahedra in one call
+    batched = {
+        "find_faces_octa_batch": oc.tools.find_faces_octa_batch,
+        "calc_param_octa": oc.tools.calc_param_octa,
+        "calc_face_area": oc.calc.calc_face_area,
+        "calc_surface_area": oc.calc.calc_surface_area,
+        "calc_volume": oc.calc.calc_volume,
+        "calc_cshm.OC-6": lambda c: oc.shape.calc_cshm(c, "OC-6"),
+        "calc_cshm.TPR-6": lambda c: oc.shape.calc_cshm(c, "TPR-6"),
+    }
+
+    results = {name: {} for name in list(scalar) + list(batched)}
+    devnull = open(os.devnull, "w")
+    for n in scales:
+        octa = make_octahedra(n)
+
+        for name, func in scalar.items():
+            def run():
+                for c in octa:
+                    func(c)
+
+            # calc_theta prints a warning for strongly distorted structures
+            stdout, sys.stdout = sys.stdout, devnull
+            try:
+                results[name][n] = best_time(run, repeat)
+            finally:
+                sys.stdout = stdout
+
+        for name, func in batched.items():
+            results[name][n] = best_time(lambda: func(octa), repeat)
+
+    devnull.close()
+
+    return results
+
+
+GROUPS = {
+    "parsers": lambda args, tmpdir: bench_parsers(args.scales, args.repeat, tmpdir),
+    "structure": lambda args, tmpdir: bench_structure(args.scales, args.repeat),
+    "calc": lambda args, tmpdir: bench_kernels(args.octa_scales, args.repeat),
+}
+
+
+###########
+# History #
+###########
+
+def git_revision():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE,
+                             capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def compare(previous, current, threshold):
+    """Print time ratios against previous record and return names of regressed benchmarks."""
+    regressions = []
+    print(f"\nComparison with {previous['version']} ({previous.get('git')}, {previous['date']})")
+    print(f"{'Benchmark':<32}{'Scale':>8}{'Before (s)':>14}{'Now (s)':>14}{'Ratio':>8}")
+    for name, per_scale in current["results"].items():
+        for n, now in per_scale.items():
+            before = previous["results"].get(name, {}).get(str(n))
+            if before is None:
+                continue
+            ratio = now / before if before > 0 else float("inf")
+            flag = "  <-- slower" if ratio > threshold else ""
+            print(f"{name:<32}{n:>8}{before:>14.6f}{now:>14.6f}{ratio:>8.2f}{flag}")
+            if ratio > threshold:
+                regressions.append(f"{name}[{n}]")
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark suite of OctaDist")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100],
+                        help="number of template complexes per file (parsers and structure benchmarks)")
+    parser.add_argument("--octa-scales", type=int, nargs="+", default=[10, 100, 1000],
+                        help="number of octahedra (calc benchmarks)")
+    parser.add_argument("--repeat", type=int, default=5, help="number of timed runs, the best is recorded")
+    parser.add_argument("--only", nargs="+", choices=list(GROUPS), help="run only these groups")
+    parser.add_argument("--history", default=HISTORY, help="JSON Lines file of benchmark history")
+    parser.add_argument("--no-save", action="store_true", help="do not append results to history")
+    parser.add_argument("--compare", action="store_true", help="compare with the last record in history")
+    parser.add_argument("--threshold", type=float, default=1.2,
+                        help="time ratio above which a benchmark counts as regression")
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for group in args.only or GROUPS:
+            print(f"Running {group} benchmarks ...")
+            results.update(GROUPS[group](args, tmpdir))
+
+    record = {
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "version": oc.__version__,
+        "git": git_revision(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "repeat": args.repeat,
+        "results": results,
+    }
+
+    print(f"\n{'Benchmark':<32}{'Scale':>8}{'Best time (s)':>16}")
+    for name, per_scale in results.items():
+        for n, t in per_scale.items():
+            print(f"{name:<32}{n:>8}{t:>16.6f}")
+
+    regressions = []
+    if args.compare:
+        history = load_history(args.history)
+        if history:
+            regressions = compare(history[-1], record, args.threshold)
+        else:
+            print("\nNo history to compare with.")
+
+    if not args.no_save:
+        with open(args.history, "a") as f:
+            f.write(json.dumps(record) + "\n")
+        print(f"\nResults appended to {args.history}")
+
+    if regressions:
+        print(f"\nRegressions: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -33,14 +33,29 @@ __website__ = "https://octadist.github.io"
 __github__ = "https://github.com/OctaDist/OctaDist"
 
 __all__ = \
-    ['calc',
+    ['cache',
+     'calc',
+     'cif',
      'coord',
      'draw',
      'elements',
+     'export',
+     'generate',
+     'gradient',
+     'graph',
      'linear',
+     'network',
+     'periodic',
      'plot',
+     'profiler',
      'projection',
+     'shape',
+     'stats',
+     'store',
+     'symmetry',
+     'timeseries',
      'tools',
+     'trajectory',
      'calc_d_bond',
      'calc_d_mean',
      'calc_zeta',
@@ -57,14 +72,29 @@ __all__ = \
 from .src import __src__
 
 # Bring sub-modules in src package to top-level directory
+from .src import cache
 from .src import calc
+from .src import cif
 from .src import coord
 from .src import draw
 from .src import elements
+from .src import export
+from .src import generate
+from .src import gradient
+from .src import graph
 from .src import linear
+from .src import network
+from .src import periodic
 from .src import plot
+from .src import profiler
 from .src import projection
+from .src import shape
+from .src import stats
+from .src import store
+from .src import symmetry
+from .src import timeseries
 from .src import tools
+from .src import trajectory
 
 # Bring method in sub-modules to top-level directory
 from .src.calc import calc_d_bond
@@ -76,9 +106,20 @@ from .src.calc import calc_sigma
 from .src.calc import calc_theta
 from .src.calc import calc_theta_min
 from .src.calc import calc_theta_max
+from .src.calc import calc_face_area
+from .src.calc import calc_surface_area
+from .src.calc import calc_volume
+
+from .src.cache import DistortionCache
+from .src.cache import hash_octa
+
+from .src.cif import parse_symop
+from .src.cif import CifStructure
+from .src.cif import read_cif
 
 from .src.coord import count_line
 from .src.coord import find_metal
+from .src.coord import find_metal_index
 from .src.coord import extract_file
 from .src.coord import extract_octa
 
@@ -104,22 +145,84 @@ from .src.elements import check_atom
 from .src.elements import check_radii
 from .src.elements import check_color
 
+from .src.export import ResultWriter
+
+from .src.gradient import grad_zeta
+from .src.gradient import grad_delta
+from .src.gradient import grad_sigma
+from .src.gradient import check_grad
+
+from .src.graph import find_bonds_covalent
+from .src.graph import connectivity_matrix
+from .src.graph import find_fragments
+from .src.graph import split_fragments
+
 from .src.linear import norm_vector
 from .src.linear import angle_btw_planes
 from .src.linear import triangle_area
 
+from .src.network import TiltNetwork
+from .src.network import find_octa_index
+from .src.network import find_bridges
+from .src.network import orientation
+from .src.network import rotation_angles
+from .src.network import tilt_network
+from .src.network import glazer
+
+from .src.periodic import cart_to_frac
+from .src.periodic import frac_to_cart
+from .src.periodic import cell_to_lattice
+from .src.periodic import cell_widths
+from .src.periodic import minimum_image
+from .src.periodic import images_within
+from .src.periodic import padded_images
+from .src.periodic import CellList
+from .src.periodic import extract_octa_pbc
+from .src.periodic import extract_all_octa_pbc
+
 from .src.plane import find_eq_of_plane
+from .src.plane import find_eq_of_plane_batch
 
 from .src.plot import plot_zeta_sigma
 from .src.plot import plot_sigma_theta
 
 from .src.projection import project_atom_onto_line
 from .src.projection import project_atom_onto_plane
+from .src.projection import project_atom_onto_line_batch
+from .src.projection import project_atom_onto_plane_batch
+
+from .src.shape import calc_cshm
+
+from .src.stats import OnlineStats
+from .src.stats import ChangeEvent
+from .src.stats import ChangeDetector
+
+from .src.store import ResultStore
+
+from .src.symmetry import fingerprint
+from .src.symmetry import find_equivalent
+from .src.symmetry import calc_unique
+from .src.symmetry import cif_equivalent
+from .src.symmetry import calc_unique_cif
+
+from .src.timeseries import autocorrelation
+from .src.timeseries import integrated_time
+from .src.timeseries import fit_relaxation
 
 from .src.tools import find_bonds
+from .src.tools import find_bonds_index
+from .src.tools import find_angles_index
+from .src.tools import calc_param_complex
 from .src.tools import find_faces_octa
+from .src.tools import find_faces_octa_batch
+from .src.tools import calc_param_octa
+
+from .src.trajectory import OctaExtractor
+from .src.trajectory import ExchangeEvent
+from .src.trajectory import LigandTracker
 
 from .src.util import calc_fit_plane
 from .src.util import plot_fit_plane
 from .src.util import calc_rmsd
+from .src.util import calc_rmsd_octa
 
@@ -0,0 +1,329 @@
+# OctaDist  Copyright (C) 2019  Rangsiman Ketkaew et al.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import collections
+import copy
+import functools
+import hashlib
+import os
+import pickle
+
+import numpy as np
+
+CacheInfo = collections.namedtuple("CacheInfo", ["hits", "disk_hits", "misses", "currsize", "maxsize", "disksize"])
+
+# Returned by _get_disk when key is not stored, since None is a valid cached result
+_MISSING = object()
+
+
+def hash_octa(c_octa, func_name, params=None, decimals=6):
+    """
+    Compute content-addressed key of octahedral structure and parameter set.
+
+    Coordinates are rounded before hashing, so that structures which differ
+    only by numerical noise share the same key.
+
+    Parameters
+    ----------
+    c_octa : list or array
+        Atomic coordinates of octahedral structure, shape (7, 3) or (N, 7, 3).
+    func_name : str
+        Name of the function whose result is cached.
+    params : dict, optional
+        Keyword arguments passed to the function.
+    decimals : int
+        Number of decimal places kept before hashing.
+        Default value is 6.
+
+    Returns
+    -------
+    key : str
+        SHA-1 hex digest.
+
+    """
+    c_octa = np.round(np.asarray(c_octa, dtype=float), decimals) + 0.0  # + 0.0 turns -0.0 into 0.0
+    c_octa = np.ascontiguousarray(c_octa, dtype="<f8")
+
+    h = hashlib.sha1()
+    h.update(func_name.encode())
+    h.update(repr(c_octa.shape).encode())
+    h.update(c_octa.tobytes())
+    h.update(repr(sorted((params or {}).items())).encode())
+
+    return h.hexdigest()
+
+
+class DistortionCache:
+    """
+    Opt-in memoization cache for the results of distortion parameter functions.
+
+    Results are kept in a bounded in-memory LRU tier. If a directory is given,
+    results are also pickled to disk and the least recently used files are
+    evicted when the directory grows beyond the size limit.
+
+    Parameters
+    ----------
+    maxsize : int
+        Maximum number of results kept in memory.
+        Default value is 1024.
+    path : str, optional
+        Directory of persistent on-disk tier. If not given, only memory tier is used.
+    max_disk_bytes : int
+        Maximum total size of on-disk tier in bytes.
+        Default value is 100 MB.
+    decimals : int
+        Number of decimal places of coordinates used in cache key.
+        Default value is 6.
+
+    Examples
+    --------
+    >>> cache = DistortionCache(maxsize=4096, path="octadist_cache")
+    >>> zeta = cache.calc(calc_zeta, coord)
+    >>> cached_sigma = cache.wrap(calc_sigma)
+    >>> sigma = cached_sigma(coord)
+    >>> cache.info()
+    CacheInfo(hits=0, disk_hits=0, misses=2, currsize=2, maxsize=4096, disksize=...)
+
+    """
+
+    def __init__(self, maxsize=1024, path=None, max_disk_bytes=100 * 1024 ** 2, decimals=6):
+        self.maxsize = maxsize
+        self.path = path
+        self.max_disk_bytes = max_disk_bytes
+        self.decimals = decimals
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._memory = collections.OrderedDict()
+        self._disk = collections.OrderedDict()
+        self._disk_bytes = 0
+
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+            self._load_disk_index()
+
+    def _load_disk_index(self):
+        """
+        Read the files already stored in on-disk tier, oldest first.
+
+        """
+        entries = []
+        for name in os.listdir(self.path):
+            if name.endswith(".pkl"):
+                stat = os.stat(os.path.join(self.path, name))
+                entries.append((stat.st_mtime, name[:-4], stat.st_size))
+
+        for _, key, size in sorted(entries):
+            self._disk[key] = size
+            self._disk_bytes += size
+
+    def _file(self, key):
+        return os.path.join(self.path, key + ".pkl")
+
+    def _put_memory(self, key, value):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.maxsize:
+            self._memory.popitem(last=False)
+
+    def _put_disk(self, key, value):
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with open(self._file(key), "wb") as f:
+            f.write(data)
+
+        self._disk_bytes += len(data) - self._disk.pop(key, 0)
+        self._disk[key] = len(data)
+
+        while self._disk_bytes > self.max_disk_bytes and self._disk:
+            old_key, size = self._disk.popitem(last=False)
+            self._disk_bytes -= size
+            try:
+                os.remove(self._file(old_key))
+            except FileNotFoundError:
+                pass
+
+    def _get_disk(self, key):
+        if key not in self._disk:
+            return _MISSING
+
+        try:
+            with open(self._file(key), "rb") as f:
+                value = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            # Unreadable entry, drop it from both index and disk
+            self._disk_bytes -= self._disk.pop(key)
+            try:
+                os.remove(self._file(key))
+            except OSError:
+                pass
+            return _MISSING
+
+        # Mark as recently used, both in the index and on file system for the next session
+        self._disk.move_to_end(key)
+        os.utime(self._file(key))
+
+        return value
+
+    def get(self, key):
+        """
+        Look up result by key.
+
+        Parameters
+        ----------
+        key : str
+            Key computed by hash_octa.
+
+        Returns
+        -------
+        found : bool
+            True if the result is cached.
+        value : object
+            Copy of cached result, or None.
+
+        """
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return True, copy.deepcopy(self._memory[key])
+
+        if self.path is not None:
+            value = self._get_disk(key)
+            if value is not _MISSING:
+                self._put_memory(key, value)
+                self.disk_hits += 1
+                return True, copy.deepcopy(value)
+
+        self.misses += 1
+
+        return False, None
+
+    def set(self, key, value):
+        """
+        Store result under key in all tiers.
+
+        Parameters
+        ----------
+        key : str
+            Key computed by hash_octa.
+        value : object
+            Picklable result.
+
+        Returns
+        -------
+        None : None
+
+        """
+        value = copy.deepcopy(value)
+        self._put_memory(key, value)
+
+        if self.path is not None:
+            self._put_disk(key, value)
+
+    def calc(self, func, c_octa, **params):
+        """
+        Return func(c_octa, **params), computing it only if it is not cached.
+
+        Parameters
+        ----------
+        func : function
+            Function of octahedral coordinates, e.g. calc_zeta.
+        c_octa : list or array
+            Atomic coordinates of octahedral structure.
+        params : dict
+            Keyword arguments passed to func.
+
+        Returns
+        -------
+        value : object
+            Result of func.
+
+        """
+        name = f"{func.__module__}.{func.__qualname__}"
+        key = hash_octa(c_octa, name, params, self.decimals)
+
+        found, value = self.get(key)
+        if found:
+            return value
+
+        value = func(c_octa, **params)
+        self.set(key, value)
+
+        return value
+
+    def wrap(self, func):
+        """
+        Wrap function so that every call goes through the cache.
+
+        Parameters
+        ----------
+        func : function
+            Function of octahedral coordinates, e.g. calc_zeta.
+
+        Returns
+        -------
+        wrapper : function
+            Cached version of func.
+
+        """
+        @functools.wraps(func)
+        def wrapper(c_octa, **params):
+            return self.calc(func, c_octa, **params)
+
+        return wrapper
+
+    def info(self):
+        """
+        Report hit and miss counters and current sizes.
+
+        Returns
+        -------
+        CacheInfo : namedtuple
+            hits, disk_hits, misses, currsize, maxsize, and disksize (in bytes).
+
+        """
+        return CacheInfo(self.hits, self.disk_hits, self.misses,
+                         len(self._memory), self.maxsize, self._disk_bytes)
+
+    def clear(self, disk=False):
+        """
+        Clear memory tier and reset counters.
+
+        Parameters
+        ----------
+        disk : bool
+            If True, also delete all files of on-disk tier.
+            Default value is False.
+
+        Returns
+        -------
+        None : None
+
+        """
+        self._memory.clear()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if disk and self.path is not None:
+            for key in list(self._disk):
+                try:
+                    os.remove(self._file(key))
+                except FileNotFoundError:
+                    pass
+            self._disk.clear()
+            self._disk_bytes = 0
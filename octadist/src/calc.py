@@ -17,9 +17,18 @@
 import numpy as np
 
 import octadist.src.plane
-from octadist.src import linear, projection
+from octadist.src import linear, profiler, projection, tools
 
+# Ligands (N1, N2, N3, N4, N5, N6) of the 8 faces visited by calc_theta: N1N2N3 is
+# the projection face and N4, N5, N6 are the opposite atoms (N5 trans to N1).
+_THETA_FACES = np.array([[0, 1, 2, 3, 4, 5], [0, 3, 1, 5, 4, 2], [0, 5, 3, 2, 4, 1], [0, 2, 5, 1, 4, 3],
+                         [4, 5, 3, 2, 0, 1], [4, 2, 5, 1, 0, 3], [4, 1, 2, 3, 0, 5], [4, 3, 1, 5, 0, 2]])
 
+# Pairs of vectors (VTh1, VTh4), (VTh4, VTh2), ..., (VTh6, VTh1) of the six theta angles of a face
+_THETA_PAIRS = np.array([[0, 3], [3, 1], [1, 4], [4, 2], [2, 5], [5, 0]])
+
+
+@profiler.stage("calc.d_bond")
 def calc_d_bond(c_octa):
     """
     Calculate metal-ligand bond distance and return value in Angstrom.
@@ -53,11 +62,14 @@ def calc_d_bond(c_octa):
      1.9805587036803534]
 
     """
-    bond_dist = [linear.euclidean_dist(c_octa[0], c_octa[i]) for i in range(1, 7)]
+    c_octa = np.asarray(c_octa, dtype=float)
+
+    bond_dist = linear.euclidean_dist(c_octa[0], c_octa[1:7]).tolist()
 
     return bond_dist
 
 
+@profiler.stage("calc.d_mean")
 def calc_d_mean(c_octa):
     """
     Calculate mean distance parameter and return value in Angstrom.
@@ -94,6 +106,7 @@ def calc_d_mean(c_octa):
     return d_mean
 
 
+@profiler.stage("calc.zeta")
 def calc_zeta(c_octa):
     """
     Calculate Zeta parameter and return value in Angstrom.
@@ -142,6 +155,7 @@ def calc_zeta(c_octa):
     return zeta
 
 
+@profiler.stage("calc.delta")
 def calc_delta(c_octa):
     """
     Calculate Delta parameter, also known as Tilting distortion parameter.
@@ -191,6 +205,7 @@ def calc_delta(c_octa):
     return delta
 
 
+@profiler.stage("calc.bond_angle")
 def calc_bond_angle(c_octa):
     """
     Calculate 12 cis and 3 trans unique angles in octahedral structure.
@@ -232,13 +247,10 @@ def calc_bond_angle(c_octa):
     else:
         c_octa = np.asarray(c_octa)
 
-    all_angle = []
-    for i in range(1, 7):
-        for j in range(i + 1, 7):
-            vec1 = c_octa[i] - c_octa[0]
-            vec2 = c_octa[j] - c_octa[0]
-            angle = linear.angle_btw_vectors(vec1, vec2)
-            all_angle.append(angle)
+    # All 15 pairs of ligand atoms
+    i, j = np.triu_indices(6, k=1)
+    ligands_vec = c_octa[1:7] - c_octa[0]
+    all_angle = linear.angle_btw_vectors(ligands_vec[i], ligands_vec[j]).tolist()
 
     # Sort the angle from the lowest to the highest
     sorted_angle = sorted(all_angle)
@@ -248,6 +260,7 @@ def calc_bond_angle(c_octa):
     return cis_angle, trans_angle
 
 
+@profiler.stage("calc.sigma")
 def calc_sigma(c_octa):
     """
     Calculate Sigma parameter and return value in degree.
@@ -292,6 +305,7 @@ def calc_sigma(c_octa):
     return sigma
 
 
+@profiler.stage("calc.theta")
 def calc_theta(c_octa):
     """
     Calculate Theta parameter and value in degree.
@@ -479,70 +493,26 @@ def calc_theta(c_octa):
     # Calculate the Theta parameter ans its derivatives #
     #####################################################
 
-    eqOfPlane = []
-    indiTheta = []
-    allTheta = []
-
-    # loop over 8 faces
-    for proj in range(8):
-        a, b, c, d = octadist.src.plane.find_eq_of_plane(N1, N2, N3)
-        eqOfPlane.append([a, b, c, d])
-
-        # Project M, N4, N5, and N6 onto the plane defined by N1, N2, and N3
-        TMP = projection.project_atom_onto_plane(TM, a, b, c, d)
-        N4P = projection.project_atom_onto_plane(N4, a, b, c, d)
-        N5P = projection.project_atom_onto_plane(N5, a, b, c, d)
-        N6P = projection.project_atom_onto_plane(N6, a, b, c, d)
-
-        VTh1 = N1 - TMP
-        VTh2 = N2 - TMP
-        VTh3 = N3 - TMP
-        VTh4 = N4P - TMP
-        VTh5 = N5P - TMP
-        VTh6 = N6P - TMP
-
-        a12 = linear.angle_btw_vectors(VTh1, VTh2)
-        a13 = linear.angle_btw_vectors(VTh1, VTh3)
-        if a12 < a13:
-            direction = np.cross(VTh1, VTh2)
-        else:
-            direction = np.cross(VTh3, VTh1)
-
-        theta1 = linear.angle_sign(VTh1, VTh4, direction)
-        theta2 = linear.angle_sign(VTh4, VTh2, direction)
-        theta3 = linear.angle_sign(VTh2, VTh5, direction)
-        theta4 = linear.angle_sign(VTh5, VTh3, direction)
-        theta5 = linear.angle_sign(VTh3, VTh6, direction)
-        theta6 = linear.angle_sign(VTh6, VTh1, direction)
-
-        indiTheta.append([theta1, theta2, theta3, theta4, theta5, theta6])
-
-        sum_theta = sum(abs(indiTheta[proj][i] - 60) for i in range(6))
-
-        allTheta.append(sum_theta)
-
-        tp = N2
-        N2 = N4
-        N4 = N6
-        N6 = N3
-        N3 = tp
-
-        # If the proj = 3, permutation face will be switched from N1N2N3
-        # to N1N4N2, to N1N6N4, then to N1N3N6, and then back to N1N2N3
-        if proj == 3:
-            tp = N1
-            N1 = N5
-            N5 = tp
-            tp = N2
-            N2 = N6
-            N6 = tp
-            tp = N3
-            N3 = N4
-            N4 = tp
-
-        # End of the loop that calculate the 8 projections.
-
-    theta_mean = sum(allTheta[i] for i in range(8)) / 2
+    # All 8 faces at once
+    face = np.array([N1, N2, N3, N4, N5, N6])[_THETA_FACES]
+    eqOfPlane = octadist.src.plane.find_eq_of_plane_batch(face[:, 0], face[:, 1], face[:, 2])
+
+    # Project M, N4, N5, and N6 onto the plane defined by N1, N2, and N3
+    proj_atom = np.concatenate((np.broadcast_to(TM, (8, 1, 3)), face[:, 3:]), axis=1)
+    proj_atom = projection.project_atom_onto_plane_batch(proj_atom, eqOfPlane[:, np.newaxis])
+
+    # VTh1 - VTh6: vectors from projected metal to N1, N2, N3 and projected N4, N5, N6
+    TMP = proj_atom[:, :1]
+    VTh = np.concatenate((face[:, :3], proj_atom[:, 1:]), axis=1) - TMP
+
+    a12 = linear.angle_btw_vectors(VTh[:, 0], VTh[:, 1])
+    a13 = linear.angle_btw_vectors(VTh[:, 0], VTh[:, 2])
+    direction = np.where((a12 < a13)[:, np.newaxis], np.cross(VTh[:, 0], VTh[:, 1]), np.cross(VTh[:, 2], VTh[:, 0]))
+
+    indiTheta = linear.angle_sign(VTh[:, _THETA_PAIRS[:, 0]], VTh[:, _THETA_PAIRS[:, 1]], direction[:, np.newaxis])
+    allTheta = np.sum(np.abs(indiTheta - 60), axis=1)
+
+    theta_mean = float(np.sum(allTheta) / 2)
 
     # If geometry is True, the structure is non-octahedron
     if geometry:
@@ -611,3 +581,121 @@ def calc_theta_max(allTheta):
     theta_max = sum(sorted_theta[i] for i in range(4, 8))
 
     return theta_max
+
+
+@profiler.stage("calc.face_area")
+def calc_face_area(c_octa):
+    """
+    Calculate the area of eight triangular faces of octahedral structure.
+
+    Area = abs(ab X ac)/2
+
+    where a, b, and c are three ligand atoms of the face.
+
+    Parameters
+    ----------
+    c_octa : array
+        Atomic coordinates of octahedral structure, shape (7, 3) or (N, 7, 3).
+
+    Returns
+    -------
+    face_area : array
+        Area of individual face, shape (8,) or (N, 8).
+
+    See Also
+    --------
+    tools.find_faces_octa_batch : Find the faces of octahedral structure.
+
+    """
+    c_octa = np.asarray(c_octa, dtype=float)
+
+    ref_index, _ = tools.find_faces_octa_batch(c_octa)
+    face = np.take_along_axis(c_octa[..., np.newaxis, :, :],
+                              ref_index[..., np.newaxis], axis=-2)
+
+    normal = np.cross(face[..., 1, :] - face[..., 0, :], face[..., 2, :] - face[..., 0, :])
+    face_area = np.linalg.norm(normal, axis=-1) / 2
+
+    return face_area
+
+
+@profiler.stage("calc.surface_area")
+def calc_surface_area(c_octa):
+    """
+    Calculate the total surface area of octahedral structure and return value in Angstrom^2.
+
+    Parameters
+    ----------
+    c_octa : array
+        Atomic coordinates of octahedral structure, shape (7, 3) or (N, 7, 3).
+
+    Returns
+    -------
+    surface_area : float or array
+        Sum of the area of eight faces.
+
+    Examples
+    --------
+    >>> coord
+    [[2.298354000, 5.161785000, 7.971898000],  # <- Metal atom
+     [1.885657000, 4.804777000, 6.183726000],
+     [1.747515000, 6.960963000, 7.932784000],
+     [4.094380000, 5.807257000, 7.588689000],
+     [0.539005000, 4.482809000, 8.460004000],
+     [2.812425000, 3.266553000, 8.131637000],
+     [2.886404000, 5.392925000, 9.848966000]]
+    >>> calc_surface_area(coord)
+    25.770285001812425
+
+    """
+    surface_area = np.sum(calc_face_area(c_octa), axis=-1)
+
+    return surface_area
+
+
+@profiler.stage("calc.volume")
+def calc_volume(c_octa):
+    """
+    Calculate the volume of octahedral structure and return value in Angstrom^3.
+
+    The octahedron is decomposed into eight tetrahedra, each made of one face and metal center atom:
+
+          8
+    V =  sum |(a_i - M).((b_i - M) X (c_i - M))| / 6
+         i=1
+
+    Parameters
+    ----------
+    c_octa : array
+        Atomic coordinates of octahedral structure, shape (7, 3) or (N, 7, 3).
+
+    Returns
+    -------
+    volume : float or array
+        Polyhedral volume of octahedron.
+
+    Examples
+    --------
+    >>> coord
+    [[2.298354000, 5.161785000, 7.971898000],  # <- Metal atom
+     [1.885657000, 4.804777000, 6.183726000],
+     [1.747515000, 6.960963000, 7.932784000],
+     [4.094380000, 5.807257000, 7.588689000],
+     [0.539005000, 4.482809000, 8.460004000],
+     [2.812425000, 3.266553000, 8.131637000],
+     [2.886404000, 5.392925000, 9.848966000]]
+    >>> calc_volume(coord)
+    9.538645375665253
+
+    """
+    c_octa = np.asarray(c_octa, dtype=float)
+
+    ref_index, _ = tools.find_faces_octa_batch(c_octa)
+    face = np.take_along_axis(c_octa[..., np.newaxis, :, :],
+                              ref_index[..., np.newaxis], axis=-2)
+    vec = face - c_octa[..., np.newaxis, :1, :]
+
+    triple = np.einsum('...k,...k->...', vec[..., 0, :], np.cross(vec[..., 1, :], vec[..., 2, :]))
+    volume = np.sum(np.abs(triple), axis=-1) / 6
+
+    return volume
@@ -0,0 +1,486 @@
+# OctaDist  Copyright (C) 2019  Rangsiman Ketkaew et al.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import re
+from fractions import Fraction
+
+import numpy as np
+import scipy.spatial
+
+from octadist.src import coord, elements, periodic, profiler
+
+_TOKEN = re.compile(r"'([^']*)'(?=\s|$)|\"([^\"]*)\"(?=\s|$)|(#.*)|(\S+)")
+_TERM = re.compile(r"([+-]?)\s*(\d+(?:\.\d*)?(?:/\d+)?)?\s*\*?\s*([xyz])?")
+
+_SYMOP_TAGS = ("_space_group_symop_operation_xyz",
+               "_space_group_symop.operation_xyz",
+               "_symmetry_equiv_pos_as_xyz")
+
+
+def _tokenize(lines):
+    """
+    Split lines of CIF file into tokens. Semicolon text fields are returned as one token.
+
+    """
+    lines = iter(lines)
+    for line in lines:
+        if line.startswith(";"):
+            text = [line[1:].rstrip("\n")]
+            for line in lines:
+                if line.startswith(";"):
+                    break
+                text.append(line.rstrip("\n"))
+            yield "\n".join(text).strip()
+            continue
+
+        for quoted_1, quoted_2, comment, bare in _TOKEN.findall(line):
+            if comment:
+                break
+            yield quoted_1 or quoted_2 or bare
+
+
+def _parse_blocks(lines):
+    """
+    Parse data items and loops of the first data block of CIF file.
+
+    """
+    items = {}
+    loops = []
+
+    tokens = _tokenize(lines)
+    token = next(tokens, None)
+    started = False
+    while token is not None:
+        lower = token.lower()
+
+        if lower.startswith("data_"):
+            if started:
+                break
+            started = True
+            token = next(tokens, None)
+
+        elif lower == "loop_":
+            tags = []
+            token = next(tokens, None)
+            while token is not None and token.startswith("_"):
+                tags.append(token.lower())
+                token = next(tokens, None)
+
+            values = []
+            while token is not None and not token.startswith("_") \
+                    and token.lower() != "loop_" and not token.lower().startswith("data_"):
+                values.append(token)
+                token = next(tokens, None)
+
+            n = len(values) // len(tags) * len(tags) if tags else 0
+            loops.append({tag: values[i:n:len(tags)] for i, tag in enumerate(tags)})
+
+        elif token.startswith("_"):
+            items[lower] = next(tokens, None)
+            token = next(tokens, None)
+
+        else:
+            token = next(tokens, None)
+
+    return items, loops
+
+
+def _to_float(value):
+    """
+    Convert CIF number such as 10.123(4) to float. Unknown values give NaN.
+
+    """
+    if value in (None, "?", "."):
+        return np.nan
+
+    return float(value.split("(")[0])
+
+
+def _to_symbol(text):
+    """
+    Get element symbol from atom type (e.g. Fe3+) or site label (e.g. Fe1A).
+
+    """
+    letters = re.match(r"[A-Za-z]*", text).group()
+    if elements.check_atom(letters[:2].capitalize()) is not None:
+        return letters[:2].capitalize()
+
+    return letters[:1].upper()
+
+
+def parse_symop(text):
+    """
+    Parse symmetry operator in xyz notation, e.g. "-x+1/2, y, -z".
+
+    Parameters
+    ----------
+    text : str
+        Symmetry operator.
+
+    Returns
+    -------
+    rot : array
+        Rotation part acting on fractional coordinates, shape (3, 3).
+    trans : array
+        Translation part, shape (3,).
+
+    """
+    rot = np.zeros((3, 3))
+    trans = np.zeros(3)
+
+    parts = text.replace(" ", "").lower().split(",")
+    if len(parts) != 3:
+        raise ValueError(f"Invalid symmetry operator: {text}")
+
+    for i, part in enumerate(parts):
+        for sign, number, axis in _TERM.findall(part):
+            if not number and not axis:
+                continue
+            value = float(Fraction(number)) if number else 1.0
+            value = -value if sign == "-" else value
+            if axis:
+                rot[i, "xyz".index(axis)] += value
+            else:
+                trans[i] += value
+
+    return rot, trans
+
+
+class CifStructure:
+    """
+    Crystal structure read from CIF file.
+
+    Only the asymmetric unit and symmetry operators are kept. Atoms of the unit cell
+    are generated on demand, and only around the sites asked for,
+    so the cost of extracting an octahedron does not grow with the size of the cell.
+
+    Parameters
+    ----------
+    cell : tuple
+        Cell parameters a, b, c (Angstrom) and alpha, beta, gamma (degree).
+    labels : list
+        Site labels of asymmetric unit.
+    atoms : list
+        Element symbols of asymmetric unit.
+    frac : array
+        Fractional coordinates of asymmetric unit, shape (N, 3).
+    rotations : array
+        Rotation parts of symmetry operators, shape (S, 3, 3).
+    translations : array
+        Translation parts of symmetry operators, shape (S, 3).
+    name : str
+        Name of data block.
+
+    Examples
+    --------
+    >>> structure = read_cif("ABO3.cif")
+    >>> a_octa, c_octa = structure.extract_octa()
+    >>> zeta = calc.calc_zeta(c_octa)
+
+    """
+
+    def __init__(self, cell, labels, atoms, frac, rotations, translations, name=""):
+        self.cell = tuple(cell)
+        self.lattice = periodic.cell_to_lattice(*cell)
+        self.labels = list(labels)
+        self.atoms = list(atoms)
+        self.frac = np.asarray(frac, dtype=float).reshape(-1, 3)
+        self.rotations = np.asarray(rotations, dtype=float).reshape(-1, 3, 3)
+        self.translations = np.asarray(translations, dtype=float).reshape(-1, 3)
+        self.name = name
+
+        # Symmetry operators acting on Cartesian displacement vectors (row vectors)
+        self._cart_rotations = np.linalg.inv(self.lattice) @ self.rotations.transpose(0, 2, 1) @ self.lattice
+        self._inverse_rotations = np.linalg.inv(self.rotations)
+
+        # Asymmetric unit atoms in a cell list, built on first search
+        self._cell = None
+
+    def __repr__(self):
+        return f"CifStructure({self.name!r}, {len(self.atoms)} sites, {len(self.rotations)} symmetry operators)"
+
+    def metal_sites(self):
+        """
+        Find metal sites of asymmetric unit.
+
+        Returns
+        -------
+        m_index : list
+            Indices (0-based) of metal sites in asymmetric unit.
+
+        """
+        return coord.find_metal_index(self.atoms)
+
+    def images(self, i):
+        """
+        Get fractional coordinates of the symmetry images of site i in unit cell.
+
+        Parameters
+        ----------
+        i : int
+            Index of site in asymmetric unit.
+
+        Returns
+        -------
+        frac : array
+            Distinct fractional coordinates in [0, 1), shape (multiplicity, 3).
+
+        """
+        frac = self.frac[i] @ self.rotations.transpose(0, 2, 1) + self.translations
+        frac = frac - np.floor(frac)
+
+        return _unique_positions(frac)
+
+    def _cell_list(self, cutoff):
+        """
+        Cell list of asymmetric unit atoms with bins at least cutoff wide, rebuilt for larger cutoff.
+
+        """
+        if self._cell is None or self._cell.cutoff < cutoff:
+            self._cell = periodic.CellList(periodic.frac_to_cart(self.frac, self.lattice), self.lattice, cutoff)
+
+        return self._cell
+
+    def neighbourhood(self, frac_point, cutoff=3.5):
+        """
+        Generate atoms within cutoff of a point by applying symmetry operators.
+
+        Symmetry operators keep distances, so the image R*x + t of an atom lies within
+        cutoff of the point exactly when the atom lies within cutoff of R^-1*(point - t).
+        Only the asymmetric unit atoms around these points are searched and mapped back.
+
+        Parameters
+        ----------
+        frac_point : array
+            Fractional coordinate of center.
+        cutoff : float
+            Radius in Angstrom. Default value is 3.5.
+
+        Returns
+        -------
+        site : array
+            Index of asymmetric unit site of each atom.
+        d_cart : array
+            Cartesian displacement vectors from center, sorted by distance.
+        dist : array
+            Distances from center.
+
+        """
+        frac_point = np.asarray(frac_point, dtype=float)
+        cell = self._cell_list(cutoff)
+
+        points = np.einsum('sij,sj->si', self._inverse_rotations, frac_point - self.translations)
+        op, site, d_cart, _ = cell.within(points, cutoff)
+        d_cart = np.einsum('ki,kij->kj', d_cart, self._cart_rotations[op])
+
+        # Atoms on special positions are generated by several operators, keep the first copy
+        pairs = scipy.spatial.cKDTree(d_cart).query_pairs(1e-3, output_type='ndarray')
+        pairs = pairs[site[pairs[:, 0]] == site[pairs[:, 1]]]
+        keep = np.ones(len(site), dtype=bool)
+        keep[pairs.max(axis=1)] = False
+        site, d_cart = site[keep], d_cart[keep]
+
+        dist = np.linalg.norm(d_cart, axis=1)
+        order = np.argsort(dist, kind='stable')
+
+        return site[order], d_cart[order], dist[order]
+
+    def extract_octa(self, m_index=1, cutoff=3.5):
+        """
+        Extract octahedral structure of metal site in asymmetric unit.
+
+        Parameters
+        ----------
+        m_index : int
+            The number of metal site in asymmetric unit - default is 1.
+        cutoff : float
+            Search radius. If fewer than six atoms are found,
+            the radius is doubled until six are found.
+            Default value is 3.5 Angstroms.
+
+        Returns
+        -------
+        a_octa : list
+            Atomic labels of octahedral structure.
+        c_octa : array
+            Atomic coordinates of octahedral structure, shape (7, 3).
+
+        """
+        metals = self.metal_sites()
+
+        if m_index > len(metals):
+            print("Error: the index of metal you defined is greater than the total number of metal in complex.")
+            return 1
+
+        a_octa, c_octa, _ = self._octa(metals[m_index - 1], cutoff)
+
+        return a_octa, c_octa
+
+    def extract_all_octa(self, cutoff=3.5):
+        """
+        Extract octahedral structures of all metal sites in asymmetric unit.
+
+        Parameters
+        ----------
+        cutoff : float
+            Search radius. Default value is 3.5 Angstroms.
+
+        Returns
+        -------
+        m_index : list
+            Indices (0-based) of metal sites in asymmetric unit.
+        a_octas : list
+            Atomic labels of octahedral structures.
+        c_octas : array
+            Atomic coordinates of octahedral structures, shape (M, 7, 3).
+        l_index : array
+            Asymmetric unit sites of ligand atoms, shape (M, 6).
+
+        """
+        m_index = self.metal_sites()
+
+        a_octas = []
+        c_octas = np.empty((len(m_index), 7, 3))
+        l_index = np.empty((len(m_index), 6), dtype=int)
+
+        for n, i in enumerate(m_index):
+            a_octa, c_octas[n], l_index[n] = self._octa(i, cutoff)
+            a_octas.append(a_octa)
+
+        return m_index, a_octas, c_octas, l_index
+
+    def _octa(self, i, cutoff):
+        """
+        Metal site i of asymmetric unit and its six nearest atoms.
+
+        """
+        radius = cutoff
+        while True:
+            site, d_cart, dist = self.neighbourhood(self.frac[i], radius)
+            keep = dist > 1e-3
+            if np.count_nonzero(keep) >= 6:
+                break
+            radius *= 2
+
+        site, d_cart = site[keep][:6], d_cart[keep][:6]
+
+        center = periodic.frac_to_cart(self.frac[i], self.lattice)
+        c_octa = np.vstack((center, center + d_cart))
+        a_octa = [self.atoms[i]] + [self.atoms[j] for j in site]
+
+        return a_octa, c_octa, site
+
+    def expand(self):
+        """
+        Generate all atoms of unit cell.
+
+        Returns
+        -------
+        a_full : list
+            Atomic labels of all atoms in unit cell.
+        c_full : array
+            Cartesian coordinates of all atoms in unit cell.
+        site : array
+            Index of asymmetric unit site of each atom.
+
+        """
+        a_full, frac_full, site = [], [], []
+        for i in range(len(self.atoms)):
+            frac = self.images(i)
+            a_full += [self.atoms[i]] * len(frac)
+            frac_full.append(frac)
+            site += [i] * len(frac)
+
+        c_full = periodic.frac_to_cart(np.concatenate(frac_full), self.lattice)
+
+        return a_full, c_full, np.array(site, dtype=int)
+
+
+def _unique_positions(frac, tol=1e-3):
+    """
+    Remove fractional coordinates that coincide under lattice translations.
+
+    """
+    keep = []
+    for i in range(len(frac)):
+        d = frac[keep] - frac[i]
+        d -= np.round(d)
+        if not keep or np.all(np.max(np.abs(d), axis=1) > tol):
+            keep.append(i)
+
+    return frac[keep]
+
+
+@profiler.stage("parse.cif")
+def read_cif(f):
+    """
+    Read asymmetric unit, cell, and symmetry operators from CIF file.
+
+    Only the first data block is read. Site occupancies are ignored.
+
+    Parameters
+    ----------
+    f : str
+        Input file.
+
+    Returns
+    -------
+    structure : CifStructure
+        Crystal structure.
+
+    """
+    with open(f) as file:
+        lines = file.readlines()
+
+    name = ""
+    for line in lines:
+        if line.lower().startswith("data_"):
+            name = line.strip()[5:]
+            break
+
+    items, loops = _parse_blocks(lines)
+
+    cell = [_to_float(items.get(tag)) for tag in
+            ("_cell_length_a", "_cell_length_b", "_cell_length_c",
+             "_cell_angle_alpha", "_cell_angle_beta", "_cell_angle_gamma")]
+    if np.any(np.isnan(cell[:3])):
+        raise ValueError(f"Cell lengths are missing in {f}")
+    cell[3:] = [90.0 if np.isnan(x) else x for x in cell[3:]]
+
+    symops = ["x,y,z"]
+    site_loop = None
+    for loop in loops:
+        for tag in _SYMOP_TAGS:
+            if tag in loop:
+                symops = loop[tag]
+        if "_atom_site_fract_x" in loop:
+            site_loop = loop
+    for tag in _SYMOP_TAGS:
+        if tag in items:
+            symops = [items[tag]]
+
+    if site_loop is None:
+        raise ValueError(f"No atom sites found in {f}")
+
+    rotations, translations = zip(*[parse_symop(op) for op in symops])
+
+    labels = site_loop.get("_atom_site_label", site_loop.get("_atom_site_type_symbol"))
+    types = site_loop.get("_atom_site_type_symbol", labels)
+    atoms = [_to_symbol(t) for t in types]
+
+    frac = np.column_stack([[_to_float(v) for v in site_loop[f"_atom_site_fract_{x}"]] for x in "xyz"])
+
+    return CifStructure(cell, labels, atoms, frac, rotations, translations, name=name)
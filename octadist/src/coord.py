@@ -18,7 +18,7 @@ from operator import itemgetter
 
 import numpy as np
 
-from octadist.src import elements, linear
+from octadist.src import elements, graph, linear, profiler
 
 
 def count_line(file):
@@ -56,18 +56,44 @@ def find_metal(a_full, c_full):
     :rtype a_metal: list
     :rtype c_metal: array
     """
-    count = 0
-    c_metal = []
+    m_index = find_metal_index(a_full)
+    c_metal = [c_full[i] for i in m_index]
 
-    for i in range(len(a_full)):
-        number = elements.check_atom(a_full[i])
-        if 21 <= number <= 30 or 39 <= number <= 48 or 57 <= number <= 80 or 89 <= number <= 109:
-            count += 1
-            c_metal.append(c_full[i])
+    return len(m_index), c_metal
 
-    return count, c_metal
 
+def find_metal_index(a_full):
+    """
+    Find the indices of metal center atoms in complex.
+
+    Parameters
+    ----------
+    a_full : list
+        Full atomic labels of complex.
+
+    Returns
+    -------
+    m_index : list
+        Indices (0-based) of metal atoms in a_full.
+
+    """
+    # Every distinct label is looked up once
+    metals = {atom for atom in set(a_full) if _is_metal(atom)}
 
+    return [i for i, atom in enumerate(a_full) if atom in metals]
+
+
+def _is_metal(atom):
+    """
+    Check if atom is a transition metal, lanthanide, or actinide.
+
+    """
+    number = elements.check_atom(atom)
+
+    return 21 <= number <= 30 or 39 <= number <= 48 or 57 <= number <= 80 or 89 <= number <= 109
+
+
+@profiler.stage("extract_file")
 def extract_file(f):
     """Extract full atomic symbols and coordinates from input file
     **Support file type**::
@@ -107,14 +133,18 @@ def extract_file(f):
     return a_full, c_full
 
 
-def extract_octa(a_full, c_full, m_index=1):
+@profiler.stage("extract_octa", arg=1)
+def extract_octa(a_full, c_full, m_index=1, fragment=False):
     """Extract atomic symbols and coordinates of octahedral structure from full atomic coordinates list
     :param a_full: full atomic labels of complex
     :param c_full: full atomic coordinates of complex
     :param m_index: the number of metal center atom - default is 1
+    :param fragment: if True, search ligand atoms only in the molecule (bonded fragment) of the metal,
+        so that counter ions and solvent are never picked - default is False
     :type a_full: list
     :type c_full: list, array, tuple
     :type m_index: int
+    :type fragment: bool
     :return a_octa: atomic labels of octahedral structure
     :return c_octa: atomic coordinates of octahedral structure
     :rtype a_octa: list
@@ -133,9 +163,18 @@ def extract_octa(a_full, c_full, m_index=1):
     metal_index = m_index - 1
     dist_list = []
 
-    for i in range(len(a_full)):
-        dist = linear.euclidean_dist(c_metal[metal_index], c_full[i])
-        dist_list.append([a_full[i], c_full[i], dist])
+    all_dist = linear.euclidean_dist(c_metal[metal_index], c_full)
+    atoms = range(len(a_full))
+
+    if fragment:
+        _, labels = graph.find_fragments(a_full, c_full)
+        same = np.flatnonzero(labels == labels[find_metal_index(a_full)[metal_index]])
+        # Metal bonded to fewer than six atoms, keep searching the whole complex
+        if len(same) >= 7:
+            atoms = same
+
+    for i in atoms:
+        dist_list.append([a_full[i], c_full[i], all_dist[i]])
 
     dist_list.sort(key=itemgetter(2))  # sort list of tuples by distance in ascending order
     dist_list = dist_list[:7]  # Get only first 7 atoms
@@ -204,6 +243,7 @@ def check_xyz_file(f):
         return True
 
 
+@profiler.stage("parse.xyz")
 def get_coord_xyz(f):
     """
     Get coordinate from .xyz file.
@@ -265,6 +305,7 @@ def check_gaussian_file(f):
     return False
 
 
+@profiler.stage("parse.gaussian")
 def get_coord_gaussian(f):
     """
     Extract XYZ coordinate from Gaussian output file.
@@ -359,6 +400,7 @@ def check_nwchem_file(f):
     return False
 
 
+@profiler.stage("parse.nwchem")
 def get_coord_nwchem(f):
     """
     Extract XYZ coordinate from NWChem output file.
@@ -451,6 +493,7 @@ def check_orca_file(f):
     return False
 
 
+@profiler.stage("parse.orca")
 def get_coord_orca(f):
     """
     Extract XYZ coordinate from ORCA output file.
@@ -537,6 +580,7 @@ def check_qchem_file(f):
     return False
 
 
+@profiler.stage("parse.qchem")
 def get_coord_qchem(f):
     """
     Extract XYZ coordinate from Q-Chem output file.
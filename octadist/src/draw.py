@@ -14,6 +14,7 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
+import numpy as np
 from matplotlib import pyplot as plt
 from mpl_toolkits.mplot3d import Axes3D
 from mpl_toolkits.mplot3d.art3d import Poly3DCollection
@@ -489,9 +490,14 @@ def twisting_faces(ao, co, save="not_save"):
     fig = plt.figure()
     st = fig.suptitle("Projected twisting triangular faces", fontsize="x-large")
 
+    # Project metal center atom and opposite atoms onto the four reference faces at once
+    ref_planes = plane.find_eq_of_plane_batch(c_ref[:4, 0], c_ref[:4, 1], c_ref[:4, 2])
+    m_proj = projection.project_atom_onto_plane_batch(co[0], ref_planes)
+    oppo_proj = projection.project_atom_onto_plane_batch(c_oppo[:4], ref_planes[:, np.newaxis])
+
     for i in range(4):
-        a, b, c, d = plane.find_eq_of_plane(c_ref[i][0], c_ref[i][1], c_ref[i][2])
-        m = projection.project_atom_onto_plane(co[0], a, b, c, d)
+        m = m_proj[i]
+        pl = oppo_proj[i]
         ax = fig.add_subplot(2, 2, int(i + 1), projection='3d')
         ax.set_title(f"Projection plane {i + 1}", fontsize='10')
 
@@ -508,7 +514,6 @@ def twisting_faces(ao, co, save="not_save"):
                 f"{ao[0]}'", fontsize=9)
 
         # Reference atoms
-        pl = []
         for j in range(3):
             ax.scatter(c_ref[i][j][0],
                        c_ref[i][j][1],
@@ -521,9 +526,6 @@ def twisting_faces(ao, co, save="not_save"):
                     c_ref[i][j][2] + 0.1,
                     f"{j + 1}", fontsize=9)
 
-            # Project ligand atom onto the reference face
-            pl.append(projection.project_atom_onto_plane(c_oppo[i][j], a, b, c, d))
-
         # Projected opposite atoms
         for j in range(3):
             ax.scatter(pl[j][0],
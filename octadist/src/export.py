@@ -0,0 +1,228 @@
+# OctaDist  Copyright (C) 2019  Rangsiman Ketkaew et al.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+from octadist.src.store import PARAMS, BONDS
+
+
+def _schema():
+    label = pa.dictionary(pa.int32(), pa.string())
+    fields = [("file", label), ("metal", label), ("m_index", pa.int32())]
+    fields += [(name, pa.float64()) for name in PARAMS + BONDS]
+
+    return pa.schema(fields)
+
+
+class ResultWriter:
+    """
+    Streaming columnar writer of batched distortion parameters.
+
+    Batches are buffered until a row group is full and then written out,
+    so memory use stays constant however many sites are processed.
+    File and metal columns are dictionary-encoded. In Parquet every row group
+    has its own dictionaries. Arrow IPC files allow only one dictionary per column,
+    so it is extended with the new labels of every record batch (dictionary deltas)
+    and its size grows with the number of distinct labels.
+    Output can be read or memory-mapped by pandas, polars, or pyarrow.
+
+    Requires pyarrow.
+
+    Parameters
+    ----------
+    path : str
+        Output file.
+    file_format : str
+        "parquet" or "arrow" (Arrow IPC file, also known as Feather v2).
+        Default is "parquet".
+    row_group_size : int
+        Number of rows per row group (Parquet) or record batch (Arrow).
+        Default value is 65536.
+    compression : str
+        Compression codec passed to pyarrow, e.g. "snappy", "zstd", or None.
+        Default is "snappy" for Parquet and None for Arrow.
+
+    Examples
+    --------
+    >>> with ResultWriter("results.parquet") as writer:
+    ...     for batch in batches:
+    ...         writer.write_batch(file, metal, m_index, zeta, delta, sigma, theta, bond_dist)
+    >>> pandas.read_parquet("results.parquet")
+
+    """
+
+    def __init__(self, path, file_format="parquet", row_group_size=65536, compression="default"):
+        if pa is None:
+            raise ImportError("ResultWriter requires pyarrow, install it with: pip install pyarrow")
+
+        if file_format not in ("parquet", "arrow"):
+            raise ValueError(f"Unknown file format: {file_format}")
+
+        self.path = path
+        self.file_format = file_format
+        self.row_group_size = row_group_size
+        self.schema = _schema()
+        self.n_rows = 0
+
+        if file_format == "parquet":
+            if compression == "default":
+                compression = "snappy"
+            self._writer = pq.ParquetWriter(path, self.schema, compression=compression,
+                                            use_dictionary=["file", "metal"])
+        else:
+            if compression == "default":
+                compression = None
+            options = pa.ipc.IpcWriteOptions(compression=compression, emit_dictionary_deltas=True)
+            self._writer = pa.ipc.new_file(path, self.schema, options=options)
+
+        # Codes and dictionary arrays of label columns shared by all record batches (Arrow only)
+        self._codes = {"file": {}, "metal": {}}
+        self._labels = {"file": pa.array([], type=pa.string()), "metal": pa.array([], type=pa.string())}
+        self._buffer = []
+        self._n_buffer = 0
+
+    def _encode(self, name, values):
+        """
+        Dictionary-encode the labels of one row group.
+
+        """
+        if self.file_format == "parquet":
+            return pa.array(values, type=pa.string()).dictionary_encode()
+
+        lookup = self._codes[name]
+        n_old = len(lookup)
+        unique, inverse = np.unique(values, return_inverse=True)
+        codes = np.array([lookup.setdefault(u, len(lookup)) for u in unique.tolist()], dtype=np.int32)
+
+        # Only new labels are appended, in the order of their codes
+        new = [u for u, c in zip(unique.tolist(), codes.tolist()) if c >= n_old]
+        if new:
+            self._labels[name] = pa.concat_arrays([self._labels[name], pa.array(new, type=pa.string())])
+
+        return pa.DictionaryArray.from_arrays(pa.array(codes[inverse.reshape(-1)]), self._labels[name])
+
+    def write_batch(self, file, metal, m_index, zeta, delta, sigma, theta, bond_dist=None):
+        """
+        Append batched outputs of calc functions.
+
+        Scalars (e.g. one file name for the whole batch) are broadcast to all rows.
+
+        Parameters
+        ----------
+        file : str or list
+            Source file of each site.
+        metal : str or list
+            Metal of each site.
+        m_index : int or array
+            Index of metal in source file.
+        zeta, delta, sigma, theta : array
+            Distortion parameters, shape (N,).
+        bond_dist : array, optional
+            Metal-ligand bond distances, shape (N, 6). Missing distances are written as NaN.
+
+        Returns
+        -------
+        None : None
+
+        """
+        n = len(np.atleast_1d(zeta))
+
+        columns = {
+            "file": np.broadcast_to(np.asarray(file, dtype=str), (n,)),
+            "metal": np.broadcast_to(np.asarray(metal, dtype=str), (n,)),
+            "m_index": np.broadcast_to(np.asarray(m_index, dtype=np.int32), (n,)),
+        }
+        for name, value in zip(PARAMS, (zeta, delta, sigma, theta)):
+            columns[name] = np.broadcast_to(np.asarray(value, dtype=float), (n,))
+
+        if bond_dist is None:
+            bond_dist = np.full((n, 6), np.nan)
+        bond_dist = np.asarray(bond_dist, dtype=float).reshape(n, 6)
+        for i, name in enumerate(BONDS):
+            columns[name] = bond_dist[:, i]
+
+        self._buffer.append(columns)
+        self._n_buffer += n
+
+        if self._n_buffer >= self.row_group_size:
+            self._flush()
+
+    def _write_rows(self, columns):
+        """
+        Write columns as one row group (Parquet) or record batch (Arrow).
+
+        """
+        arrays = []
+        for name in self.schema.names:
+            if name in self._codes:
+                arrays.append(self._encode(name, columns[name]))
+            else:
+                arrays.append(pa.array(columns[name], type=self.schema.field(name).type))
+
+        batch = pa.record_batch(arrays, schema=self.schema)
+        if self.file_format == "parquet":
+            self._writer.write_batch(batch, row_group_size=len(batch))
+        else:
+            self._writer.write_batch(batch)
+
+        self.n_rows += len(batch)
+
+    def _flush(self, final=False):
+        """
+        Write all full row groups in buffer, and the remaining rows if final is True.
+
+        """
+        merged = {name: np.concatenate([b[name] for b in self._buffer]) for name in self.schema.names}
+
+        start = 0
+        while self._n_buffer - start >= self.row_group_size:
+            stop = start + self.row_group_size
+            self._write_rows({name: merged[name][start:stop] for name in merged})
+            start = stop
+
+        if final and self._n_buffer > start:
+            self._write_rows({name: merged[name][start:] for name in merged})
+            start = self._n_buffer
+
+        rest = self._n_buffer - start
+        self._buffer = [{name: merged[name][start:] for name in merged}] if rest else []
+        self._n_buffer = rest
+
+    def close(self):
+        """
+        Write remaining rows and close the file.
+
+        Returns
+        -------
+        None : None
+
+        """
+        if self._n_buffer:
+            self._flush(final=True)
+        self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
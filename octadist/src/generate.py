@@ -0,0 +1,490 @@
+# OctaDist  Copyright (C) 2019  Rangsiman Ketkaew et al.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import numpy as np
+
+from octadist.src import coord, elements, tools
+
+
+def ideal_octa(bond=2.0, metal="Fe", ligand="O"):
+    """
+    Build perfect octahedron with metal center atom at the origin.
+
+    Parameters
+    ----------
+    bond : float
+        Metal-ligand bond distance.
+        Default value is 2.0 Angstroms.
+    metal : str
+        Atomic symbol of metal center atom.
+    ligand : str
+        Atomic symbol of ligand atoms.
+
+    Returns
+    -------
+    a_octa : list
+        Atomic labels of octahedral structure.
+    c_octa : array
+        Atomic coordinates of octahedral structure, shape (7, 3).
+
+    """
+    a_octa = [metal] + [ligand] * 6
+    c_octa = np.array([[0, 0, 0],
+                       [1, 0, 0], [0, 1, 0], [0, 0, 1],
+                       [-1, 0, 0], [0, -1, 0], [0, 0, -1]], dtype=float) * bond
+
+    return a_octa, c_octa
+
+
+def read_template(file, m_index=1):
+    """
+    Read octahedral template from input file, e.g. Perfect-octahedron.xyz.
+
+    Parameters
+    ----------
+    file : str
+        Input file in any format supported by coord.extract_file.
+    m_index : int
+        Index of metal center atom.
+        Default value is 1.
+
+    Returns
+    -------
+    a_octa : list
+        Atomic labels of octahedral structure.
+    c_octa : array
+        Atomic coordinates of octahedral structure with metal at the origin, shape (7, 3).
+
+    """
+    a_full, c_full = coord.extract_file(file)
+    a_octa, c_octa = coord.extract_octa(a_full, c_full, m_index)
+
+    return a_octa, c_octa - c_octa[0]
+
+
+def random_rotation(n, rng):
+    """
+    Draw uniformly distributed random rotation matrices.
+
+    Parameters
+    ----------
+    n : int
+        Number of matrices.
+    rng : numpy.random.Generator
+        Random number generator.
+
+    Returns
+    -------
+    rot : array
+        Rotation matrices, shape (n, 3, 3).
+
+    """
+    q, r = np.linalg.qr(rng.normal(size=(n, 3, 3)))
+    q = q * np.sign(np.diagonal(r, axis1=-2, axis2=-1))[:, np.newaxis, :]
+
+    # Turn reflections into proper rotations
+    q[np.linalg.det(q) < 0, :, 0] *= -1
+
+    return q
+
+
+def _rotate_about_axis(v, axis, angle):
+    """
+    Rotate vectors about an axis through the origin by angle (radian), Rodrigues' formula.
+
+    """
+    axis = axis / np.linalg.norm(axis)
+    cos = np.cos(angle)
+    sin = np.sin(angle)
+
+    return v * cos + np.cross(axis, v) * sin + np.outer(v @ axis, axis) * (1 - cos)
+
+
+def perturb_octa(c_octa, n, stretch=0.02, angle=2.0, elongation=0.0, twist=0.0, rotate=True, seed=None):
+    """
+    Generate perturbed copies of octahedral template with controllable distortion.
+
+    The distortions are applied in this order:
+
+    1) Twist the opposite face about the C3 axis of the first face (Theta distortion).
+    2) Elongate the axis of the first ligand and its trans ligand (Jahn-Teller, Zeta/Delta).
+    3) Add random noise to bond lengths (Zeta/Delta) and bond directions (Sigma).
+    4) Apply random rotation.
+
+    Parameters
+    ----------
+    c_octa : array
+        Atomic coordinates of octahedral template, shape (7, 3).
+    n : int
+        Number of copies.
+    stretch : float
+        Standard deviation of random change of bond lengths in Angstrom.
+        Default value is 0.02.
+    angle : float
+        Standard deviation of random tilt of bond directions in degree.
+        Default value is 2.0.
+    elongation : float
+        Fractional elongation of the axial bonds.
+        Default value is 0.0.
+    twist : float
+        Twist angle of opposite face in degree. 60 degree turns octahedron into trigonal prism.
+        Default value is 0.0.
+    rotate : bool
+        If True, rotate every copy randomly.
+        Default is True.
+    seed : int, optional
+        Seed of random number generator. The same seed gives the same structures.
+
+    Returns
+    -------
+    c_octas : array
+        Atomic coordinates of octahedral structures with metal at the origin, shape (n, 7, 3).
+
+    """
+    rng = np.random.default_rng(seed)
+
+    c_octa = np.asarray(c_octa, dtype=float)
+    vec = c_octa[1:] - c_octa[0]
+
+    if twist:
+        a_ref, _, a_oppo, _ = tools.find_faces_octa(c_octa)
+        face = np.asarray(a_ref[0]) - 1
+        oppo = np.asarray(a_oppo[0]) - 1
+        axis = vec[face].mean(axis=0)
+        vec[oppo] = _rotate_about_axis(vec[oppo], axis, np.radians(twist))
+
+    length = np.linalg.norm(vec, axis=1)
+    direction = vec / length[:, np.newaxis]
+
+    if elongation:
+        axial = np.abs(direction @ direction[0]) > np.cos(np.radians(45))
+        length = np.where(axial, length * (1 + elongation), length)
+
+    length = length + rng.normal(scale=stretch, size=(n, 6))
+    direction = direction + rng.normal(scale=np.radians(angle), size=(n, 6, 3))
+    direction /= np.linalg.norm(direction, axis=-1, keepdims=True)
+
+    ligands = direction * length[..., np.newaxis]
+
+    if rotate:
+        ligands = ligands @ random_rotation(n, rng).transpose(0, 2, 1)
+
+    c_octas = np.concatenate((np.zeros((n, 1, 3)), ligands), axis=1)
+
+    return c_octas
+
+
+def make_supercell(n_sites, metals=("Fe", "Co", "Ni", "Mn"), ligand="O", bond=2.0, spacing=6.0,
+                   seed=None, **distortion):
+    """
+    Build large multi-metal structure of isolated perturbed octahedra on a cubic grid.
+
+    Parameters
+    ----------
+    n_sites : int
+        Number of octahedra (metal sites).
+    metals : list or tuple
+        Atomic symbols of metals, drawn at random for each site.
+    ligand : str
+        Atomic symbol of ligand atoms.
+    bond : float
+        Metal-ligand bond distance of template.
+        Default value is 2.0 Angstroms.
+    spacing : float
+        Distance between neighbouring metal centers.
+        Default value is 6.0 Angstroms.
+    seed : int, optional
+        Seed of random number generator.
+    distortion : dict
+        Keyword arguments passed to perturb_octa.
+
+    Returns
+    -------
+    a_full : list
+        Full atomic labels, 7 atoms per site with metal first.
+    c_full : array
+        Full atomic coordinates, shape (7 * n_sites, 3).
+
+    """
+    rng = np.random.default_rng(seed)
+
+    _, template = ideal_octa(bond)
+    c_octas = perturb_octa(template, n_sites, seed=rng.integers(2 ** 32), **distortion)
+
+    side = int(np.ceil(n_sites ** (1 / 3)))
+    grid = np.indices((side, side, side)).reshape(3, -1).T[:n_sites] * spacing
+    c_full = (c_octas + grid[:, np.newaxis, :]).reshape(-1, 3)
+
+    site_metal = rng.choice(list(metals), size=n_sites)
+    a_full = np.repeat(site_metal, 7).astype(object)
+    a_full[np.arange(7 * n_sites) % 7 != 0] = ligand
+
+    return a_full.tolist(), c_full
+
+
+def make_trajectory(c_full, n_frames, amplitude=0.05, seed=None):
+    """
+    Generate frames of a long trajectory as thermal displacements around a structure.
+
+    Frames are produced one at a time, so trajectories of any length use constant memory.
+    Frame i depends only on seed and i, so the same frames are produced every time.
+
+    Parameters
+    ----------
+    c_full : array
+        Atomic coordinates of reference structure, shape (n_atoms, 3).
+    n_frames : int
+        Number of frames.
+    amplitude : float
+        Standard deviation of atomic displacement in Angstrom.
+        Default value is 0.05.
+    seed : int, optional
+        Seed of random number generator.
+
+    Yields
+    ------
+    frame : array
+        Atomic coordinates of one frame, shape (n_atoms, 3).
+
+    """
+    c_full = np.asarray(c_full, dtype=float)
+    seed = 0 if seed is None else seed
+
+    for i in range(n_frames):
+        rng = np.random.default_rng([seed, i])
+        yield c_full + rng.normal(scale=amplitude, size=c_full.shape)
+
+
+def write_xyz(f, a_full, c_full, comment="Generated by OctaDist"):
+    """
+    Write structure to XYZ file.
+
+    Parameters
+    ----------
+    f : str
+        Output filename.
+    a_full : list
+        Full atomic labels.
+    c_full : array
+        Full atomic coordinates.
+    comment : str
+        Comment line.
+
+    Returns
+    -------
+    None : None
+
+    """
+    with open(f, "w") as file:
+        _write_xyz_frame(file, a_full, c_full, comment)
+
+
+def _write_xyz_frame(file, a_full, c_full, comment):
+    lines = [f"{len(a_full)}\n", f"{comment}\n"]
+    lines += [f"{a:<4}{x:16.8f}{y:16.8f}{z:16.8f}\n" for a, (x, y, z) in zip(a_full, c_full)]
+    file.writelines(lines)
+
+
+def write_xyz_trajectory(f, a_full, frames):
+    """
+    Write frames to multi-frame XYZ file, one frame at a time.
+
+    Parameters
+    ----------
+    f : str
+        Output filename.
+    a_full : list
+        Full atomic labels.
+    frames : iterable
+        Atomic coordinates of each frame, e.g. generator from make_trajectory.
+
+    Returns
+    -------
+    n_frames : int
+        Number of written frames.
+
+    """
+    n_frames = 0
+    with open(f, "w") as file:
+        for frame in frames:
+            _write_xyz_frame(file, a_full, frame, f"Frame {n_frames + 1}")
+            n_frames += 1
+
+    return n_frames
+
+
+def write_gaussian(f, a_full, c_full):
+    """
+    Write structure as minimal Gaussian output file with Standard orientation block.
+
+    Parameters
+    ----------
+    f : str
+        Output filename.
+    a_full : list
+        Full atomic labels.
+    c_full : array
+        Full atomic coordinates.
+
+    Returns
+    -------
+    None : None
+
+    """
+    dash = " " + "-" * 69 + "\n"
+    lines = [" Generated by OctaDist\n",
+             "                         Standard orientation:\n",
+             dash,
+             " Center     Atomic      Atomic             Coordinates (Angstroms)\n",
+             " Number     Number       Type             X           Y           Z\n",
+             dash]
+    lines += [f"{i + 1:>7}{elements.check_atom(a):>11}{0:>12}    {x:12.6f}{y:12.6f}{z:12.6f}\n"
+              for i, (a, (x, y, z)) in enumerate(zip(a_full, c_full))]
+    lines.append(dash)
+
+    with open(f, "w") as file:
+        file.writelines(lines)
+
+
+def write_nwchem(f, a_full, c_full):
+    """
+    Write structure as minimal NWChem output file of converged optimization.
+
+    Parameters
+    ----------
+    f : str
+        Output filename.
+    a_full : list
+        Full atomic labels.
+    c_full : array
+        Full atomic coordinates.
+
+    Returns
+    -------
+    None : None
+
+    """
+    lines = [f"          No. of atoms     :   {len(a_full)}\n",
+             "      ----------------------\n",
+             "      Optimization converged\n",
+             "      ----------------------\n"]
+    # The 1st line of coordinate is at 18 lines next to 'Optimization converged'
+    lines += ["\n"] * 14
+    lines += [" No.       Tag          Charge          X              Y              Z\n",
+              "---- ---------------- ---------- -------------- -------------- --------------\n"]
+    lines += [f"{i + 1:>4} {a:<16} {elements.check_atom(a):>10.4f} {x:14.8f} {y:14.8f} {z:14.8f}\n"
+              for i, (a, (x, y, z)) in enumerate(zip(a_full, c_full))]
+
+    with open(f, "w") as file:
+        file.writelines(lines)
+
+
+def write_orca(f, a_full, c_full):
+    """
+    Write structure as minimal ORCA output file.
+
+    Parameters
+    ----------
+    f : str
+        Output filename.
+    a_full : list
+        Full atomic labels.
+    c_full : array
+        Full atomic coordinates.
+
+    Returns
+    -------
+    None : None
+
+    """
+    lines = ["---------------------------------\n",
+             "CARTESIAN COORDINATES (ANGSTROEM)\n",
+             "---------------------------------\n"]
+    lines += [f"  {a:<4}{x:14.6f}{y:14.6f}{z:14.6f}\n" for a, (x, y, z) in zip(a_full, c_full)]
+    lines += ["\n", "----------------------------\n"]
+
+    with open(f, "w") as file:
+        file.writelines(lines)
+
+
+def write_qchem(f, a_full, c_full):
+    """
+    Write structure as minimal Q-Chem output file of converged optimization.
+
+    Parameters
+    ----------
+    f : str
+        Output filename.
+    a_full : list
+        Full atomic labels.
+    c_full : array
+        Full atomic coordinates.
+
+    Returns
+    -------
+    None : None
+
+    """
+    lines = ["******************************\n",
+             "**  OPTIMIZATION CONVERGED  **\n",
+             "******************************\n",
+             "                           Coordinates (Angstroms)\n",
+             "    ATOM                X               Y               Z\n",
+             "\n"]
+    lines += [f"{i + 1:>6}  {a:<4}{x:16.10f}{y:16.10f}{z:16.10f}\n"
+              for i, (a, (x, y, z)) in enumerate(zip(a_full, c_full))]
+    lines += ["\n", "Z-matrix Print:\n"]
+
+    with open(f, "w") as file:
+        file.writelines(lines)
+
+
+# File format name mapped to writer and file extension recognized by coord.extract_file
+WRITERS = {
+    "xyz": (write_xyz, ".xyz"),
+    "gaussian": (write_gaussian, ".log"),
+    "nwchem": (write_nwchem, ".out"),
+    "orca": (write_orca, ".out"),
+    "qchem": (write_qchem, ".out"),
+}
+
+
+def write_file(f, a_full, c_full, file_format="xyz"):
+    """
+    Write structure in any format supported by coord.extract_file.
+
+    Parameters
+    ----------
+    f : str
+        Output filename. Its extension must match the format (see WRITERS).
+    a_full : list
+        Full atomic labels.
+    c_full : array
+        Full atomic coordinates.
+    file_format : str
+        One of "xyz", "gaussian", "nwchem", "orca", and "qchem".
+        Default is "xyz".
+
+    Returns
+    -------
+    None : None
+
+    """
+    if file_format not in WRITERS:
+        raise ValueError(f"Unknown file format: {file_format}")
+
+    writer, _ = WRITERS[file_format]
+    writer(f, a_full, c_full)
@@ -0,0 +1,228 @@
+# OctaDist  Copyright (C) 2019  Rangsiman Ketkaew et al.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import numpy as np
+
+from octadist.src import profiler
+
+# All 15 pairs of ligand atoms
+_LIGAND_PAIRS = np.array(np.triu_indices(6, k=1)).T
+
+
+def _bonds(c_octa):
+    """
+    Metal-ligand vectors, bond distances, and unit bond vectors, shapes (..., 6, 3), (..., 6), (..., 6, 3).
+
+    """
+    v = c_octa[..., 1:, :] - c_octa[..., :1, :]
+    d = np.sqrt(np.einsum('...ij,...ij->...i', v, v))
+
+    return v, d, v / d[..., np.newaxis]
+
+
+def _bond_chain_rule(dd, u):
+    """
+    Turn derivatives with respect to the six bond distances into gradient with respect to coordinates.
+
+    """
+    grad = np.empty(u.shape[:-2] + (7, 3))
+    grad[..., 1:, :] = dd[..., np.newaxis] * u
+    grad[..., 0, :] = -grad[..., 1:, :].sum(axis=-2)
+
+    return grad
+
+
+def _output(value, grad, single, return_value):
+    if single:
+        value, grad = float(value[0]), grad[0]
+
+    if return_value:
+        return value, grad
+
+    return grad
+
+
+@profiler.stage("grad.zeta")
+def grad_zeta(c_octa, return_value=False):
+    """
+    Calculate gradient of zeta parameter with respect to atomic coordinates.
+
+    Zeta is not differentiable where a bond distance equals the mean distance;
+    there the derivative of the absolute value is taken as zero.
+
+    Parameters
+    ----------
+    c_octa : array
+        Atomic coordinates of octahedral structure, shape (7, 3) or (N, 7, 3).
+    return_value : bool
+        If True, also return zeta. Default is False.
+
+    Returns
+    -------
+    zeta : float or array
+        Zeta parameter, only if return_value is True.
+    grad : array
+        Derivatives of zeta with respect to coordinates, shape (7, 3) or (N, 7, 3).
+
+    See Also
+    --------
+    calc.calc_zeta : Calculate zeta parameter.
+
+    """
+    c_octa = np.asarray(c_octa, dtype=float)
+    single = c_octa.ndim == 2
+    c_octa = c_octa.reshape(-1, 7, 3)
+
+    _, d, u = _bonds(c_octa)
+    diff = d - d.mean(axis=-1, keepdims=True)
+    sign = np.sign(diff)
+
+    zeta = np.abs(diff).sum(axis=-1)
+    dd = sign - sign.mean(axis=-1, keepdims=True)
+
+    return _output(zeta, _bond_chain_rule(dd, u), single, return_value)
+
+
+@profiler.stage("grad.delta")
+def grad_delta(c_octa, return_value=False):
+    """
+    Calculate gradient of delta parameter with respect to atomic coordinates.
+
+    Parameters
+    ----------
+    c_octa : array
+        Atomic coordinates of octahedral structure, shape (7, 3) or (N, 7, 3).
+    return_value : bool
+        If True, also return delta. Default is False.
+
+    Returns
+    -------
+    delta : float or array
+        Delta parameter, only if return_value is True.
+    grad : array
+        Derivatives of delta with respect to coordinates, shape (7, 3) or (N, 7, 3).
+
+    See Also
+    --------
+    calc.calc_delta : Calculate delta parameter.
+
+    """
+    c_octa = np.asarray(c_octa, dtype=float)
+    single = c_octa.ndim == 2
+    c_octa = c_octa.reshape(-1, 7, 3)
+
+    _, d, u = _bonds(c_octa)
+    d_mean = d.mean(axis=-1, keepdims=True)
+    r = d / d_mean - 1
+
+    delta = np.mean(r ** 2, axis=-1)
+    dd = (r / d_mean - np.sum(r * d, axis=-1, keepdims=True) / (6 * d_mean ** 2)) / 3
+
+    return _output(delta, _bond_chain_rule(dd, u), single, return_value)
+
+
+@profiler.stage("grad.sigma")
+def grad_sigma(c_octa, return_value=False):
+    """
+    Calculate gradient of sigma parameter with respect to atomic coordinates.
+
+    The 12 smallest of the 15 ligand-metal-ligand angles are taken as cis angles,
+    as in calc.calc_sigma. Sigma is not differentiable where a cis angle is
+    exactly 90 degree or where cis and trans angles swap; there the derivative
+    of the absolute value is taken as zero.
+
+    Parameters
+    ----------
+    c_octa : array
+        Atomic coordinates of octahedral structure, shape (7, 3) or (N, 7, 3).
+    return_value : bool
+        If True, also return sigma. Default is False.
+
+    Returns
+    -------
+    sigma : float or array
+        Sigma parameter in degree, only if return_value is True.
+    grad : array
+        Derivatives of sigma with respect to coordinates in degree per Angstrom,
+        shape (7, 3) or (N, 7, 3).
+
+    See Also
+    --------
+    calc.calc_sigma : Calculate sigma parameter.
+
+    """
+    c_octa = np.asarray(c_octa, dtype=float)
+    single = c_octa.ndim == 2
+    c_octa = c_octa.reshape(-1, 7, 3)
+
+    _, d, u = _bonds(c_octa)
+    a, b = _LIGAND_PAIRS.T
+    ua, ub = u[:, a], u[:, b]
+
+    cos = np.clip(np.einsum('...ij,...ij->...i', ua, ub), -1.0, 1.0)
+    angle = np.degrees(np.arccos(cos))
+
+    # Cis angles are the 12 smallest, trans angles get zero weight
+    rank = np.argsort(np.argsort(angle, axis=-1, kind='stable'), axis=-1, kind='stable')
+    weight = np.where(rank < 12, -np.sign(90.0 - angle), 0.0)
+
+    sigma = np.sum(np.abs(90.0 - angle) * (rank < 12), axis=-1)
+
+    # d(angle)/d(ligand a) = -(u_b - cos u_a) / (d_a sin(angle)), in degree
+    sin = np.sqrt(1 - cos ** 2)
+    scale = np.divide(np.degrees(-weight), sin, out=np.zeros_like(sin), where=sin > 0)
+    ga = scale[..., np.newaxis] * (ub - cos[..., np.newaxis] * ua) / d[:, a, np.newaxis]
+    gb = scale[..., np.newaxis] * (ua - cos[..., np.newaxis] * ub) / d[:, b, np.newaxis]
+
+    grad = np.zeros(c_octa.shape)
+    for k in range(6):
+        grad[:, k + 1] = ga[:, a == k].sum(axis=1) + gb[:, b == k].sum(axis=1)
+    grad[:, 0] = -grad[:, 1:].sum(axis=1)
+
+    return _output(sigma, grad, single, return_value)
+
+
+def check_grad(func, grad, c_octa, h=1e-6):
+    """
+    Compare analytic gradient with central finite differences.
+
+    Parameters
+    ----------
+    func : function
+        Function of one octahedron, e.g. calc.calc_zeta.
+    grad : function
+        Gradient function, e.g. grad_zeta.
+    c_octa : array
+        Atomic coordinates of octahedral structure, shape (7, 3).
+    h : float
+        Step of finite differences in Angstrom. Default value is 1e-6.
+
+    Returns
+    -------
+    error : float
+        Largest absolute difference between analytic and numerical derivatives.
+
+    """
+    c_octa = np.asarray(c_octa, dtype=float)
+
+    numerical = np.empty((7, 3))
+    for i in range(7):
+        for j in range(3):
+            step = np.zeros((7, 3))
+            step[i, j] = h
+            numerical[i, j] = (func(c_octa + step) - func(c_octa - step)) / (2 * h)
+
+    return float(np.max(np.abs(grad(c_octa) - numerical)))
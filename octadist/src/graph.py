@@ -0,0 +1,158 @@
+# OctaDist  Copyright (C) 2019  Rangsiman Ketkaew et al.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import numpy as np
+import scipy.sparse
+import scipy.sparse.csgraph
+import scipy.spatial
+
+from octadist.src import elements, linear, profiler
+
+
+def find_bonds_covalent(fal, fcl, tolerance=0.4):
+    """
+    Find bonds from covalent radii of atoms.
+
+    Two atoms are bonded if their distance is not longer than the sum of
+    their covalent radii plus tolerance. Unlike the global cutoff of
+    tools.find_bonds_index, metal-ligand bonds are found too.
+
+    Parameters
+    ----------
+    fal : list
+        List of atomic labels of full complex.
+    fcl : list or array
+        List of atomic coordinates of full complex.
+    tolerance : float
+        Tolerance added to the sum of covalent radii.
+        Default value is 0.4 Angstroms.
+
+    Returns
+    -------
+    bond_index : array
+        Atom indices (i, j) of bonds with i < j, shape (M, 2).
+    bond_dist : array
+        Bond distances, shape (M,).
+
+    """
+    fcl = np.asarray(fcl, dtype=float).reshape(-1, 3)
+
+    number = np.array([elements.check_atom(atom) or 0 for atom in fal], dtype=int)
+    radii = elements.check_radii(number).astype(float)
+
+    tree = scipy.spatial.cKDTree(fcl)
+    bond_index = tree.query_pairs(2 * radii.max(initial=0) + tolerance, output_type='ndarray').reshape(-1, 2)
+    bond_index = bond_index[np.lexsort((bond_index[:, 1], bond_index[:, 0]))]
+
+    bond_dist = linear.euclidean_dist(fcl[bond_index[:, 0]], fcl[bond_index[:, 1]])
+    selected = bond_dist <= radii[bond_index[:, 0]] + radii[bond_index[:, 1]] + tolerance
+
+    return bond_index[selected], bond_dist[selected]
+
+
+def connectivity_matrix(bond_index, n_atoms):
+    """
+    Build sparse adjacency matrix of molecular graph.
+
+    Parameters
+    ----------
+    bond_index : array
+        Atom indices of bonds, shape (M, 2).
+    n_atoms : int
+        Number of atoms.
+
+    Returns
+    -------
+    adjacency : scipy.sparse.csr_matrix
+        Symmetric boolean adjacency matrix, shape (n_atoms, n_atoms).
+        Neighbours of atom i are adjacency.indices[adjacency.indptr[i]:adjacency.indptr[i + 1]].
+
+    """
+    bond_index = np.asarray(bond_index, dtype=int).reshape(-1, 2)
+
+    row = np.concatenate((bond_index[:, 0], bond_index[:, 1]))
+    col = np.concatenate((bond_index[:, 1], bond_index[:, 0]))
+    data = np.ones(len(row), dtype=bool)
+
+    return scipy.sparse.csr_matrix((data, (row, col)), shape=(n_atoms, n_atoms))
+
+
+@profiler.stage("find_fragments", arg=1)
+def find_fragments(fal, fcl, bond_index=None, tolerance=0.4):
+    """
+    Label the molecules (connected components of molecular graph) of complex.
+
+    Parameters
+    ----------
+    fal : list
+        List of atomic labels of full complex.
+    fcl : list or array
+        List of atomic coordinates of full complex.
+    bond_index : array, optional
+        Atom indices of bonds. If not given, bonds are found by :func:`find_bonds_covalent`.
+    tolerance : float
+        Tolerance of covalent bonds. Default value is 0.4 Angstroms.
+
+    Returns
+    -------
+    n_fragments : int
+        Number of fragments.
+    labels : array
+        Fragment of each atom, shape (N,).
+
+    """
+    if bond_index is None:
+        bond_index, _ = find_bonds_covalent(fal, fcl, tolerance)
+
+    adjacency = connectivity_matrix(bond_index, len(fal))
+    n_fragments, labels = scipy.sparse.csgraph.connected_components(adjacency, directed=False)
+
+    return n_fragments, labels
+
+
+def split_fragments(fal, fcl, bond_index=None, tolerance=0.4):
+    """
+    Split complex into fragments.
+
+    Parameters
+    ----------
+    fal : list
+        List of atomic labels of full complex.
+    fcl : list or array
+        List of atomic coordinates of full complex.
+    bond_index : array, optional
+        Atom indices of bonds. If not given, bonds are found by :func:`find_bonds_covalent`.
+    tolerance : float
+        Tolerance of covalent bonds. Default value is 0.4 Angstroms.
+
+    Returns
+    -------
+    fragments : list
+        List of (atomic labels, atomic coordinates) of each fragment,
+        in order of the first atom of fragment.
+
+    """
+    fcl = np.asarray(fcl, dtype=float).reshape(-1, 3)
+    n_fragments, labels = find_fragments(fal, fcl, bond_index, tolerance)
+
+    order = np.argsort(labels, kind='stable')
+    bounds = np.cumsum(np.bincount(labels, minlength=n_fragments))[:-1]
+
+    fragments = []
+    for index in np.split(order, bounds):
+        fragments.append(([fal[i] for i in index], fcl[index]))
+
+    return fragments
@@ -14,8 +14,46 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
+from math import sqrt, degrees, acos
+
 import numpy as np
-from math import sqrt, pow, degrees, acos
+
+
+def _dot(a, b):
+    """
+    Dot product over the last axis of two arrays of vectors with broadcasting.
+
+    Parameters
+    ----------
+    a : array
+        Vector or array of vectors, shape (..., n).
+    b : array
+        Vector or array of vectors, shape (..., n).
+
+    Returns
+    -------
+    float or array
+        Dot product, shape (...).
+
+    """
+    return np.einsum('...i,...i->...', a, b)
+
+
+def _angle_single(v1, v2):
+    """
+    Angle in degree between two single vectors given as lists of floats.
+
+    Plain Python arithmetic is several times faster than NumPy calls on 3-vectors,
+    which matters for per-octahedron loops such as calc_theta.
+
+    """
+    dot = sum(x * y for x, y in zip(v1, v2))
+    norm = sqrt(sum(x * x for x in v1) * sum(y * y for y in v2))
+
+    # NumPy division gives NaN with RuntimeWarning for zero vectors, as the array path does
+    cos = np.float64(dot) / norm
+
+    return degrees(acos(min(max(cos, -1.0), 1.0)))
 
 
 def norm_vector(v):
@@ -25,7 +63,7 @@ def norm_vector(v):
     Parameters
     ----------
     v : array
-        2D or 3D vector.
+        2D or 3D vector, or array of vectors of shape (..., 3).
 
     Returns
     -------
@@ -33,7 +71,11 @@ def norm_vector(v):
         Normalized vector.
 
     """
-    norm = v / np.linalg.norm(v)
+    v = np.asarray(v, dtype=float)
+    if v.ndim == 1:
+        return v / sqrt(v.dot(v))
+
+    norm = v / np.sqrt(_dot(v, v))[..., np.newaxis]
 
     return norm
 
@@ -44,54 +86,68 @@ def euclidean_dist(a, b):
 
     a = (x1, y1, z1) and b = (x2, y2, z2).
 
+    Arrays of points of shape (..., 3) are broadcast against each other.
+
     Parameters
     ----------
-    a : list
+    a : list or array
         Cartesian coordinate of point a.
-    b : list
+    b : list or array
         Cartesian coordinate of point b.
 
     Returns
     -------
-    float
+    float or array
         Distance between two points.
 
     """
-    return sqrt(sum([pow(a[i] - b[i], 2) for i in range(len(a))]))
+    a = np.asarray(a, dtype=float)
+    b = np.asarray(b, dtype=float)
+    if a.ndim == b.ndim == 1:
+        return sqrt(sum((x - y) ** 2 for x, y in zip(a.tolist(), b.tolist())))
+
+    diff = a - b
+
+    return np.sqrt(_dot(diff, diff))
 
 
 def angle_sign(v1, v2, direct):
     """
     Compute angle between two vectors with sign and return value in degree.
 
+    The sign is taken from the triple product v1.(v2 X direct),
+    which is the determinant of matrix [v1, v2, direct].
+
     Parameters
     ----------
     v1 : array
-        Vector in 3D space.
+        Vector in 3D space, or array of vectors of shape (..., 3).
     v2 : array
-        Vector in 3D space.
+        Vector in 3D space, or array of vectors of shape (..., 3).
     direct : array
         Vector that refers to orientation of the plane.
 
     Returns
     -------
-    angle : int or float
+    angle : int or float or array
         Angle between two vectors with sign.
 
     """
-    v1 = np.asarray(v1)
-    v2 = np.asarray(v2)
+    if np.ndim(v1) == np.ndim(v2) == np.ndim(direct) == 1:
+        v1, v2, direct = (np.asarray(v, dtype=float).tolist() for v in (v1, v2, direct))
+        angle = _angle_single(v1, v2)
+        triple = (v1[0] * (v2[1] * direct[2] - v2[2] * direct[1])
+                  + v1[1] * (v2[2] * direct[0] - v2[0] * direct[2])
+                  + v1[2] * (v2[0] * direct[1] - v2[1] * direct[0]))
+        return -angle if triple < 0 else angle
 
     v1 = norm_vector(v1)
     v2 = norm_vector(v2)
 
-    angle = np.degrees(np.arccos(np.clip(np.dot(v1, v2), -1.0, 1.0)))
-
-    matD = np.array([v1, v2, direct])
-    detD = np.linalg.det(matD)
+    angle = np.degrees(np.arccos(np.clip(_dot(v1, v2), -1.0, 1.0)))
 
-    if detD < 0:
-        angle = angle * -1
+    triple = _dot(v1, np.cross(v2, direct))
+    angle = np.where(triple < 0, -angle, angle)[()]
 
     return angle
 
@@ -103,23 +159,23 @@ def angle_btw_vectors(v1, v2):
     Parameters
     ----------
     v1 : array
-        Vector in 3D space.
+        Vector in 3D space, or array of vectors of shape (..., 3).
     v2 : array
-        Vector in 3D space.
+        Vector in 3D space, or array of vectors of shape (..., 3).
 
     Returns
     -------
-    angle : int or float
+    angle : int or float or array
         Angle between two vectors.
 
     """
-    v1 = np.asarray(v1)
-    v2 = np.asarray(v2)
+    if np.ndim(v1) == np.ndim(v2) == 1:
+        return _angle_single(np.asarray(v1, dtype=float).tolist(), np.asarray(v2, dtype=float).tolist())
 
     v1 = norm_vector(v1)
     v2 = norm_vector(v2)
 
-    angle = np.degrees(np.arccos(np.clip(np.dot(v1, v2), -1.0, 1.0)))
+    angle = np.degrees(np.arccos(np.clip(_dot(v1, v2), -1.0, 1.0)))
 
     return angle
 
@@ -132,23 +188,23 @@ def angle_btw_planes(a1, b1, c1, a2, b2, c2):
 
     Parameters
     ----------
-    a1, b1, c1 : float
+    a1, b1, c1 : float or array
         Coefficient of the equation of plane 1.
-    a2, b2, c2 : float
+    a2, b2, c2 : float or array
         Coefficient of the equation of plane 2.
 
     Returns
     -------
-    angle : int or float
+    angle : int or float or array
         Angle between 2 planes.
 
     """
-    d = (a1 * a2 + b1 * b2 + c1 * c2)
-    e1 = sqrt(a1 * a1 + b1 * b1 + c1 * c1)
-    e2 = sqrt(a2 * a2 + b2 * b2 + c2 * c2)
-    d = d / (e1 * e2)
+    n1 = np.stack(np.broadcast_arrays(a1, b1, c1), axis=-1).astype(float)
+    n2 = np.stack(np.broadcast_arrays(a2, b2, c2), axis=-1).astype(float)
+
+    d = _dot(n1, n2) / np.sqrt(_dot(n1, n1) * _dot(n2, n2))
 
-    angle = degrees(acos(d))
+    angle = np.degrees(np.arccos(d))
 
     return angle
 
@@ -164,25 +220,23 @@ def triangle_area(a, b, c):
     Parameters
     ----------
     a : list or array
-        3D Coordinate of point.
+        3D Coordinate of point, or array of points of shape (..., 3).
     b : list or array
-        3D Coordinate of point.
+        3D Coordinate of point, or array of points of shape (..., 3).
     c : list or array
-        3D Coordinate of point.
+        3D Coordinate of point, or array of points of shape (..., 3).
 
     Returns
     -------
-    area : int or float
+    area : int or float or array
         The triangle area.
 
     """
+    a = np.asarray(a, dtype=float)
     ab = b - a
     ac = c - a
-    value = (pow(np.dot(ab[1], ac[2]) - np.dot(ab[2], ac[1]), 2) +
-             pow(np.dot(ab[2], ac[0]) - np.dot(ab[0], ac[2]), 2) +
-             pow(np.dot(ab[0], ac[1]) - np.dot(ab[1], ac[0]), 2)
-             )
 
-    area = sqrt(value) / 2
+    cross = np.cross(ab, ac)
+    area = np.sqrt(_dot(cross, cross)) / 2
 
     return area
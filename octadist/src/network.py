@@ -0,0 +1,274 @@
+# OctaDist  Copyright (C) 2019  Rangsiman Ketkaew et al.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import collections
+
+import numpy as np
+import scipy.spatial
+
+from octadist.src import coord, linear, profiler
+
+TiltNetwork = collections.namedtuple("TiltNetwork", ["pairs", "bridge", "angle", "tilt", "axis", "rotation", "in_phase"])
+
+
+def find_octa_index(a_full, c_full):
+    """
+    Find six nearest atoms of every metal atom in complex using KD-tree.
+
+    Parameters
+    ----------
+    a_full : list
+        Full atomic labels of complex.
+    c_full : list or array
+        Full atomic coordinates of complex.
+
+    Returns
+    -------
+    m_index : list
+        Indices (0-based) of metal atoms in a_full.
+    c_octas : array
+        Atomic coordinates of octahedral structures, shape (M, 7, 3).
+    l_index : array
+        Indices (0-based) of ligand atoms in a_full, shape (M, 6).
+
+    """
+    c_full = np.asarray(c_full, dtype=float)
+    m_index = coord.find_metal_index(a_full)
+
+    tree = scipy.spatial.cKDTree(c_full)
+    _, index = tree.query(c_full[m_index], k=7)
+
+    # Nearest atom of a metal is the metal itself
+    l_index = index[:, 1:]
+    c_octas = c_full[index]
+
+    return m_index, c_octas, l_index
+
+
+def find_bridges(l_index):
+    """
+    Find ligand atoms shared by two octahedra.
+
+    A ligand shared by more than two octahedra gives a bridge for every pair of them.
+
+    Bridges are found by atom index, so periodic cells must hold at least two metals
+    along every lattice direction. Otherwise an octahedron lists two images of the
+    same atom (e.g. both trans oxygens of a 1x1x1 perovskite cell), and these links
+    of an octahedron to its own image are left out.
+
+    Parameters
+    ----------
+    l_index : array
+        Indices of ligand atoms of octahedra, shape (M, 6).
+        Octahedra sharing a corner have the same index at one position.
+
+    Returns
+    -------
+    pairs : array
+        Indices of the two octahedra of each bridge, shape (P, 2).
+    slots : array
+        Positions (0-5) of the bridging ligand in the two octahedra, shape (P, 2).
+    bridge : array
+        Index of bridging atom, shape (P,).
+
+    """
+    l_index = np.asarray(l_index, dtype=int)
+    flat = l_index.ravel()
+
+    order = np.argsort(flat, kind='stable')
+    sorted_flat = flat[order]
+
+    # Pair every entry with all later entries of the same atom
+    end = np.searchsorted(sorted_flat, sorted_flat, side='right')
+    counts = end - np.arange(len(flat)) - 1
+    a = np.repeat(np.arange(len(flat)), counts)
+    b = a + 1 + np.arange(len(a)) - np.repeat(np.cumsum(counts) - counts, counts)
+
+    first, second = order[a], order[b]
+
+    # Two images of one atom in the same octahedron
+    keep = first // 6 != second // 6
+    first, second = first[keep], second[keep]
+
+    pairs = np.column_stack((first // 6, second // 6))
+    slots = np.column_stack((first % 6, second % 6))
+
+    return pairs, slots, flat[first]
+
+
+def orientation(c_octas, axes=None):
+    """
+    Find orientation of octahedra relative to reference axes.
+
+    The ligands furthest along and against each reference axis define
+    the local axes of octahedron, which are then made orthonormal.
+
+    Parameters
+    ----------
+    c_octas : array
+        Atomic coordinates of octahedral structures, shape (M, 7, 3).
+    axes : array, optional
+        Reference axes as rows, e.g. pseudo-cubic directions. Default is x, y, and z.
+
+    Returns
+    -------
+    rot : array
+        Rotation matrices whose columns are the local axes of octahedra
+        in the frame of reference axes, shape (M, 3, 3).
+
+    """
+    c_octas = np.asarray(c_octas, dtype=float).reshape(-1, 7, 3)
+    axes = np.eye(3) if axes is None else linear.norm_vector(np.asarray(axes, dtype=float))
+
+    v = (c_octas[:, 1:] - c_octas[:, :1]) @ axes.T
+    v = linear.norm_vector(v)
+
+    rows = np.arange(len(v))[:, np.newaxis]
+    plus = v[rows, np.argmax(v, axis=1), :]
+    minus = v[rows, np.argmin(v, axis=1), :]
+    local = (plus - minus).transpose(0, 2, 1)
+
+    u, _, vt = np.linalg.svd(local)
+    d = np.sign(np.linalg.det(u @ vt))
+    u[..., -1] *= d[:, np.newaxis]
+
+    return u @ vt
+
+
+def rotation_angles(rot):
+    """
+    Calculate rotation angles of octahedra about each reference axis.
+
+    Parameters
+    ----------
+    rot : array
+        Rotation matrices from :func:`orientation`, shape (M, 3, 3).
+
+    Returns
+    -------
+    angle : array
+        Rotation angles in degree about x, y, and z, shape (M, 3).
+
+    """
+    angle = np.empty(rot.shape[:-2] + (3,))
+    for k in range(3):
+        i, j = (k + 1) % 3, (k + 2) % 3
+        angle[..., k] = np.arctan2(rot[..., j, i] - rot[..., i, j], rot[..., i, i] + rot[..., j, j])
+
+    return np.degrees(angle)
+
+
+@profiler.stage("tilt_network")
+def tilt_network(c_octas, l_index, axes=None):
+    """
+    Calculate tilts and rotations between corner-sharing octahedra.
+
+    For each bridge M1-X-M2, the bridge angle, the tilt (180 minus bridge angle),
+    the reference axis closest to M1-M2, and the rotation angle of both octahedra
+    about that axis are calculated. Neighbours along an axis that rotate in the same
+    sense are in-phase (+ in Glazer notation), otherwise anti-phase (-).
+
+    Parameters
+    ----------
+    c_octas : array
+        Atomic coordinates of octahedral structures, shape (M, 7, 3).
+        For periodic structures use unwrapped octahedra from extract_all_octa_pbc.
+    l_index : array
+        Indices of ligand atoms of octahedra, shape (M, 6).
+    axes : array, optional
+        Reference (pseudo-cubic) axes as rows. Default is x, y, and z.
+
+    Returns
+    -------
+    network : TiltNetwork
+        Named tuple of arrays, one row per bridge:
+        pairs (P, 2), bridge (P,), angle (P,), tilt (P,), axis (P,),
+        rotation (P, 2), and in_phase (P,).
+
+    Examples
+    --------
+    >>> m_index, a_octas, c_octas, l_index = extract_all_octa_pbc(a_full, c_full, lattice)
+    >>> network = tilt_network(c_octas, l_index)
+    >>> glazer(network)
+    'a-a-c+'
+
+    """
+    c_octas = np.asarray(c_octas, dtype=float).reshape(-1, 7, 3)
+    axes = np.eye(3) if axes is None else linear.norm_vector(np.asarray(axes, dtype=float))
+
+    pairs, slots, bridge = find_bridges(l_index)
+
+    # Vectors from metals to bridging ligand
+    d1 = c_octas[pairs[:, 0], slots[:, 0] + 1] - c_octas[pairs[:, 0], 0]
+    d2 = c_octas[pairs[:, 1], slots[:, 1] + 1] - c_octas[pairs[:, 1], 0]
+
+    angle = linear.angle_btw_vectors(-d1, -d2)
+
+    link = (d1 - d2) @ axes.T
+    axis = np.argmax(np.abs(link), axis=1)
+
+    angles = rotation_angles(orientation(c_octas, axes))
+    rotation = np.column_stack((angles[pairs[:, 0], axis], angles[pairs[:, 1], axis]))
+    in_phase = np.sign(rotation[:, 0]) == np.sign(rotation[:, 1])
+
+    return TiltNetwork(pairs, bridge, angle, 180 - angle, axis, rotation, in_phase)
+
+
+def glazer(network, tol=1.0):
+    """
+    Summarize tilt network in Glazer notation.
+
+    Per axis, the magnitude is the mean absolute rotation about that axis
+    and the sign is the majority phase of neighbours linked along it.
+    Axes whose magnitudes agree within tol get the same letter.
+
+    Parameters
+    ----------
+    network : TiltNetwork
+        Result of :func:`tilt_network`.
+    tol : float
+        Rotations smaller than tol (degree) count as zero. Default value is 1.0.
+
+    Returns
+    -------
+    symbol : str
+        Glazer symbol, e.g. "a-a-c+" or "a0a0a0".
+
+    """
+    symbol = ""
+    magnitude = []
+    for k in range(3):
+        mask = network.axis == k
+        if not np.any(mask):
+            mag = 0.0
+            phase = True
+        else:
+            mag = np.mean(np.abs(network.rotation[mask]))
+            phase = np.mean(network.in_phase[mask]) >= 0.5
+
+        letter = "abc"[k]
+        for j, m in enumerate(magnitude):
+            if abs(m - mag) < tol:
+                letter = symbol[2 * j]
+                break
+        magnitude.append(mag)
+
+        if mag < tol:
+            symbol += letter + "0"
+        else:
+            symbol += letter + ("+" if phase else "-")
+
+    return symbol
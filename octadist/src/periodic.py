@@ -0,0 +1,562 @@
+# OctaDist  Copyright (C) 2019  Rangsiman Ketkaew et al.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import itertools
+
+import numpy as np
+import scipy.spatial
+
+from octadist.src import coord, profiler
+
+# The 27 shifts of a cell to itself and its neighbours
+_SHIFTS = np.array(list(itertools.product([-1, 0, 1], repeat=3)))
+
+
+def cart_to_frac(c_full, lattice):
+    """
+    Convert Cartesian coordinates to fractional coordinates.
+
+    Parameters
+    ----------
+    c_full : array
+        Cartesian coordinates, shape (..., 3).
+    lattice : array
+        Lattice vectors a, b, and c as rows, shape (3, 3).
+
+    Returns
+    -------
+    frac : array
+        Fractional coordinates, shape (..., 3).
+
+    """
+    return np.asarray(c_full, dtype=float) @ np.linalg.inv(lattice)
+
+
+def frac_to_cart(frac, lattice):
+    """
+    Convert fractional coordinates to Cartesian coordinates.
+
+    Parameters
+    ----------
+    frac : array
+        Fractional coordinates, shape (..., 3).
+    lattice : array
+        Lattice vectors a, b, and c as rows, shape (3, 3).
+
+    Returns
+    -------
+    c_full : array
+        Cartesian coordinates, shape (..., 3).
+
+    """
+    return np.asarray(frac, dtype=float) @ np.asarray(lattice, dtype=float)
+
+
+def cell_to_lattice(a, b, c, alpha=90.0, beta=90.0, gamma=90.0):
+    """
+    Convert cell parameters to lattice vectors.
+
+    Lattice vector a is put along x axis and b in xy plane.
+
+    Parameters
+    ----------
+    a, b, c : float
+        Cell lengths in Angstrom.
+    alpha, beta, gamma : float
+        Cell angles in degree.
+
+    Returns
+    -------
+    lattice : array
+        Lattice vectors a, b, and c as rows, shape (3, 3).
+
+    """
+    cos_a, cos_b, cos_g = np.cos(np.radians([alpha, beta, gamma]))
+    sin_g = np.sin(np.radians(gamma))
+
+    cy = (cos_a - cos_b * cos_g) / sin_g
+    cz = np.sqrt(1 - cos_b ** 2 - cy ** 2)
+
+    return np.array([[a, 0, 0],
+                     [b * cos_g, b * sin_g, 0],
+                     [c * cos_b, c * cy, c * cz]])
+
+
+def cell_widths(lattice):
+    """
+    Find distances between opposite faces of unit cell.
+
+    Parameters
+    ----------
+    lattice : array
+        Lattice vectors a, b, and c as rows, shape (3, 3).
+
+    Returns
+    -------
+    width : array
+        Width of unit cell perpendicular to bc, ca, and ab planes.
+
+    """
+    a, b, c = np.asarray(lattice, dtype=float)
+    volume = abs(np.dot(a, np.cross(b, c)))
+
+    return volume / np.linalg.norm([np.cross(b, c), np.cross(c, a), np.cross(a, b)], axis=1)
+
+
+def minimum_image(d_frac, lattice):
+    """
+    Find the shortest periodic image of fractional displacement vectors.
+
+    Rounding fractional displacements is exact only for orthogonal cells,
+    so the 27 images around the rounded one are checked as well.
+
+    Parameters
+    ----------
+    d_frac : array
+        Fractional displacement vectors, shape (K, 3).
+    lattice : array
+        Lattice vectors a, b, and c as rows, shape (3, 3).
+
+    Returns
+    -------
+    d_cart : array
+        Cartesian displacement vectors of the nearest images, shape (K, 3).
+    dist : array
+        Length of the displacement vectors, shape (K,).
+
+    """
+    d_frac = d_frac - np.round(d_frac)
+    images = frac_to_cart(d_frac[:, np.newaxis, :] + _SHIFTS, lattice)
+    dist2 = np.einsum('kij,kij->ki', images, images)
+
+    best = np.argmin(dist2, axis=1)
+    rows = np.arange(len(d_frac))
+
+    return images[rows, best], np.sqrt(dist2[rows, best])
+
+
+def images_within(d_frac, lattice, cutoff):
+    """
+    Find all periodic images of fractional displacement vectors within cutoff.
+
+    Unlike minimum image, one displacement can give several images
+    when unit cell is smaller than twice the cutoff, e.g. the two
+    trans oxygens of a perovskite cell are images of the same atom.
+
+    Parameters
+    ----------
+    d_frac : array
+        Fractional displacement vectors, shape (K, 3).
+    lattice : array
+        Lattice vectors a, b, and c as rows, shape (3, 3).
+    cutoff : float
+        Search radius in Angstrom.
+
+    Returns
+    -------
+    index : array
+        Row of d_frac that each image comes from.
+    d_cart : array
+        Cartesian displacement vectors of images.
+    dist : array
+        Length of the displacement vectors.
+
+    """
+    n_max = np.maximum(np.floor(cutoff / cell_widths(lattice) + 0.5).astype(int), 1)
+    shifts = np.array(list(itertools.product(*[range(-n, n + 1) for n in n_max])))
+
+    d_frac = d_frac - np.round(d_frac)
+    images = frac_to_cart(d_frac[:, np.newaxis, :] + shifts, lattice)
+    dist = np.sqrt(np.einsum('kij,kij->ki', images, images))
+
+    index, shift = np.nonzero(dist <= cutoff)
+
+    return index, images[index, shift], dist[index, shift]
+
+
+class CellList:
+    """
+    Cell list of atoms in periodic unit cell.
+
+    The cell is divided into bins at least as wide as cutoff along each
+    lattice direction, so all neighbours of an atom within cutoff lie
+    in its own bin or the 26 bins around it.
+
+    Parameters
+    ----------
+    c_full : array
+        Cartesian coordinates of all atoms in unit cell, shape (N, 3).
+    lattice : array
+        Lattice vectors a, b, and c as rows, shape (3, 3).
+    cutoff : float
+        Search radius in Angstrom.
+
+    """
+
+    def __init__(self, c_full, lattice, cutoff):
+        self.lattice = np.asarray(lattice, dtype=float)
+        self.cutoff = cutoff
+
+        self.frac = cart_to_frac(c_full, self.lattice).reshape(-1, 3)
+        self.frac = self.frac - np.floor(self.frac)
+
+        self.n_bins = np.maximum(np.floor(cell_widths(self.lattice) / cutoff).astype(int), 1)
+
+        self.bin_xyz = np.minimum((self.frac * self.n_bins).astype(int), self.n_bins - 1)
+        bin_id = np.ravel_multi_index(self.bin_xyz.T, self.n_bins)
+
+        self.order = np.argsort(bin_id, kind='stable')
+        counts = np.bincount(bin_id, minlength=np.prod(self.n_bins))
+        self.start = np.concatenate(([0], np.cumsum(counts)))
+
+    def candidates(self, frac_point):
+        """
+        Find atoms in the bin of a point and its neighbouring bins.
+
+        Parameters
+        ----------
+        frac_point : array
+            Fractional coordinate of point.
+
+        Returns
+        -------
+        index : array
+            Indices of candidate atoms, without duplicates.
+
+        """
+        bin_xyz = (np.asarray(frac_point) % 1.0 * self.n_bins).astype(int)
+        neighbor = (bin_xyz + _SHIFTS) % self.n_bins
+        bin_id = np.unique(np.ravel_multi_index(neighbor.T, self.n_bins))
+
+        index = np.concatenate([self.order[self.start[b]:self.start[b + 1]] for b in bin_id])
+
+        return index
+
+    def neighbors(self, i, cutoff=None):
+        """
+        Find all periodic images of atoms within cutoff from atom i.
+
+        Parameters
+        ----------
+        i : int
+            Index of atom.
+        cutoff : float, optional
+            Search radius, not larger than the cutoff of cell list.
+
+        Returns
+        -------
+        index : array
+            Indices of neighbouring atoms, sorted by distance.
+            An atom appears more than once if several of its images are within cutoff.
+        d_cart : array
+            Cartesian displacement vectors from atom i to its neighbours.
+        dist : array
+            Distances to neighbours.
+
+        """
+        cutoff = self.cutoff if cutoff is None else cutoff
+
+        index = self.candidates(self.frac[i])
+        k, d_cart, dist = images_within(self.frac[index] - self.frac[i], self.lattice, cutoff)
+        index = index[k]
+
+        # Atom i itself at zero displacement
+        keep = dist > 1e-8
+        order = np.argsort(dist[keep], kind='stable')
+
+        return index[keep][order], d_cart[keep][order], dist[keep][order]
+
+    def within(self, frac_points, cutoff=None):
+        """
+        Find all periodic images of atoms within cutoff of many points at once.
+
+        Bins are visited by their unwrapped index (bin of point plus step),
+        which gives both the bin to read and the lattice shift of its atoms,
+        so every image is generated once without copying atoms. With bins narrower
+        than cutoff (cells thinner than cutoff), more than one step is taken.
+
+        Parameters
+        ----------
+        frac_points : array
+            Fractional coordinates of points, shape (P, 3).
+        cutoff : float, optional
+            Search radius. Default is the cutoff of cell list.
+
+        Returns
+        -------
+        row : array
+            Row in frac_points of the point of each pair.
+        index : array
+            Index of atom of each pair.
+        d_cart : array
+            Cartesian displacement vectors from point to atom.
+        dist : array
+            Distances of pairs.
+
+        """
+        cutoff = self.cutoff if cutoff is None else cutoff
+        frac_points = np.asarray(frac_points, dtype=float).reshape(-1, 3) % 1.0
+
+        n_steps = np.ceil(cutoff * self.n_bins / cell_widths(self.lattice)).astype(int)
+        steps = np.array(list(itertools.product(*[range(-n, n + 1) for n in n_steps])))
+
+        bin_xyz = np.minimum((frac_points * self.n_bins).astype(int), self.n_bins - 1)
+        target = bin_xyz[:, np.newaxis, :] + steps
+        shift = (target // self.n_bins).reshape(-1, 3)
+        bin_id = np.ravel_multi_index((target % self.n_bins).reshape(-1, 3).T, self.n_bins)
+
+        # Expand every (point, bin) into the atoms of that bin
+        counts = self.start[bin_id + 1] - self.start[bin_id]
+        first = np.repeat(self.start[bin_id] - np.cumsum(counts) + counts, counts)
+        index = self.order[first + np.arange(len(first))]
+        row = np.repeat(np.arange(len(target) * len(steps)) // len(steps), counts)
+
+        d_frac = self.frac[index] + np.repeat(shift, counts, axis=0) - frac_points[row]
+        d_cart = frac_to_cart(d_frac, self.lattice)
+        dist = np.sqrt(np.einsum('ij,ij->i', d_cart, d_cart))
+
+        keep = dist <= cutoff
+
+        return row[keep], index[keep], d_cart[keep], dist[keep]
+
+    def neighbor_pairs(self, centers, cutoff=None):
+        """
+        Find all periodic images of atoms within cutoff from many atoms at once.
+
+        Parameters
+        ----------
+        centers : array
+            Indices of center atoms.
+        cutoff : float, optional
+            Search radius. Default is the cutoff of cell list.
+
+        Returns
+        -------
+        row : array
+            Position in centers of the center atom of each pair.
+        index : array
+            Index of neighbouring atom of each pair.
+        d_cart : array
+            Cartesian displacement vectors from center atom to neighbour.
+        dist : array
+            Distances of pairs.
+
+        See Also
+        --------
+        within : Search around arbitrary points.
+
+        """
+        row, index, d_cart, dist = self.within(self.frac[np.asarray(centers, dtype=int)], cutoff)
+
+        # Center atom itself at zero displacement
+        keep = dist > 1e-8
+
+        return row[keep], index[keep], d_cart[keep], dist[keep]
+
+
+def padded_images(c_full, lattice, cutoff):
+    """
+    Add periodic images of atoms lying within cutoff outside of unit cell.
+
+    Every atom of the cell then has all its neighbours within cutoff
+    among the returned points, so non-periodic search (e.g. KD-tree) can be used.
+    Only a skin of thickness cutoff is added instead of 26 neighbouring cells.
+
+    Parameters
+    ----------
+    c_full : array
+        Cartesian coordinates of all atoms in unit cell, shape (N, 3).
+    lattice : array
+        Lattice vectors a, b, and c as rows, shape (3, 3).
+    cutoff : float
+        Thickness of skin in Angstrom.
+
+    Returns
+    -------
+    index : array
+        Index of atom of unit cell that each point is an image of.
+    c_image : array
+        Cartesian coordinates of points, atoms of unit cell (wrapped) first.
+
+    """
+    lattice = np.asarray(lattice, dtype=float)
+    frac = cart_to_frac(c_full, lattice).reshape(-1, 3)
+    frac = frac - np.floor(frac)
+
+    pad = cutoff / cell_widths(lattice)
+    n_max = np.ceil(pad).astype(int)
+    shifts = sorted(itertools.product(*[range(-n, n + 1) for n in n_max]), key=lambda x: x != (0, 0, 0))
+
+    index, images = [], []
+    for shift in shifts:
+        image = frac + shift
+        inside = np.all((image >= -pad) & (image < 1 + pad), axis=1)
+        index.append(np.flatnonzero(inside))
+        images.append(image[inside])
+
+    return np.concatenate(index), frac_to_cart(np.concatenate(images), lattice)
+
+
+def _nearest_six(a_full, c_full, lattice, m_index, cutoff):
+    """
+    Find six nearest periodic neighbours of the metal atoms with 0-based indices m_index.
+
+    """
+    c_full = np.asarray(c_full, dtype=float)
+    lattice = np.asarray(lattice, dtype=float)
+
+    cell = CellList(c_full, lattice, cutoff)
+
+    a_octas = []
+    c_octas = np.empty((len(m_index), 7, 3))
+    l_index = np.empty((len(m_index), 6), dtype=int)
+
+    for n, i in enumerate(m_index):
+        index, d_cart, _ = cell.neighbors(i)
+
+        # Too few atoms within cutoff, widen the search over all atoms of the cell
+        radius = cutoff
+        while len(index) < 6:
+            radius *= 2
+            k, d_cart, dist = images_within(cell.frac - cell.frac[i], lattice, radius)
+            keep = dist > 1e-8
+            order = np.argsort(dist[keep], kind='stable')
+            index, d_cart = k[keep][order], d_cart[keep][order]
+
+        c_octas[n, 0] = c_full[i]
+        c_octas[n, 1:] = c_full[i] + d_cart[:6]
+        l_index[n] = index[:6]
+        a_octas.append([a_full[i]] + [a_full[j] for j in index[:6]])
+
+    return a_octas, c_octas, l_index
+
+
+@profiler.stage("extract_octa_pbc", arg=1)
+def extract_octa_pbc(a_full, c_full, lattice, m_index=1, cutoff=3.5):
+    """
+    Extract octahedral structure of metal atom in periodic crystal structure.
+
+    Ligands are searched with a cell list under minimum image convention,
+    so octahedra that cross the cell boundary come out whole (unwrapped)
+    without building a supercell.
+
+    Parameters
+    ----------
+    a_full : list
+        Atomic labels of all atoms in unit cell.
+    c_full : list or array
+        Cartesian coordinates of all atoms in unit cell.
+    lattice : array
+        Lattice vectors a, b, and c as rows, shape (3, 3).
+    m_index : int
+        The number of metal center atom - default is 1.
+    cutoff : float
+        Search radius of cell list. If fewer than six atoms are found,
+        the radius is doubled until six are found.
+        Default value is 3.5 Angstroms.
+
+    Returns
+    -------
+    a_octa : list
+        Atomic labels of octahedral structure.
+    c_octa : array
+        Atomic coordinates of octahedral structure, shape (7, 3).
+
+    See Also
+    --------
+    coord.extract_octa : Extract octahedral structure of isolated molecule.
+
+    """
+    metals = coord.find_metal_index(a_full)
+
+    if m_index > len(metals):
+        print("Error: the index of metal you defined is greater than the total number of metal in complex.")
+        return 1
+
+    a_octas, c_octas, _ = _nearest_six(a_full, c_full, lattice, [metals[m_index - 1]], cutoff)
+
+    return a_octas[0], c_octas[0]
+
+
+@profiler.stage("extract_all_octa_pbc", arg=1)
+def extract_all_octa_pbc(a_full, c_full, lattice, cutoff=3.5, block=4096):
+    """
+    Extract octahedral structures of all metal atoms in periodic crystal structure.
+
+    One cell list is built and the neighbours of a block of metals are found
+    together (see :meth:`CellList.neighbor_pairs`), without supercell or copies
+    of atoms.
+
+    Parameters
+    ----------
+    a_full : list
+        Atomic labels of all atoms in unit cell.
+    c_full : list or array
+        Cartesian coordinates of all atoms in unit cell.
+    lattice : array
+        Lattice vectors a, b, and c as rows, shape (3, 3).
+    cutoff : float
+        Search radius of cell list.
+        Default value is 3.5 Angstroms.
+    block : int
+        Number of metals searched at once. Default value is 4096.
+
+    Returns
+    -------
+    m_index : list
+        Indices (0-based) of metal atoms in a_full.
+    a_octas : list
+        Atomic labels of octahedral structures.
+    c_octas : array
+        Atomic coordinates of octahedral structures, shape (M, 7, 3).
+    l_index : array
+        Indices (0-based) of ligand atoms in a_full, shape (M, 6).
+
+    """
+    m_index = coord.find_metal_index(a_full)
+
+    c_full = np.asarray(c_full, dtype=float)
+    cell = CellList(c_full, lattice, cutoff)
+
+    c_octas = np.empty((len(m_index), 7, 3))
+    l_index = np.empty((len(m_index), 6), dtype=int)
+    found = np.zeros(len(m_index), dtype=bool)
+
+    for b in range(0, len(m_index), block):
+        centers = np.asarray(m_index[b:b + block], dtype=int)
+        row, index, d_cart, dist = cell.neighbor_pairs(centers)
+
+        # Six nearest neighbours of each metal
+        order = np.lexsort((dist, row))
+        row, index, d_cart = row[order], index[order], d_cart[order]
+        counts = np.bincount(row, minlength=len(centers))
+        first = np.cumsum(counts) - counts
+
+        ok = np.flatnonzero(counts >= 6)
+        take = first[ok, np.newaxis] + np.arange(6)
+        c_octas[b + ok, 0] = c_full[centers[ok]]
+        c_octas[b + ok, 1:] = c_full[centers[ok], np.newaxis, :] + d_cart[take]
+        l_index[b + ok] = index[take]
+        found[b + ok] = True
+
+    # Fewer than six atoms within cutoff
+    rest = np.flatnonzero(~found)
+    if len(rest):
+        _, c_octas[rest], l_index[rest] = _nearest_six(a_full, c_full, lattice, [m_index[i] for i in rest], cutoff)
+
+    a_octas = [[a_full[i]] + [a_full[j] for j in l] for i, l in zip(m_index, l_index)]
+
+    return m_index, a_octas, c_octas, l_index
@@ -58,3 +58,47 @@ def find_eq_of_plane(x, y, z):
     d = np.dot(cross_vector, z)
 
     return a, b, c, d
+
+
+def find_eq_of_plane_batch(x, y, z, out=None):
+    """
+    Find the equations of many planes at once, each defined by three points.
+
+    This is the array version of find_eq_of_plane. Coordinates of shape (..., 3)
+    are broadcast against each other and the coefficients are stacked into
+    the last axis in the order of (a, b, c, d), where ax + by + cz = d.
+
+    Parameters
+    ----------
+    x : list or array
+        3D Coordinates of first points, shape (..., 3).
+    y : list or array
+        3D Coordinates of second points, shape (..., 3).
+    z : list or array
+        3D Coordinates of third points, shape (..., 3).
+    out : array, optional
+        Array of shape (..., 4) to store the result in.
+        If not given, a new array is allocated.
+
+    Returns
+    -------
+    out : array
+        Coefficients of the equations of the planes, shape (..., 4).
+
+    See Also
+    --------
+    find_eq_of_plane : Find the equation of single plane.
+
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    z = np.asarray(z, dtype=float)
+
+    if out is None:
+        shape = np.broadcast_shapes(x.shape, y.shape, z.shape)[:-1] + (4,)
+        out = np.empty(shape)
+
+    out[..., :3] = np.cross(z - x, y - x)
+    np.einsum('...i,...i->...', out[..., :3], z, out=out[..., 3])
+
+    return out
@@ -0,0 +1,231 @@
+# OctaDist  Copyright (C) 2019  Rangsiman Ketkaew et al.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+# Profiling is switched on for the whole process by setting OCTADIST_PROFILE=1
+ENV_VAR = "OCTADIST_PROFILE"
+
+_enabled = os.environ.get(ENV_VAR, "").lower() in ("1", "true", "yes", "on")
+_stats = {}
+_lock = threading.Lock()
+
+
+def _size_of(obj):
+    """
+    Estimate the number of bytes processed from an argument of a stage.
+
+    File name counts as the size of file, array as its buffer size,
+    and list of coordinates as the size of the equivalent float array.
+
+    """
+    if isinstance(obj, str):
+        try:
+            return os.path.getsize(obj)
+        except OSError:
+            return 0
+
+    if hasattr(obj, "nbytes"):
+        return int(obj.nbytes)
+
+    try:
+        return int(np.asarray(obj, dtype=float).nbytes)
+    except (TypeError, ValueError):
+        return 0
+
+
+def stage(name, arg=0):
+    """
+    Decorate function as a profiled stage.
+
+    When profiling is disabled, the wrapper only checks one flag before calling
+    the function. When enabled, call count, wall time, and bytes processed
+    are accumulated under the stage name. Time of nested stages is inclusive.
+
+    Parameters
+    ----------
+    name : str
+        Name of the stage, e.g. "parse.xyz" or "calc.zeta".
+    arg : int
+        Position of the argument whose size is counted as bytes processed.
+        Default value is 0.
+
+    Returns
+    -------
+    decorator : function
+        Function decorator.
+
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                nbytes = _size_of(args[arg]) if len(args) > arg else 0
+                with _lock:
+                    record = _stats.setdefault(name, [0, 0.0, 0])
+                    record[0] += 1
+                    record[1] += elapsed
+                    record[2] += nbytes
+
+        return wrapper
+
+    return decorator
+
+
+def enable():
+    """
+    Turn profiling on.
+
+    """
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    """
+    Turn profiling off. Recorded statistics are kept.
+
+    """
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    """
+    Check if profiling is on.
+
+    Returns
+    -------
+    bool : bool
+        True if profiling is on.
+
+    """
+    return _enabled
+
+
+def reset():
+    """
+    Clear all recorded statistics.
+
+    """
+    with _lock:
+        _stats.clear()
+
+
+@contextlib.contextmanager
+def profiling(clear=True):
+    """
+    Context manager that turns profiling on inside the block.
+
+    Parameters
+    ----------
+    clear : bool
+        If True, clear statistics recorded before the block.
+        Default value is True.
+
+    Examples
+    --------
+    >>> with profiling():
+    ...     atom_full, coord_full = coord.extract_file(file)
+    ...     atom, coord = coord.extract_octa(atom_full, coord_full)
+    ...     zeta = calc.calc_zeta(coord)
+    >>> print(summary())
+
+    """
+    global _enabled
+    if clear:
+        reset()
+
+    previous = _enabled
+    _enabled = True
+    try:
+        yield
+    finally:
+        _enabled = previous
+
+
+def get_stats():
+    """
+    Get recorded statistics of all stages.
+
+    Returns
+    -------
+    stats : dict
+        Stage name mapped to dict of calls, time (second), and bytes.
+
+    """
+    with _lock:
+        return {name: {"calls": calls, "time": total, "bytes": nbytes}
+                for name, (calls, total, nbytes) in _stats.items()}
+
+
+def to_json(path=None):
+    """
+    Export recorded statistics as JSON.
+
+    Parameters
+    ----------
+    path : str, optional
+        If given, write JSON to this file.
+
+    Returns
+    -------
+    text : str
+        JSON string.
+
+    """
+    text = json.dumps(get_stats(), indent=2, sort_keys=True)
+
+    if path is not None:
+        with open(path, "w") as f:
+            f.write(text)
+
+    return text
+
+
+def summary():
+    """
+    Format recorded statistics as a table, slowest stage first.
+
+    Returns
+    -------
+    text : str
+        Summary table.
+
+    """
+    stats = sorted(get_stats().items(), key=lambda item: item[1]["time"], reverse=True)
+
+    lines = [f"{'Stage':<24}{'Calls':>10}{'Time (s)':>14}{'Per call (us)':>16}{'MB':>12}",
+             "-" * 76]
+    for name, s in stats:
+        per_call = s["time"] / s["calls"] * 1e6 if s["calls"] else 0.0
+        lines.append(f"{name:<24}{s['calls']:>10}{s['time']:>14.6f}{per_call:>16.2f}{s['bytes'] / 1e6:>12.3f}")
+
+    return "\n".join(lines)
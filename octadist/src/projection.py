@@ -82,3 +82,84 @@ def project_atom_onto_plane(p, a, b, c, d):
     projected_point = p + lambda_plane * plane
 
     return projected_point
+
+
+def project_atom_onto_line_batch(p, a, b, out=None):
+    """
+    Find the point projections of many points on many lines at once.
+
+    This is the array version of project_atom_onto_line. Points of shape (..., 3)
+    are broadcast against each other.
+
+    Parameters
+    ----------
+    p : list or array
+        Coordinates of points to project, shape (..., 3).
+    a : list or array
+        Coordinates of head atoms of the lines, shape (..., 3).
+    b : list or array
+        Coordinates of tail atoms of the lines, shape (..., 3).
+    out : array, optional
+        Array of shape (..., 3) to store the result in, it may be the same array as p.
+        If not given, a new array is allocated.
+
+    Returns
+    -------
+    out : array
+        The projected points on the lines, shape (..., 3).
+
+    See Also
+    --------
+    project_atom_onto_line : Project single point on single line.
+
+    """
+    p = np.asarray(p, dtype=float)
+    a = np.asarray(a, dtype=float)
+    ab = np.asarray(b, dtype=float) - a
+
+    scale = np.einsum('...i,...i->...', p - a, ab) / np.einsum('...i,...i->...', ab, ab)
+
+    out = np.add(a, scale[..., np.newaxis] * ab, out=out)
+
+    return out
+
+
+def project_atom_onto_plane_batch(p, plane, out=None):
+    """
+    Find the orthogonal projections of many points onto many planes at once.
+
+    This is the array version of project_atom_onto_plane. Points of shape (..., 3)
+    are broadcast against planes of shape (..., 4) whose last axis holds
+    the coefficients (A, B, C, D) of the equation Ax + By + Cz = D,
+    as returned by plane.find_eq_of_plane_batch.
+
+    Parameters
+    ----------
+    p : list or array
+        Coordinates of points to project, shape (..., 3).
+    plane : list or array
+        Coefficients of the equations of the planes, shape (..., 4).
+    out : array, optional
+        Array of shape (..., 3) to store the result in, it may be the same array as p.
+        If not given, a new array is allocated.
+
+    Returns
+    -------
+    out : array
+        The projected points on the planes, shape (..., 3).
+
+    See Also
+    --------
+    project_atom_onto_plane : Project single point onto single plane.
+
+    """
+    p = np.asarray(p, dtype=float)
+    plane = np.asarray(plane, dtype=float)
+    normal = plane[..., :3]
+
+    lambda_plane = ((plane[..., 3] - np.einsum('...i,...i->...', normal, p))
+                    / np.einsum('...i,...i->...', normal, normal))
+
+    out = np.add(p, lambda_plane[..., np.newaxis] * normal, out=out)
+
+    return out
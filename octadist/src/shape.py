@@ -0,0 +1,236 @@
+# OctaDist  Copyright (C) 2019  Rangsiman Ketkaew et al.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import itertools
+
+import numpy as np
+
+from octadist.src import profiler
+
+
+def _ideal_oc6():
+    """
+    Ideal octahedron (O_h) with central atom first, vertices at unit distance.
+
+    """
+    return np.array([[0, 0, 0],
+                     [1, 0, 0], [0, 1, 0], [0, 0, 1],
+                     [-1, 0, 0], [0, -1, 0], [0, 0, -1]], dtype=float)
+
+
+def _ideal_tpr6():
+    """
+    Ideal trigonal prism (D_3h) with central atom first, all edges equal, vertices at unit distance.
+
+    """
+    r = 2 / np.sqrt(7)
+    h = np.sqrt(3) * r / 2
+    phi = np.radians([90, 210, 330])
+    triangle = np.column_stack((r * np.cos(phi), r * np.sin(phi), np.zeros(3)))
+
+    return np.vstack(([0, 0, 0], triangle + [0, 0, h], triangle - [0, 0, h]))
+
+
+# Ligand permutations (central atom fixed) of 7 points
+_PERMS = np.array([(0,) + p for p in itertools.permutations(range(1, 7))])
+
+
+def _representatives(ideal):
+    """
+    Find one ligand permutation per class of permutations that give the same shape measure.
+
+    Permutations related by a proper rotation of the ideal shape onto itself
+    give the same fit, so only one of each class is needed:
+    720 / 24 = 30 for octahedron and 720 / 6 = 120 for trigonal prism.
+
+    """
+    # Proper rotations of ideal shape onto itself, as permutations of its vertices
+    h = np.einsum('ia,pib->pab', ideal, ideal[_PERMS])
+    u, s, vt = np.linalg.svd(h)
+    d = np.sign(np.linalg.det(h))
+    trace = s[:, 0] + s[:, 1] + d * s[:, 2]
+    group = _PERMS[np.isclose(trace, np.sum(ideal ** 2))]
+
+    lookup = {tuple(p): n for n, p in enumerate(_PERMS)}
+    seen = np.zeros(len(_PERMS), dtype=bool)
+    representatives = []
+    for n, perm in enumerate(_PERMS):
+        if seen[n]:
+            continue
+        representatives.append(perm)
+        for g in group:
+            seen[lookup[tuple(g[perm])]] = True
+
+    return np.array(representatives)
+
+
+# Ideal shapes centered at their centroid and their classes of ligand permutations
+SHAPES = {}
+for _name, _ideal in (("OC-6", _ideal_oc6()), ("TPR-6", _ideal_tpr6())):
+    _ideal = _ideal - _ideal.mean(axis=0)
+    SHAPES[_name] = (_ideal, _representatives(_ideal))
+
+# All 21 pairs of the 7 atoms of octahedron
+_PAIRS = np.array(list(itertools.combinations(range(7), 2)))
+
+
+def _pair_dist(c):
+    """
+    Distances of the 21 atom pairs normalized to unit root mean square, shape (..., 21).
+
+    """
+    d = np.linalg.norm(c[..., _PAIRS[:, 0], :] - c[..., _PAIRS[:, 1], :], axis=-1)
+
+    return d / np.sqrt(np.mean(d ** 2, axis=-1, keepdims=True))
+
+
+def _max_trace(h, bound):
+    """
+    Maximum of tr(R h) over proper rotations R, for stacked 3x3 matrices h.
+
+    This is the largest eigenvalue of the 4x4 quaternion matrix of h, found
+    by Newton iteration on its characteristic polynomial from an upper bound,
+    which works element-wise on the whole stack and is faster than batched SVD.
+
+    References
+    ----------
+    B. K. P. Horn. J. Opt. Soc. Am. A 1987, 4, 629-642.
+
+    D. L. Theobald. Acta Cryst. 2005, A61, 478-480.
+
+    """
+    sxx, sxy, sxz = h[..., 0, 0], h[..., 0, 1], h[..., 0, 2]
+    syx, syy, syz = h[..., 1, 0], h[..., 1, 1], h[..., 1, 2]
+    szx, szy, szz = h[..., 2, 0], h[..., 2, 1], h[..., 2, 2]
+
+    k = [[sxx + syy + szz, syz - szy, szx - sxz, sxy - syx],
+         [syz - szy, sxx - syy - szz, sxy + syx, szx + sxz],
+         [szx - sxz, sxy + syx, -sxx + syy - szz, syz + szy],
+         [sxy - syx, szx + sxz, syz + szy, -sxx - syy + szz]]
+
+    def minor(r, a, b):
+        return k[r][a] * k[r + 1][b] - k[r][b] * k[r + 1][a]
+
+    # Coefficients of characteristic polynomial l^4 + c2 l^2 + c1 l + c0
+    c2 = -2 * np.einsum('...ij,...ij->...', h, h)
+    c1 = -8 * (sxx * (syy * szz - syz * szy) - sxy * (syx * szz - syz * szx) + sxz * (syx * szy - syy * szx))
+    c0 = (minor(0, 0, 1) * minor(2, 2, 3) - minor(0, 0, 2) * minor(2, 1, 3) + minor(0, 0, 3) * minor(2, 1, 2)
+          + minor(0, 1, 2) * minor(2, 0, 3) - minor(0, 1, 3) * minor(2, 0, 2) + minor(0, 2, 3) * minor(2, 0, 1))
+
+    lam = np.array(np.broadcast_to(bound, c0.shape), dtype=float)
+    for _ in range(50):
+        l2 = lam * lam
+        f = (l2 + c2) * l2 + c1 * lam + c0
+        df = 4 * l2 * lam + 2 * c2 * lam + c1
+        step = np.divide(f, df, out=np.zeros_like(f), where=df != 0)
+        lam -= step
+        if np.all(np.abs(step) <= 1e-12 * np.abs(lam)):
+            break
+
+    return lam
+
+
+def _cshm_block(q, ideal, perms, top):
+    """
+    Shape measure of a block of centered structures q, shape (N, 7, 3).
+
+    """
+    p = ideal[perms]
+
+    if top is not None and top < len(perms):
+        # Rank permutations by mismatch of normalized pair distances, fit only the best ones
+        dq = _pair_dist(q)
+        dp = _pair_dist(p)
+        score = -2 * dq @ dp.T + np.sum(dp ** 2, axis=-1)
+        best = np.argpartition(score, top - 1, axis=1)[:, :top]
+        h = np.einsum('nia,npib->npab', q, p[best])
+    else:
+        h = np.einsum('nia,pib->npab', q, p)
+
+    q2 = np.einsum('nij,nij->n', q, q)
+    p2 = np.sum(ideal ** 2)
+
+    # Cauchy-Schwarz bound of the trace, reached by the ideal shape
+    bound = np.sqrt(q2 * p2)[:, np.newaxis]
+    trace = _max_trace(h, bound).max(axis=1)
+
+    return 100 * np.clip(1 - trace ** 2 / (q2 * p2), 0, None)
+
+
+@profiler.stage("calc.cshm")
+def calc_cshm(c_octa, shape="OC-6", top=None, block=4096):
+    """
+    Calculate continuous shape measure (CShM) of octahedral structure.
+
+    S(Q, P) = 100 min sum |Q_i - P_i|^2 / sum |Q_i - Q_0|^2,
+
+    where Q is the structure (metal and six ligands), P is the ideal shape
+    after optimal translation, rotation, and scaling, and Q_0 the centroid of Q.
+    The minimum is also taken over ligand orders with the metal kept at the center.
+    Only one ligand order per class of symmetry-equivalent orders is fitted,
+    and the fits of a block of structures are solved together (see :func:`_max_trace`).
+
+    Parameters
+    ----------
+    c_octa : array
+        Atomic coordinates of octahedral structure, shape (7, 3) or (N, 7, 3).
+    shape : str
+        "OC-6" (octahedron) or "TPR-6" (trigonal prism). Default is "OC-6".
+    top : int, optional
+        If given, only the top ligand orders ranked by mismatch of normalized
+        interatomic distances are fitted. Faster, but may miss the minimum of
+        strongly distorted structures. Default is None (all orders, exact).
+    block : int
+        Number of structures processed at once. Default value is 4096.
+
+    Returns
+    -------
+    cshm : float or array
+        Continuous shape measure, 0 for the ideal shape.
+
+    References
+    ----------
+    H. Zabrodsky, S. Peleg, D. Avnir. J. Am. Chem. Soc. 1992, 114, 7843-7851.
+
+    M. Pinsky, D. Avnir. Inorg. Chem. 1998, 37, 5575-5582.
+
+    Examples
+    --------
+    >>> coord
+    [[0, 0, 0], [1, 0, 0], [0, 1, 0], [0, 0, 1], [-1, 0, 0], [0, -1, 0], [0, 0, -1]]
+    >>> calc_cshm(coord, "OC-6")
+    0.0
+    >>> calc_cshm(coord, "TPR-6")
+    16.73680...
+
+    """
+    if shape not in SHAPES:
+        raise ValueError(f"Unknown shape: {shape}, use one of {', '.join(SHAPES)}")
+
+    ideal, perms = SHAPES[shape]
+
+    c_octa = np.asarray(c_octa, dtype=float)
+    single = c_octa.ndim == 2
+    q = c_octa.reshape(-1, 7, 3)
+    q = q - q.mean(axis=1, keepdims=True)
+
+    cshm = np.concatenate([_cshm_block(q[i:i + block], ideal, perms, top)
+                           for i in range(0, len(q), block)] or [np.empty(0)])
+
+    if single:
+        return float(cshm[0])
+
+    return cshm.reshape(c_octa.shape[:-2])
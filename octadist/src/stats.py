@@ -0,0 +1,464 @@
+# OctaDist  Copyright (C) 2019  Rangsiman Ketkaew et al.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import collections
+
+import numpy as np
+
+ChangeEvent = collections.namedtuple("ChangeEvent", ["frame", "site", "onset", "direction", "before", "after"])
+
+
+class OnlineStats:
+    """
+    Running statistics of parameters over trajectory frames in constant memory.
+
+    Count, mean, variance, minimum, maximum, and a fixed-bin histogram are kept
+    for every element of a frame (e.g. every site, or every site and parameter).
+    Mean and variance are updated with the algorithm of Welford, extended by
+    Chan et al. to add a whole batch of frames at once and to merge accumulators
+    of parallel workers. NaN values are skipped.
+
+    Parameters
+    ----------
+    shape : int or tuple
+        Shape of one frame, e.g. number of sites, or (n_sites, n_params).
+    bins : int, optional
+        Number of histogram bins. If not given, no histogram is kept.
+    range : tuple, optional
+        Lower and upper edge of histogram. Values outside are counted as underflow and overflow.
+        Required if bins is given.
+
+    Examples
+    --------
+    >>> stats = OnlineStats(n_sites, bins=100, range=(0, 1))
+    >>> for frame in frames:
+    ...     stats.update(calc_zeta_of_all_sites(frame))
+    >>> stats.mean, stats.std()
+
+    >>> total = sum(worker_results, OnlineStats(n_sites, bins=100, range=(0, 1)))
+
+    References
+    ----------
+    B. P. Welford. Technometrics 1962, 4, 419-420.
+
+    T. F. Chan, G. H. Golub, R. J. LeVeque. Technical Report STAN-CS-79-773, Stanford University, 1979.
+
+    """
+
+    def __init__(self, shape, bins=None, range=None):
+        self.shape = (shape,) if np.isscalar(shape) else tuple(shape)
+
+        self.count = np.zeros(self.shape, dtype=np.int64)
+        self.mean = np.zeros(self.shape)
+        self.m2 = np.zeros(self.shape)
+        self.min = np.full(self.shape, np.inf)
+        self.max = np.full(self.shape, -np.inf)
+
+        if bins is not None:
+            if range is None:
+                raise ValueError("Histogram range must be given with bins")
+            self.edges = np.linspace(range[0], range[1], bins + 1)
+            # Bin 0 is underflow and bin -1 is overflow
+            self.hist = np.zeros(self.shape + (bins + 2,), dtype=np.int64)
+        else:
+            self.edges = None
+            self.hist = None
+
+        self.n_frames = 0
+
+    def update(self, values):
+        """
+        Add one frame, or a batch of frames stacked along the first axis.
+
+        Parameters
+        ----------
+        values : array
+            Parameters of one frame, shape equal to shape, or of several frames,
+            shape (n_frames, ...).
+
+        Returns
+        -------
+        None : None
+
+        """
+        values = np.asarray(values, dtype=float)
+        if values.shape == self.shape:
+            values = values[np.newaxis]
+        if values.shape[1:] != self.shape:
+            raise ValueError(f"Expected frames of shape {self.shape}, got {values.shape}")
+
+        valid = ~np.isnan(values)
+        count = valid.sum(axis=0)
+        filled = np.where(valid, values, 0.0)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(count > 0, filled.sum(axis=0) / count, 0.0)
+        m2 = np.sum(np.where(valid, values - mean, 0.0) ** 2, axis=0)
+
+        self._combine(count, mean, m2)
+
+        self.min = np.fmin(self.min, np.nanmin(np.where(valid, values, np.inf), axis=0))
+        self.max = np.fmax(self.max, np.nanmax(np.where(valid, values, -np.inf), axis=0))
+
+        if self.hist is not None:
+            index = np.searchsorted(self.edges, values, side="right")
+            # Upper edge belongs to the last bin
+            index[values == self.edges[-1]] = len(self.edges) - 1
+            flat = np.ravel_multi_index(np.indices(values.shape[1:]), self.shape)
+            flat = np.broadcast_to(flat, values.shape)[valid] * self.hist.shape[-1] + index[valid]
+            self.hist += np.bincount(flat, minlength=self.hist.size).reshape(self.hist.shape)
+
+        self.n_frames += len(values)
+
+    def _combine(self, count, mean, m2):
+        """
+        Merge count, mean, and sum of squared deviations of another sample.
+
+        """
+        total = self.count + count
+        with np.errstate(invalid="ignore", divide="ignore"):
+            delta = mean - self.mean
+            weight = np.where(total > 0, count / total, 0.0)
+            self.mean = self.mean + delta * weight
+            self.m2 = self.m2 + m2 + delta ** 2 * self.count * weight
+        self.count = total
+
+    def merge(self, other):
+        """
+        Merge statistics of another accumulator, e.g. of a parallel worker, into this one.
+
+        Parameters
+        ----------
+        other : OnlineStats
+            Accumulator of the same shape and histogram bins.
+
+        Returns
+        -------
+        self : OnlineStats
+            This accumulator.
+
+        """
+        if other.shape != self.shape:
+            raise ValueError(f"Cannot merge statistics of shape {other.shape} into {self.shape}")
+        if (self.edges is None) != (other.edges is None) or \
+                (self.edges is not None and not np.array_equal(self.edges, other.edges)):
+            raise ValueError("Cannot merge statistics with different histogram bins")
+
+        self._combine(other.count, other.mean, other.m2)
+        self.min = np.fmin(self.min, other.min)
+        self.max = np.fmax(self.max, other.max)
+        if self.hist is not None:
+            self.hist += other.hist
+        self.n_frames += other.n_frames
+
+        return self
+
+    def __iadd__(self, other):
+        return self.merge(other)
+
+    def __add__(self, other):
+        result = self.copy()
+        return result.merge(other)
+
+    def __radd__(self, other):
+        # Allow sum() over accumulators
+        if other == 0:
+            return self.copy()
+        return self.__add__(other)
+
+    def copy(self):
+        """
+        Copy accumulator.
+
+        Returns
+        -------
+        stats : OnlineStats
+            Independent copy.
+
+        """
+        result = OnlineStats.__new__(OnlineStats)
+        result.__dict__.update({key: value.copy() if isinstance(value, np.ndarray) else value
+                                for key, value in self.__dict__.items()})
+        return result
+
+    def var(self, ddof=0):
+        """
+        Variance of every element.
+
+        Parameters
+        ----------
+        ddof : int
+            Delta degrees of freedom. Default value is 0.
+
+        Returns
+        -------
+        var : array
+            Variance, NaN where fewer than ddof + 1 values were added.
+
+        """
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(self.count > ddof, self.m2 / (self.count - ddof), np.nan)
+
+    def std(self, ddof=0):
+        """
+        Standard deviation of every element.
+
+        Parameters
+        ----------
+        ddof : int
+            Delta degrees of freedom. Default value is 0.
+
+        Returns
+        -------
+        std : array
+            Standard deviation.
+
+        """
+        return np.sqrt(self.var(ddof))
+
+    def histogram(self, density=False):
+        """
+        Histogram of every element, without underflow and overflow.
+
+        Parameters
+        ----------
+        density : bool
+            If True, normalize to probability density over all added values,
+            including those out of range. Default is False.
+
+        Returns
+        -------
+        hist : array
+            Counts (or density), shape (..., bins).
+        edges : array
+            Bin edges, shape (bins + 1,).
+
+        """
+        if self.hist is None:
+            raise ValueError("No histogram was kept, create OnlineStats with bins and range")
+
+        hist = self.hist[..., 1:-1]
+        if density:
+            with np.errstate(invalid="ignore", divide="ignore"):
+                hist = hist / (self.count[..., np.newaxis] * np.diff(self.edges))
+
+        return hist, self.edges
+
+    @property
+    def underflow(self):
+        """Number of values below the histogram range."""
+        return None if self.hist is None else self.hist[..., 0]
+
+    @property
+    def overflow(self):
+        """Number of values above the histogram range."""
+        return None if self.hist is None else self.hist[..., -1]
+
+    def summary(self):
+        """
+        Collect statistics in a dict.
+
+        Returns
+        -------
+        summary : dict
+            count, mean, std, min, and max arrays.
+
+        """
+        return {"count": self.count, "mean": self.mean, "std": self.std(),
+                "min": self.min, "max": self.max}
+
+
+class ChangeDetector:
+    """
+    Streaming detection of abrupt changes (e.g. spin transitions) in parameter series.
+
+    Every element of a frame (site, or site and parameter) runs its own two-sided
+    CUSUM test. The baseline mean and standard deviation are learned from the first
+    warmup frames of a segment and then kept fixed. Values are standardized by the
+    baseline, and upward and downward sums grow by (z - drift) and (-z - drift),
+    never going below zero. A change is reported when a sum exceeds threshold.
+    The test then restarts, so the level after the change becomes the new baseline.
+    Only a few numbers per element are kept, whatever the length of trajectory.
+
+    Parameters
+    ----------
+    shape : int or tuple
+        Shape of one frame, e.g. number of sites, or (n_sites, n_params).
+    threshold : float
+        Decision threshold in units of baseline standard deviation. Default value is 10.
+    drift : float
+        Allowed drift (half the smallest shift to detect) in units of baseline
+        standard deviation. Default value is 1.
+    warmup : int
+        Number of frames used to learn the baseline of each segment. Default value is 50.
+    min_std : float
+        Lower bound of baseline standard deviation, for nearly constant series.
+        Default value is 1e-8.
+
+    Examples
+    --------
+    >>> detector = ChangeDetector(n_sites)
+    >>> for frame in frames:
+    ...     for event in detector.update(calc_zeta_of_all_sites(frame)):
+    ...         print(event)
+    ChangeEvent(frame=51234, site=(17,), onset=51230, direction=1, before=0.41, after=0.93)
+
+    References
+    ----------
+    E. S. Page. Biometrika 1954, 41, 100-115.
+
+    """
+
+    def __init__(self, shape, threshold=10.0, drift=1.0, warmup=50, min_std=1e-8):
+        self.shape = (shape,) if np.isscalar(shape) else tuple(shape)
+        self.threshold = threshold
+        self.drift = drift
+        self.warmup = warmup
+        self.min_std = min_std
+
+        # Baseline of current segment
+        self.count = np.zeros(self.shape, dtype=np.int64)
+        self.mean = np.zeros(self.shape)
+        self.m2 = np.zeros(self.shape)
+
+        # CUSUM statistics and the last frame each of them was zero
+        self.g_up = np.zeros(self.shape)
+        self.g_down = np.zeros(self.shape)
+        self.start_up = np.zeros(self.shape, dtype=np.int64)
+        self.start_down = np.zeros(self.shape, dtype=np.int64)
+
+        # Sum and number of values since the last zero of each sum, for the level after a change
+        self.sum_up = np.zeros(self.shape)
+        self.sum_down = np.zeros(self.shape)
+        self.n_up = np.zeros(self.shape, dtype=np.int64)
+        self.n_down = np.zeros(self.shape, dtype=np.int64)
+
+        self.n_frames = 0
+
+    def reset(self, mask=None):
+        """
+        Restart learning of baseline.
+
+        Parameters
+        ----------
+        mask : array, optional
+            Boolean array of elements to reset. Default is all elements.
+
+        Returns
+        -------
+        None : None
+
+        """
+        mask = np.ones(self.shape, dtype=bool) if mask is None else mask
+        for array in (self.count, self.mean, self.m2, self.g_up, self.g_down,
+                      self.sum_up, self.sum_down, self.n_up, self.n_down):
+            array[mask] = 0
+        self.start_up[mask] = self.n_frames
+        self.start_down[mask] = self.n_frames
+
+    def update(self, values):
+        """
+        Add one frame, or a batch of frames stacked along the first axis.
+
+        Parameters
+        ----------
+        values : array
+            Parameters of one frame, shape equal to shape, or of several frames,
+            shape (n_frames, ...). NaN values are skipped and leave the state
+            of their element unchanged.
+
+        Returns
+        -------
+        events : list
+            ChangeEvent(frame, site, onset, direction, before, after) of changes
+            found in these frames, where frame is the frame of detection, onset
+            the estimated first frame after the change, direction +1 or -1,
+            and before and after the mean levels.
+
+        """
+        values = np.asarray(values, dtype=float)
+        if values.shape == self.shape:
+            values = values[np.newaxis]
+        if values.shape[1:] != self.shape:
+            raise ValueError(f"Expected frames of shape {self.shape}, got {values.shape}")
+
+        events = []
+        for x in values:
+            events += self._step(x)
+
+        return events
+
+    def _step(self, x):
+        """
+        Process one frame.
+
+        """
+        frame = self.n_frames
+        valid = ~np.isnan(x)
+
+        # Learn baseline with Welford updates
+        learning = valid & (self.count < self.warmup)
+        self.count[learning] += 1
+        delta = np.where(learning, x - self.mean, 0.0)
+        self.mean += np.where(learning, delta / np.maximum(self.count, 1), 0.0)
+        self.m2 += np.where(learning, delta * (x - self.mean), 0.0)
+
+        testing = valid & ~learning & (self.count >= self.warmup)
+        std = np.maximum(np.sqrt(self.m2 / np.maximum(self.count - 1, 1)), self.min_std)
+        z = np.where(testing, (x - self.mean) / std, 0.0)
+
+        x = np.where(testing, x, 0.0)
+        up = np.maximum(self.g_up + z - self.drift, 0.0)
+        down = np.maximum(self.g_down - z - self.drift, 0.0)
+
+        # Only elements tested in this frame are updated
+        self.g_up, self.sum_up, self.n_up = self._accumulate(
+            testing, self.g_up, up, self.start_up, self.sum_up, self.n_up, x, frame)
+        self.g_down, self.sum_down, self.n_down = self._accumulate(
+            testing, self.g_down, down, self.start_down, self.sum_down, self.n_down, x, frame)
+
+        events = []
+        alarm = testing & ((self.g_up > self.threshold) | (self.g_down > self.threshold))
+        for site in zip(*np.nonzero(alarm)):
+            if self.g_up[site] >= self.g_down[site]:
+                direction, onset, total, n = 1, self.start_up[site], self.sum_up[site], self.n_up[site]
+            else:
+                direction, onset, total, n = -1, self.start_down[site], self.sum_down[site], self.n_down[site]
+            after = total / n
+            events.append(ChangeEvent(frame, tuple(int(i) for i in site), int(onset), direction,
+                                      float(self.mean[site]), float(after)))
+
+        if np.any(alarm):
+            self.reset(alarm)
+
+        self.n_frames += 1
+
+        return events
+
+    @staticmethod
+    def _accumulate(testing, g, g_new, start, total, n, x, frame):
+        """
+        Update one CUSUM sum, its start frame (in place), and sum and number of values since start.
+
+        """
+        restart = testing & (g == 0) & (g_new > 0)
+        start[restart] = frame
+
+        running = testing & (g_new > 0)
+        total = np.where(running, np.where(restart, 0.0, total) + x, np.where(testing, 0.0, total))
+        n = np.where(running, np.where(restart, 0, n) + 1, np.where(testing, 0, n))
+
+        return np.where(testing, g_new, g), total, n
@@ -0,0 +1,323 @@
+# OctaDist  Copyright (C) 2019  Rangsiman Ketkaew et al.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import contextlib
+import sqlite3
+
+import numpy as np
+
+PARAMS = ["zeta", "delta", "sigma", "theta"]
+BONDS = [f"d{i}" for i in range(1, 7)]
+COLUMNS = ["file", "metal", "m_index"] + PARAMS + BONDS
+
+
+class ResultStore:
+    """
+    Indexed SQLite database of per-site distortion parameters.
+
+    Each row is one metal site: source file, metal, index of metal in file,
+    Zeta, Delta, Sigma, Theta, and six metal-ligand bond distances (d1-d6).
+    The database runs in WAL mode and records are inserted in batched transactions.
+    Every parameter leads one index alone and one together with metal, and each
+    of these indexes also holds the other parameters. A query on metal and several
+    parameter ranges thus searches one index for the first range and tests the
+    other ranges inside the index, reading table rows only for matching sites.
+
+    Parameters
+    ----------
+    path : str
+        Database file. Use ":memory:" for a temporary database.
+    batch_size : int
+        Number of rows written per transaction.
+        Default value is 10000.
+    bulk_rows : int
+        Smallest number of rows inserted by insert_arrays that uses bulk_load,
+        if it also exceeds the rows already in the table. Default value is 100000.
+
+    Examples
+    --------
+    >>> with ResultStore("results.db") as db:
+    ...     db.insert_arrays(file, metal, m_index, zeta, delta, sigma, theta, bond_dist)
+    ...     rows = db.query(metal="Fe", sigma=(60, None), zeta=(None, 0.1))
+
+    """
+
+    def __init__(self, path, batch_size=10000, bulk_rows=100000):
+        self.path = path
+        self.batch_size = batch_size
+        self.bulk_rows = bulk_rows
+
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_tables()
+
+    def _create_tables(self):
+        columns = ", ".join(f"{p} REAL" for p in PARAMS + BONDS)
+        with self.conn:
+            self.conn.execute("CREATE TABLE IF NOT EXISTS sites ("
+                              "id INTEGER PRIMARY KEY, file TEXT, metal TEXT, m_index INTEGER, "
+                              f"{columns})")
+        self._create_indexes()
+
+    @staticmethod
+    def _index_columns():
+        indexes = {"idx_metal": "metal", "idx_file": "file"}
+        for p in PARAMS:
+            # The other parameters are appended, so the index covers every parameter range test
+            others = ", ".join(q for q in PARAMS if q != p)
+            indexes[f"idx_{p}"] = f"{p}, {others}"
+            indexes[f"idx_metal_{p}"] = f"metal, {p}, {others}"
+
+        return indexes
+
+    def _create_indexes(self):
+        with self.conn:
+            for name, columns in self._index_columns().items():
+                self.conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON sites ({columns})")
+
+    def _drop_indexes(self):
+        with self.conn:
+            for name in self._index_columns():
+                self.conn.execute(f"DROP INDEX IF EXISTS {name}")
+
+    def _n_rows(self):
+        # Row ids only grow, so the largest id is a cheap upper bound of the table size
+        n = self.conn.execute("SELECT MAX(id) FROM sites").fetchone()[0]
+
+        return n or 0
+
+    @contextlib.contextmanager
+    def bulk_load(self):
+        """
+        Drop indexes while loading many rows and rebuild them afterwards.
+
+        Building an index once over the whole table is much faster than
+        updating ten indexes row by row. Use it when the number of new rows
+        is comparable with or larger than the table.
+
+        Examples
+        --------
+        >>> with db.bulk_load():
+        ...     for batch in batches:
+        ...         db.insert(batch)
+
+        """
+        self._drop_indexes()
+        try:
+            yield self
+        finally:
+            self._create_indexes()
+            self.analyze()
+
+    def analyze(self):
+        """
+        Update statistics used by SQLite to choose the index of a query.
+
+        Statistics are estimated from a sample of each index, which is fast on large tables.
+        It is run after every bulk load.
+
+        """
+        with self.conn:
+            self.conn.execute("PRAGMA analysis_limit=1000")
+            self.conn.execute("ANALYZE")
+
+    def insert(self, records):
+        """
+        Insert per-site records in batched transactions.
+
+        Parameters
+        ----------
+        records : iterable
+            Records as dicts keyed by column names (file, metal, m_index, zeta, delta,
+            sigma, theta, and bond_dist or d1-d6), or as tuples in the order of COLUMNS.
+
+        Returns
+        -------
+        count : int
+            Number of inserted rows.
+
+        """
+        sql = f"INSERT INTO sites ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+
+        count = 0
+        batch = []
+        for record in records:
+            batch.append(self._to_row(record))
+            if len(batch) >= self.batch_size:
+                with self.conn:
+                    self.conn.executemany(sql, batch)
+                count += len(batch)
+                batch = []
+
+        if batch:
+            with self.conn:
+                self.conn.executemany(sql, batch)
+            count += len(batch)
+
+        return count
+
+    @staticmethod
+    def _to_row(record):
+        if not isinstance(record, dict):
+            return tuple(record)
+
+        record = dict(record)
+        if "bond_dist" in record:
+            for i, d in enumerate(record.pop("bond_dist")):
+                record[BONDS[i]] = d
+
+        return tuple(record.get(c) for c in COLUMNS)
+
+    def insert_arrays(self, file, metal, m_index, zeta, delta, sigma, theta, bond_dist=None):
+        """
+        Insert batched outputs of calc functions column by column.
+
+        Scalars (e.g. one file name for the whole batch) are broadcast to all rows.
+
+        Parameters
+        ----------
+        file : str or list
+            Source file of each site.
+        metal : str or list
+            Metal of each site.
+        m_index : int or array
+            Index of metal in source file.
+        zeta, delta, sigma, theta : array
+            Distortion parameters, shape (N,).
+        bond_dist : array, optional
+            Metal-ligand bond distances, shape (N, 6).
+
+        Returns
+        -------
+        count : int
+            Number of inserted rows.
+
+        """
+        n = len(np.atleast_1d(zeta))
+
+        def column(x):
+            x = np.atleast_1d(np.asarray(x, dtype=object))
+            return np.broadcast_to(x, (n,)).tolist()
+
+        columns = [column(file), column(metal), [int(i) for i in column(m_index)]]
+        columns += [np.broadcast_to(np.asarray(p, dtype=float), (n,)).tolist()
+                    for p in (zeta, delta, sigma, theta)]
+
+        if bond_dist is None:
+            columns += [[None] * n] * 6
+        else:
+            bond_dist = np.asarray(bond_dist, dtype=float).reshape(n, 6)
+            columns += bond_dist.T.tolist()
+
+        # Rebuilding indexes only pays off for large batches that dominate the table
+        if n >= self.bulk_rows and n > self._n_rows():
+            with self.bulk_load():
+                return self.insert(zip(*columns))
+
+        return self.insert(zip(*columns))
+
+    @staticmethod
+    def _where(file=None, metal=None, **ranges):
+        clauses = []
+        values = []
+
+        if file is not None:
+            clauses.append("file = ?")
+            values.append(file)
+
+        if metal is not None:
+            clauses.append("metal = ?")
+            values.append(metal)
+
+        for name, (low, high) in ranges.items():
+            if name not in PARAMS + BONDS:
+                raise ValueError(f"Unknown parameter: {name}")
+            if low is not None:
+                clauses.append(f"{name} >= ?")
+                values.append(low)
+            if high is not None:
+                clauses.append(f"{name} <= ?")
+                values.append(high)
+
+        where = " WHERE " + " AND ".join(clauses) if clauses else ""
+
+        return where, values
+
+    def query(self, file=None, metal=None, limit=None, **ranges):
+        """
+        Select sites by file, metal, and ranges of parameters.
+
+        Parameters
+        ----------
+        file : str, optional
+            Source file.
+        metal : str, optional
+            Atomic symbol of metal.
+        limit : int, optional
+            Maximum number of rows to return.
+        ranges : tuple
+            Inclusive (min, max) range of parameter, e.g. sigma=(60, None).
+            None leaves that side open.
+
+        Returns
+        -------
+        rows : list
+            List of dicts, one per site.
+
+        Examples
+        --------
+        >>> db.query(metal="Fe", sigma=(60, None), zeta=(None, 0.1))
+
+        """
+        where, values = self._where(file, metal, **ranges)
+        sql = f"SELECT * FROM sites{where}"
+        if limit is not None:
+            sql += " LIMIT ?"
+            values.append(int(limit))
+
+        cursor = self.conn.execute(sql, values)
+        names = [column[0] for column in cursor.description]
+        rows = [dict(zip(names, row)) for row in cursor]
+
+        return rows
+
+    def count(self, file=None, metal=None, **ranges):
+        """
+        Count sites matching the same filters as query.
+
+        Returns
+        -------
+        count : int
+            Number of matching sites.
+
+        """
+        where, values = self._where(file, metal, **ranges)
+
+        return self.conn.execute(f"SELECT COUNT(*) FROM sites{where}", values).fetchone()[0]
+
+    def close(self):
+        """
+        Close connection to the database.
+
+        """
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,221 @@
+# OctaDist  Copyright (C) 2019  Rangsiman Ketkaew et al.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import numpy as np
+
+from octadist.src import linear, util
+
+# All 15 pairs of ligand atoms (1-6) of octahedron
+_LIGAND_PAIRS = np.array(np.triu_indices(6, k=1)).T + 1
+
+
+def fingerprint(c_octa):
+    """
+    Calculate geometric fingerprint of octahedral structure.
+
+    The fingerprint is made of the sorted metal-ligand and ligand-ligand distances,
+    which do not change under rotation, reflection, or reordering of ligands.
+
+    Parameters
+    ----------
+    c_octa : array
+        Atomic coordinates of octahedral structure, shape (..., 7, 3).
+
+    Returns
+    -------
+    fp : array
+        Sorted 6 bond distances followed by sorted 15 ligand-ligand distances, shape (..., 21).
+
+    """
+    c_octa = np.asarray(c_octa, dtype=float)
+
+    bond = linear.euclidean_dist(c_octa[..., :1, :], c_octa[..., 1:, :])
+    edge = linear.euclidean_dist(c_octa[..., _LIGAND_PAIRS[:, 0], :], c_octa[..., _LIGAND_PAIRS[:, 1], :])
+
+    return np.concatenate((np.sort(bond, axis=-1), np.sort(edge, axis=-1)), axis=-1)
+
+
+def find_equivalent(c_octas, a_octas=None, tol=1e-3, confirm=False):
+    """
+    Group octahedra that are congruent, e.g. symmetry-equivalent metal sites of crystal.
+
+    Octahedra are grouped by fingerprint and element labels: each group takes
+    every remaining octahedron whose fingerprint is within tol of its first one.
+    Fingerprints are sorted by shortest bond, so only a narrow window is compared,
+    and the loop runs once per group, not once per octahedron. Equal fingerprints
+    of non-congruent octahedra are possible but very unlikely; use confirm to
+    check every member by RMSD after superposition, allowing for mirror images.
+
+    Parameters
+    ----------
+    c_octas : array
+        Atomic coordinates of octahedral structures, shape (M, 7, 3).
+    a_octas : list, optional
+        Atomic labels of octahedral structures. If given, only octahedra
+        with the same metal and the same set of ligand elements are grouped.
+    tol : float
+        Tolerance of distances and RMSD in Angstrom. Default value is 0.001.
+    confirm : bool
+        If True, also compare every member with the first octahedron of its group
+        by RMSD (util.calc_rmsd_octa, batched over the group). This costs more than
+        computing simple parameters such as zeta directly. Default is False.
+
+    Returns
+    -------
+    unique : array
+        Index of the first octahedron of each group, shape (K,).
+    inverse : array
+        Group of each octahedron, shape (M,), so that c_octas[unique][inverse]
+        is congruent to c_octas.
+
+    Examples
+    --------
+    >>> unique, inverse = find_equivalent(c_octas)
+    >>> zeta = np.array([calc.calc_zeta(c) for c in c_octas[unique]])[inverse]
+
+    """
+    c_octas = np.asarray(c_octas, dtype=float).reshape(-1, 7, 3)
+    fps = fingerprint(c_octas)
+
+    if a_octas is None:
+        labels = np.zeros(len(c_octas), dtype=int)
+    else:
+        keys = [a[0] + ":" + ",".join(sorted(a[1:])) for a in a_octas]
+        labels = np.unique(keys, return_inverse=True)[1].ravel()
+
+    order = np.argsort(fps[:, 0], kind='stable')
+    shortest = fps[order, 0]
+
+    unique = []
+    inverse = np.full(len(c_octas), -1)
+    for n in range(len(c_octas)):
+        if inverse[n] >= 0:
+            continue
+
+        lo = np.searchsorted(shortest, fps[n, 0] - tol, side='left')
+        hi = np.searchsorted(shortest, fps[n, 0] + tol, side='right')
+        members = order[lo:hi]
+        members = members[(inverse[members] < 0) & (labels[members] == labels[n])
+                          & (np.max(np.abs(fps[members] - fps[n]), axis=1) <= tol)]
+
+        if confirm:
+            rmsd = np.minimum(util.calc_rmsd_octa(c_octas[n], c_octas[members]),
+                              util.calc_rmsd_octa(c_octas[n], -c_octas[members]))
+            members = members[(rmsd <= tol) | (members == n)]
+
+        inverse[members] = len(unique)
+        unique.append(n)
+
+    return np.array(unique, dtype=int), inverse
+
+
+def calc_unique(func, c_octas, a_octas=None, tol=1e-3, confirm=False):
+    """
+    Calculate a parameter once per group of equivalent octahedra and broadcast it.
+
+    Parameters
+    ----------
+    func : function
+        Function of one octahedron, e.g. calc.calc_zeta.
+    c_octas : array
+        Atomic coordinates of octahedral structures, shape (M, 7, 3).
+    a_octas : list, optional
+        Atomic labels of octahedral structures.
+    tol : float
+        Tolerance of distances and RMSD in Angstrom. Default value is 0.001.
+    confirm : bool
+        If True, confirm groups by RMSD, see :func:`find_equivalent`. Default is False.
+
+    Returns
+    -------
+    values : array
+        Value of func for every octahedron, shape (M, ...).
+
+    See Also
+    --------
+    find_equivalent : Group congruent octahedra.
+
+    """
+    c_octas = np.asarray(c_octas, dtype=float).reshape(-1, 7, 3)
+    unique, inverse = find_equivalent(c_octas, a_octas, tol, confirm)
+
+    values = np.asarray([func(c_octas[i]) for i in unique])
+
+    return values[inverse]
+
+
+def cif_equivalent(structure):
+    """
+    Group metal atoms of unit cell by the site of asymmetric unit they come from.
+
+    Sites of asymmetric unit are symmetry-unique by construction,
+    so their octahedra only need to be computed once.
+
+    Parameters
+    ----------
+    structure : CifStructure
+        Crystal structure read from CIF file.
+
+    Returns
+    -------
+    m_index : list
+        Indices (0-based) of metal sites in asymmetric unit.
+    inverse : array
+        Position in m_index of each metal atom of unit cell.
+    frac : array
+        Fractional coordinates of metal atoms of unit cell.
+
+    """
+    m_index = structure.metal_sites()
+
+    inverse, frac = [], []
+    for k, i in enumerate(m_index):
+        images = structure.images(i)
+        inverse += [k] * len(images)
+        frac.append(images)
+
+    frac = np.concatenate(frac) if frac else np.empty((0, 3))
+
+    return m_index, np.array(inverse, dtype=int), frac
+
+
+def calc_unique_cif(func, structure, cutoff=3.5):
+    """
+    Calculate a parameter for every metal atom of unit cell from the asymmetric unit only.
+
+    Parameters
+    ----------
+    func : function
+        Function of one octahedron, e.g. calc.calc_zeta.
+    structure : CifStructure
+        Crystal structure read from CIF file.
+    cutoff : float
+        Search radius of ligand atoms. Default value is 3.5 Angstroms.
+
+    Returns
+    -------
+    values : array
+        Value of func for every metal atom of unit cell.
+    frac : array
+        Fractional coordinates of metal atoms of unit cell.
+
+    """
+    m_index, inverse, frac = cif_equivalent(structure)
+    _, _, c_octas, _ = structure.extract_all_octa(cutoff)
+
+    values = np.asarray([func(c) for c in c_octas])
+
+    return values[inverse], frac
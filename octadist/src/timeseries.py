@@ -0,0 +1,220 @@
+# OctaDist  Copyright (C) 2019  Rangsiman Ketkaew et al.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+
+import numpy as np
+import scipy.fft
+import scipy.optimize
+
+from octadist.src import profiler
+
+
+def _fft_correlate(a, b, n_lags):
+    """
+    Sums of a[t] * b[t + k] over t for lags k < n_lags, along first axis, by zero-padded FFT.
+
+    """
+    n = scipy.fft.next_fast_len(2 * len(a) - 1, real=True)
+    fa = scipy.fft.rfft(a, n=n, axis=0)
+    fb = fa if b is a else scipy.fft.rfft(b, n=n, axis=0)
+
+    return scipy.fft.irfft(fa.conj() * fb, n=n, axis=0)[:n_lags]
+
+
+@profiler.stage("autocorrelation", arg=0)
+def autocorrelation(x, max_lag=None, normalize=True):
+    """
+    Calculate autocorrelation functions of time series by fast Fourier transform.
+
+    C(k) = < (x(t) - m) (x(t + k) - m) >,
+
+    averaged over all pairs of frames k apart, where m is the mean of series.
+    All series (e.g. every site and parameter) are transformed at once,
+    in O(T log T) time for T frames. NaN values (e.g. frames where
+    parameters could not be computed) are left out of the averages.
+
+    Parameters
+    ----------
+    x : array
+        Time series with frames along the first axis, shape (T,) or (T, ...).
+    max_lag : int, optional
+        Largest lag returned. Default is T - 1.
+    normalize : bool
+        If True, divide by C(0) so that the function starts at 1. Default is True.
+
+    Returns
+    -------
+    acf : array
+        Autocorrelation functions, shape (max_lag + 1, ...).
+        NaN where no pair of valid frames is available.
+
+    Examples
+    --------
+    >>> zeta = np.array([calc_zeta_of_all_sites(frame) for frame in frames])
+    >>> zeta.shape
+    (100000, 64)
+    >>> acf = autocorrelation(zeta, max_lag=5000)
+    >>> acf.shape
+    (5001, 64)
+
+    """
+    x = np.asarray(x, dtype=float)
+    n_frames = len(x)
+    n_lags = n_frames if max_lag is None else min(max_lag + 1, n_frames)
+
+    valid = ~np.isnan(x)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(valid, x, 0.0).sum(axis=0) / valid.sum(axis=0)
+    y = np.where(valid, x - mean, 0.0)
+
+    corr = _fft_correlate(y, y, n_lags)
+
+    if np.all(valid):
+        # Number of pairs is T - k for every series
+        pairs = (n_frames - np.arange(n_lags)).reshape((-1,) + (1,) * (x.ndim - 1))
+    else:
+        pairs = np.rint(_fft_correlate(valid.astype(float), valid.astype(float), n_lags))
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        acf = np.where(pairs > 0, corr / pairs, np.nan)
+        if normalize:
+            acf = acf / acf[0]
+
+    return acf
+
+
+def integrated_time(acf, dt=1.0, window=5.0):
+    """
+    Calculate integrated autocorrelation time.
+
+    tau = dt (1/2 + sum_{k=1}^{M} rho(k)),
+
+    where rho is the normalized autocorrelation function. The sum is cut at the
+    smallest M with M >= window * tau / dt, which keeps the noise of the tail
+    of rho small (automatic windowing of Sokal). Estimates below dt / 2,
+    the value for uncorrelated frames, cannot be told apart from noise
+    (e.g. short series) and are clipped to dt / 2.
+
+    Parameters
+    ----------
+    acf : array
+        Normalized autocorrelation functions from :func:`autocorrelation`, shape (L,) or (L, ...).
+    dt : float
+        Time between frames. Default value is 1.0.
+    window : float
+        Width of summation window in units of tau. Default value is 5.0.
+
+    Returns
+    -------
+    tau : float or array
+        Integrated autocorrelation time, at least dt / 2, shape of acf without the first axis.
+        NaN if the window does not fit in acf (series too short).
+
+    References
+    ----------
+    A. D. Sokal. Monte Carlo Methods in Statistical Mechanics: Foundations
+    and New Algorithms. In: Functional Integration, Springer, 1997, 131-192.
+
+    """
+    acf = np.asarray(acf, dtype=float)
+
+    lags = np.arange(len(acf)).reshape((-1,) + (1,) * (acf.ndim - 1))
+    tau = np.cumsum(np.nan_to_num(acf), axis=0) - 0.5
+
+    # First lag M where M >= window * tau(M)
+    found = lags >= window * tau
+    cut = np.argmax(found, axis=0)
+    tau = np.take_along_axis(tau, cut[np.newaxis], axis=0)[0]
+    tau = np.where(np.any(found, axis=0), np.maximum(tau, 0.5) * dt, np.nan)
+
+    return float(tau) if tau.ndim == 0 else tau
+
+
+def _stretched_exp(t, tau, beta):
+    return np.exp(-(t / tau) ** beta)
+
+
+@profiler.stage("fit_relaxation")
+def fit_relaxation(acf, dt=1.0, cutoff=0.1, stretched=False):
+    """
+    Fit relaxation times to autocorrelation functions.
+
+    Single exponential, rho(t) = exp(-t / tau), is fitted to log rho by least
+    squares through the origin, for all series at once. Stretched exponential
+    (Kohlrausch-Williams-Watts), rho(t) = exp(-(t / tau)^beta), is fitted to
+    rho by nonlinear least squares, one series at a time. Only lags before rho
+    first drops below cutoff are used, since the tail is dominated by noise.
+
+    Parameters
+    ----------
+    acf : array
+        Normalized autocorrelation functions from :func:`autocorrelation`, shape (L,) or (L, ...).
+    dt : float
+        Time between frames. Default value is 1.0.
+    cutoff : float
+        Smallest value of rho used in fit. Default value is 0.1.
+    stretched : bool
+        If True, fit stretched exponential. Default is False.
+
+    Returns
+    -------
+    tau : float or array
+        Relaxation time, shape of acf without the first axis.
+        NaN if fewer than two lags are above cutoff.
+    beta : float or array
+        Stretching exponent, only if stretched is True.
+
+    Examples
+    --------
+    >>> acf = autocorrelation(zeta, max_lag=5000)
+    >>> tau = fit_relaxation(acf, dt=0.5)
+    >>> tau, beta = fit_relaxation(acf, dt=0.5, stretched=True)
+
+    """
+    acf = np.asarray(acf, dtype=float)
+    shape = acf.shape[1:]
+    rho = acf.reshape(len(acf), -1)
+
+    t = np.arange(len(rho))[:, np.newaxis] * dt
+    # Lags before the first drop below cutoff
+    used = np.cumprod(rho > cutoff, axis=0).astype(bool)
+    used[0] = False
+    n_used = used.sum(axis=0)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        log_rho = np.log(np.where(used, rho, 1.0))
+        slope = np.sum(np.where(used, t * log_rho, 0.0), axis=0) / np.sum(np.where(used, t ** 2, 0.0), axis=0)
+        tau = np.where(n_used >= 2, -1 / slope, np.nan)
+
+    if stretched:
+        beta = np.full_like(tau, np.nan)
+        for n in np.flatnonzero(n_used >= 2):
+            mask = used[:, n]
+            try:
+                (tau[n], beta[n]), _ = scipy.optimize.curve_fit(
+                    _stretched_exp, t[mask, 0], rho[mask, n], p0=(tau[n], 1.0),
+                    bounds=((0, 0.05), (np.inf, 2.0)))
+            except RuntimeError:
+                tau[n] = np.nan
+
+    def _out(a):
+        a = a.reshape(shape)
+        return float(a) if a.ndim == 0 else a
+
+    if stretched:
+        return _out(tau), _out(beta)
+
+    return _out(tau)
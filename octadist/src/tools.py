@@ -14,13 +14,22 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
+import itertools
 import tkinter as tk
 from tkinter import scrolledtext as tkscrolled
 
 import numpy as np
+import scipy.spatial
 
-import octadist.src.plane
-from octadist.src import linear, projection
+from octadist.src import linear, profiler
+
+# Indices of the 20 ligand triples of octahedron and the three ligands left out of each triple
+_TRIPLES = np.array(list(itertools.combinations(range(1, 7), 3)))
+_COMPLEMENTS = np.array([[n for n in range(1, 7) if n not in t] for t in _TRIPLES])
+
+# Indices of the 21 atom pairs and the 35 atom triples of octahedral structure
+_ATOM_PAIRS = np.array(list(itertools.combinations(range(7), 2)))
+_ATOM_TRIPLES = np.array(list(itertools.combinations(range(7), 3)))
 
 
 def find_bonds(fal, fcl, cutoff_global=2.0, cutoff_hydrogen=1.2):
@@ -50,39 +59,190 @@ def find_bonds(fal, fcl, cutoff_global=2.0, cutoff_hydrogen=1.2):
         Selected bonds.
 
     """
-    pair_list = []
-    bond_list = []
-    for i in range(len(fcl)):
-        for j in range(i + 1, len(fcl)):
-            if i == 0:
-                distance = linear.euclidean_dist(fcl[i], fcl[j])
-            else:
-                distance = linear.euclidean_dist(fcl[i], fcl[j])
+    fcl = np.asarray(fcl, dtype=float)
 
-            pair_list.append([fal[i], fal[j]])
-            bond_list.append([fcl[i], fcl[j], distance])
+    bond_index, _ = find_bonds_index(fal, fcl, cutoff_global, cutoff_hydrogen)
 
-    check_1_bond_list = []
-    screen_1_pair_list = []
-    for i in range(len(bond_list)):
-        if bond_list[i][2] <= cutoff_global:
-            check_1_bond_list.append([bond_list[i][0],
-                                      bond_list[i][1],
-                                      bond_list[i][2]])
+    check_2_bond_list = [[fcl[i], fcl[j]] for i, j in bond_index]
+
+    return check_2_bond_list
 
-            screen_1_pair_list.append([pair_list[i][0],
-                                       pair_list[i][1]])
 
-    check_2_bond_list = []
-    for i in range(len(check_1_bond_list)):
-        if screen_1_pair_list[i][0] == "H" or screen_1_pair_list[i][1] == "H":
-            if check_1_bond_list[i][2] <= cutoff_hydrogen:
-                check_2_bond_list.append([check_1_bond_list[i][0], check_1_bond_list[i][1]])
+@profiler.stage("find_bonds", arg=1)
+def find_bonds_index(fal, fcl, cutoff_global=2.0, cutoff_hydrogen=1.2):
+    """
+    Find the atom indices and distances of all possible bonds.
 
-        else:
-            check_2_bond_list.append([check_1_bond_list[i][0], check_1_bond_list[i][1]])
+    Candidate pairs within global cutoff are searched with k-d tree,
+    and bonds to hydrogen atoms are then screened with hydrogen cutoff.
+    To get all pairs within a single cutoff, set both cutoffs to the same value.
 
-    return check_2_bond_list
+    Parameters
+    ----------
+    fal : list
+        List of atomic labels of full complex.
+    fcl : list or array
+        List of atomic coordinates of full complex.
+    cutoff_global : float
+        Global cutoff for screening bonds
+        Default value is 2.0 Angstroms.
+    cutoff_hydrogen : float
+        Cutoff for screening bonds between hydrogen and other atoms.
+        Default value is 1.2 Angstroms.
+
+    Returns
+    -------
+    bond_index : array
+        Atom indices (i, j) of bonds with i < j, shape (M, 2), sorted in ascending order.
+    bond_dist : array
+        Bond distances, shape (M,).
+
+    """
+    fcl = np.asarray(fcl, dtype=float).reshape(-1, 3)
+
+    tree = scipy.spatial.cKDTree(fcl)
+    bond_index = tree.query_pairs(cutoff_global, output_type='ndarray').reshape(-1, 2)
+    bond_index = bond_index[np.lexsort((bond_index[:, 1], bond_index[:, 0]))]
+
+    bond_dist = linear.euclidean_dist(fcl[bond_index[:, 0]], fcl[bond_index[:, 1]])
+
+    is_hydrogen = np.array([atom == "H" for atom in fal], dtype=bool).reshape(-1)
+    with_hydrogen = is_hydrogen[bond_index[:, 0]] | is_hydrogen[bond_index[:, 1]]
+    cutoff = np.where(with_hydrogen, cutoff_hydrogen, cutoff_global)
+
+    selected = bond_dist <= cutoff
+
+    return bond_index[selected], bond_dist[selected]
+
+
+def find_angles_index(bond_index):
+    """
+    Find the atom indices of all bond angles from bond indices.
+
+    Every pair of bonds sharing an atom makes one angle i-j-k,
+    where j is the shared (vertex) atom and i < k.
+
+    Parameters
+    ----------
+    bond_index : array
+        Atom indices of bonds, shape (M, 2).
+
+    Returns
+    -------
+    angle_index : array
+        Atom indices (i, j, k) of bond angles, shape (K, 3).
+
+    """
+    bond_index = np.asarray(bond_index, dtype=int).reshape(-1, 2)
+
+    # Every bond is seen from both of its atoms
+    center = np.concatenate((bond_index[:, 0], bond_index[:, 1]))
+    neighbor = np.concatenate((bond_index[:, 1], bond_index[:, 0]))
+    order = np.lexsort((neighbor, center))
+    center = center[order]
+    neighbor = neighbor[order]
+
+    if len(center) == 0:
+        return np.empty((0, 3), dtype=int)
+
+    # Pair each neighbor with the neighbors after it in the group of the same center atom
+    degree = np.bincount(center)
+    group_start = np.cumsum(degree) - degree
+    position = np.arange(len(center)) - group_start[center]
+    n_partner = degree[center] - position - 1
+
+    first = np.repeat(np.arange(len(center)), n_partner)
+    offset = np.arange(len(first)) - np.repeat(np.cumsum(n_partner) - n_partner, n_partner)
+    second = first + offset + 1
+
+    angle_index = np.stack((neighbor[first], center[first], neighbor[second]), axis=1)
+
+    return angle_index
+
+
+@profiler.stage("param_complex", arg=1)
+def calc_param_complex(fal, fcl, cutoff_global=2.0, cutoff_hydrogen=1.2):
+    """
+    Calculate bond distances and bond angles of the complex.
+
+    Only bonded pairs and bonded triplets are taken into account.
+    All distances and angles are computed by NumPy gathers over the index arrays.
+
+    Parameters
+    ----------
+    fal : list
+        List of atomic labels of full complex.
+    fcl : list or array
+        List of atomic coordinates of full complex.
+    cutoff_global : float
+        Global cutoff for screening bonds
+        Default value is 2.0 Angstroms.
+    cutoff_hydrogen : float
+        Cutoff for screening bonds between hydrogen and other atoms.
+        Default value is 1.2 Angstroms.
+
+    Returns
+    -------
+    bond_index : array
+        Atom indices of bonds, shape (M, 2).
+    bond_dist : array
+        Bond distances in Angstrom, shape (M,).
+    angle_index : array
+        Atom indices of bond angles, shape (K, 3). The middle atom is the vertex.
+    bond_angle : array
+        Bond angles in degree, shape (K,).
+
+    See Also
+    --------
+    find_bonds_index : Find bonds of the complex.
+    find_angles_index : Find bond angles from bonds.
+
+    """
+    fcl = np.asarray(fcl, dtype=float).reshape(-1, 3)
+
+    bond_index, bond_dist = find_bonds_index(fal, fcl, cutoff_global, cutoff_hydrogen)
+    angle_index = find_angles_index(bond_index)
+
+    vec1 = fcl[angle_index[:, 0]] - fcl[angle_index[:, 1]]
+    vec2 = fcl[angle_index[:, 2]] - fcl[angle_index[:, 1]]
+    bond_angle = linear.angle_btw_vectors(vec1, vec2)
+
+    return bond_index, bond_dist, angle_index, bond_angle
+
+
+@profiler.stage("param_octa")
+def calc_param_octa(c_octa):
+    """
+    Calculate all interatomic distances and angles of octahedral structures.
+
+    The 21 atom pairs and 35 atom triples of the seven atoms are taken from
+    precomputed index tables in the order of itertools.combinations, and
+    every distance and angle is computed in one NumPy call for the whole batch.
+    The angle of triple (i, j, k) is the angle at atom j.
+
+    Parameters
+    ----------
+    c_octa : list or array
+        Atomic coordinates of octahedral structures, shape (7, 3) or (N, 7, 3).
+
+    Returns
+    -------
+    distance : array
+        Interatomic distances, shape (21,) or (N, 21).
+    angle : array
+        Angles in degree, shape (35,) or (N, 35).
+
+    """
+    c_octa = np.asarray(c_octa, dtype=float)
+
+    distance = linear.euclidean_dist(c_octa[..., _ATOM_PAIRS[:, 0], :],
+                                     c_octa[..., _ATOM_PAIRS[:, 1], :])
+
+    vertex = c_octa[..., _ATOM_TRIPLES[:, 1], :]
+    angle = linear.angle_btw_vectors(c_octa[..., _ATOM_TRIPLES[:, 0], :] - vertex,
+                                     c_octa[..., _ATOM_TRIPLES[:, 2], :] - vertex)
+
+    return distance, angle
 
 
 def find_faces_octa(c_octa):
@@ -124,67 +284,66 @@ def find_faces_octa(c_octa):
         [2 3 5]]                   [1 4 6]]
 
     """
-    ########################
-    # Find reference faces #
-    ########################
-
-    # Find the shortest distance from metal center to each triangle
-    distance = []
-    a_ref_f = []
-    c_ref_f = []
-    for i in range(1, 5):
-        for j in range(i + 1, 6):
-            for k in range(j + 1, 7):
-                a, b, c, d = octadist.src.plane.find_eq_of_plane(c_octa[i],
-                                                                     c_octa[j],
-                                                                     c_octa[k])
-                m = projection.project_atom_onto_plane(c_octa[0], a, b, c, d)
-                d_btw = linear.euclidean_dist(m, c_octa[0])
-                distance.append(d_btw)
-
-                a_ref_f.append([i, j, k])
-                c_ref_f.append([c_octa[i],
-                                c_octa[j],
-                                c_octa[k]])
-
-    # Sort faces by distance in ascending order
-    dist_a_c = list(zip(distance, a_ref_f, c_ref_f))
-    dist_a_c.sort()
-    distance, a_ref_f, c_ref_f = list(zip(*dist_a_c))
-    c_ref_f = np.asarray(c_ref_f)
-
-    # Remove first 12 triangles, the rest of triangles is 8 faces of octahedron
-    a_ref_f = a_ref_f[12:]
-    c_ref_f = c_ref_f[12:]
-
-    #######################
-    # Find opposite faces #
-    #######################
-
-    all_atom = [1, 2, 3, 4, 5, 6]
-    a_oppo_f = []
-
-    for i in range(len(a_ref_f)):
-        new_a_ref_f = []
-        for j in all_atom:
-            if j not in (a_ref_f[i][0], a_ref_f[i][1], a_ref_f[i][2]):
-                new_a_ref_f.append(j)
-        a_oppo_f.append(new_a_ref_f)
-
-    v = np.array(c_octa)
-    c_oppo_f = []
-
-    for i in range(len(a_oppo_f)):
-        coord_oppo = []
-        for j in range(3):
-            coord_oppo.append([v[int(a_oppo_f[i][j])][0],
-                               v[int(a_oppo_f[i][j])][1],
-                               v[int(a_oppo_f[i][j])]][2])
-        c_oppo_f.append(coord_oppo)
+    c_octa = np.asarray(c_octa)
+
+    a_ref_f, a_oppo_f = find_faces_octa_batch(c_octa)
+
+    c_ref_f = c_octa[a_ref_f]
+    c_oppo_f = c_octa[a_oppo_f]
+
+    a_ref_f = a_ref_f.tolist()
+    a_oppo_f = a_oppo_f.tolist()
 
     return a_ref_f, c_ref_f, a_oppo_f, c_oppo_f
 
 
+@profiler.stage("find_faces")
+def find_faces_octa_batch(c_octa):
+    """
+    Find the indices of eight reference faces and eight opposite faces for many octahedra at once.
+
+    The distances between metal center atom and the 20 planes defined by all
+    ligand triples are computed in a single NumPy call using the index tables
+    of ligand triples and their complements. The eight farthest planes are
+    the faces of octahedron.
+
+    Parameters
+    ----------
+    c_octa : array
+        Atomic coordinates of octahedral structures, shape (7, 3) or (N, 7, 3).
+
+    Returns
+    -------
+    ref_index : array
+        Atom indices of reference faces, shape (8, 3) or (N, 8, 3).
+    oppo_index : array
+        Atom indices of opposite faces, shape (8, 3) or (N, 8, 3).
+
+    See Also
+    --------
+    find_faces_octa : Find the faces of single octahedral structure.
+
+    """
+    c_octa = np.asarray(c_octa, dtype=float)
+
+    metal = c_octa[..., 0, :]
+    vertex = c_octa[..., _TRIPLES, :]
+    p1 = vertex[..., 0, :]
+
+    normal = np.cross(vertex[..., 2, :] - p1, vertex[..., 1, :] - p1)
+    height = np.einsum('...k,...k->...', normal, metal[..., np.newaxis, :] - p1)
+    distance = np.abs(height) / np.linalg.norm(normal, axis=-1)
+
+    # Triples are listed in lexicographic order, so stable sort breaks ties the same way
+    # as sorting the (distance, triple) tuples.
+    faces = np.argsort(distance, axis=-1, kind='stable')[..., 12:]
+
+    ref_index = _TRIPLES[faces]
+    oppo_index = _COMPLEMENTS[faces]
+
+    return ref_index, oppo_index
+
+
 def find_surface_area(aco):
     """
     Calculate the area of eight triangular faces of octahedral structure.
@@ -334,34 +493,17 @@ def param_complex(acf):
     box.insert(tk.INSERT, "Bond distance (Å)")
 
     fal, fcl = acf[0]
-    for i in range(len(fcl)):
-        for j in range(i + 1, len(fcl)):
-            distance = linear.euclidean_dist(fcl[i], fcl[j])
+    bond_index, bond_dist, angle_index, bond_angle = calc_param_complex(fal, fcl)
 
-            if i == 0:
-                texts = f"{fal[i]}-{fal[j]}{j} {distance:10.6f}"
-
-            else:
-                texts = f"{fal[i]}{i}-{fal[j]}{j} {distance:10.6f}"
-
-            box.insert(tk.END, "\n" + texts)
+    for (i, j), distance in zip(bond_index, bond_dist):
+        texts = f"{fal[i]}{i}-{fal[j]}{j} {distance:10.6f}"
+        box.insert(tk.END, "\n" + texts)
 
     box.insert(tk.END, "\n\nBond angle (°)")
 
-    for i in range(len(fcl)):
-        for j in range(i + 1, len(fcl)):
-            for k in range(j + 1, len(fcl)):
-                vec1 = fcl[i] - fcl[j]
-                vec2 = fcl[k] - fcl[j]
-                angle = linear.angle_btw_vectors(vec1, vec2)
-
-                if i == 0:
-                    texts = f"{fal[k]}{k}-{fal[i]}-{fal[j]}{j} {angle:10.6f}"
-
-                else:
-                    texts = f"{fal[k]}{k}-{fal[i]}{i}-{fal[j]}{j} {angle:10.6f}"
-
-                box.insert(tk.END, "\n" + texts)
+    for (i, j, k), angle in zip(angle_index, bond_angle):
+        texts = f"{fal[i]}{i}-{fal[j]}{j}-{fal[k]}{k} {angle:10.6f}"
+        box.insert(tk.END, "\n" + texts)
 
     box.insert(tk.END, "\n")
 
@@ -391,6 +533,8 @@ def param_octa(aco):
     box = tkscrolled.ScrolledText(frame, wrap="word", width="50", height="30", undo="True")
     box.grid(row=1, pady="5", padx="5")
 
+    distance, angle = calc_param_octa([aco[n][3] for n in range(len(aco))])
+
     for n in range(len(aco)):
         if n > 0:  # separator between files
             box.insert(tk.END, "\n\n=================================\n\n")
@@ -399,33 +543,24 @@ def param_octa(aco):
         box.insert(tk.END, f"Metal: {aco[n][1]}\n")
         box.insert(tk.END, "Bond distance (Å)")
 
-        for i in range(7):
-            for j in range(i + 1, 7):
-                distance = linear.euclidean_dist(aco[n][3][i], aco[n][3][j])
-
-                if i == 0:
-                    texts = f"{aco[n][2][i]}-{aco[n][2][j]}{j} {distance:10.6f}"
+        for (i, j), dist in zip(_ATOM_PAIRS, distance[n]):
+            if i == 0:
+                texts = f"{aco[n][2][i]}-{aco[n][2][j]}{j} {dist:10.6f}"
 
-                else:
-                    texts = f"{aco[n][2][i]}{i}-{aco[n][2][j]}{j} {distance:10.6f}"
+            else:
+                texts = f"{aco[n][2][i]}{i}-{aco[n][2][j]}{j} {dist:10.6f}"
 
-                box.insert(tk.END, "\n" + texts)
+            box.insert(tk.END, "\n" + texts)
 
         box.insert(tk.END, "\n\nBond angle (°)")
 
-        for i in range(7):
-            for j in range(i + 1, 7):
-                for k in range(j + 1, 7):
-                    vec1 = aco[n][3][i] - aco[n][3][j]
-                    vec2 = aco[n][3][k] - aco[n][3][j]
-                    angle = linear.angle_btw_vectors(vec1, vec2)
-
-                    if i == 0:
-                        texts = f"{aco[n][2][k]}{k}-{aco[n][2][i]}-{aco[n][2][j]}{j} {angle:10.6f}"
+        for (i, j, k), ang in zip(_ATOM_TRIPLES, angle[n]):
+            if i == 0:
+                texts = f"{aco[n][2][k]}{k}-{aco[n][2][i]}-{aco[n][2][j]}{j} {ang:10.6f}"
 
-                    else:
-                        texts = f"{aco[n][2][k]}{k}-{aco[n][2][i]}{i}-{aco[n][2][j]}{j} {angle:10.6f}"
+            else:
+                texts = f"{aco[n][2][k]}{k}-{aco[n][2][i]}{i}-{aco[n][2][j]}{j} {ang:10.6f}"
 
-                    box.insert(tk.END, "\n" + texts)
+            box.insert(tk.END, "\n" + texts)
 
         box.insert(tk.END, "\n")
@@ -0,0 +1,311 @@
+# OctaDist  Copyright (C) 2019  Rangsiman Ketkaew et al.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
+
+import collections
+
+import numpy as np
+import scipy.spatial
+
+from octadist.src import coord, periodic, profiler
+
+ExchangeEvent = collections.namedtuple("ExchangeEvent", ["frame", "metal", "slot", "old", "new"])
+
+
+class OctaExtractor:
+    """
+    Extract octahedra of metal atoms frame by frame with Verlet neighbour lists.
+
+    For every metal, the atoms within radius = max(cutoff, d_6) + skin are kept
+    as candidates, where d_6 is the distance to its sixth nearest atom when the
+    list is built. In the next frames the six nearest atoms are chosen among
+    these few candidates only. The lists are rebuilt when an atom has moved
+    more than half the skin since the last build, or when the sixth nearest
+    candidate of a metal is too far to rule out that an atom outside the list
+    has come closer. The result is always the same as a full search.
+
+    Parameters
+    ----------
+    a_full : list
+        Atomic labels of all atoms, the same in every frame.
+    m_index : list, optional
+        Indices (0-based) of metal atoms to follow. Default is all metals.
+    skin : float
+        Thickness of skin in Angstrom. Default value is 1.0.
+    cutoff : float
+        Smallest radius of neighbour lists, without skin. Default value is 2.5 Angstroms.
+    lattice : array, optional
+        Lattice vectors as rows, shape (3, 3), for periodic structures.
+
+    Examples
+    --------
+    >>> extractor = OctaExtractor(a_full)
+    >>> for frame in frames:
+    ...     c_octas, l_index = extractor.extract(frame)
+    >>> extractor.n_builds
+
+    """
+
+    def __init__(self, a_full, m_index=None, skin=1.0, cutoff=2.5, lattice=None):
+        self.a_full = list(a_full)
+        self.m_index = np.asarray(coord.find_metal_index(a_full) if m_index is None else m_index, dtype=int)
+        self.skin = skin
+        self.cutoff = cutoff
+        self.lattice = None if lattice is None else np.asarray(lattice, dtype=float)
+
+        self.n_builds = 0
+        self.n_frames = 0
+        self._reference = None
+
+    def build(self, c_full):
+        """
+        Build neighbour lists of metals from coordinates of one frame.
+
+        Parameters
+        ----------
+        c_full : array
+            Atomic coordinates of all atoms, shape (N, 3).
+
+        Returns
+        -------
+        None : None
+
+        """
+        c_full = np.asarray(c_full, dtype=float)
+
+        if self.lattice is None:
+            c_image, index = c_full, np.arange(len(c_full))
+            c_metal = c_full[self.m_index]
+            tree = scipy.spatial.cKDTree(c_image)
+            d6 = tree.query(c_metal, k=7)[0][:, 6]
+        else:
+            pad = self.cutoff + self.skin
+            while True:
+                index, c_image = periodic.padded_images(c_full, self.lattice, pad)
+                # Atoms of unit cell come first in c_image
+                c_metal = c_image[self.m_index]
+                tree = scipy.spatial.cKDTree(c_image)
+                d6 = tree.query(c_metal, k=7)[0][:, 6]
+                if np.all(np.maximum(d6, self.cutoff) + self.skin <= pad):
+                    break
+                pad = np.max(d6) + self.skin
+
+        self.radius = np.maximum(d6, self.cutoff) + self.skin
+        neighbors = tree.query_ball_point(c_metal, self.radius)
+
+        # Pad ragged neighbour lists, offset is the shift from atom (as given) to its image near the metal
+        width = max(len(n) for n in neighbors) if len(neighbors) else 0
+        self.candidates = np.zeros((len(self.m_index), width), dtype=int)
+        self.offsets = np.zeros((len(self.m_index), width, 3))
+        self.mask = np.zeros((len(self.m_index), width), dtype=bool)
+
+        metal_shift = c_metal - c_full[self.m_index]
+        for n, near in enumerate(neighbors):
+            near = np.asarray(near, dtype=int)
+            atom = index[near]
+            self.candidates[n, :len(near)] = atom
+            self.offsets[n, :len(near)] = c_image[near] - c_full[atom] - metal_shift[n]
+            self.mask[n, :len(near)] = True
+
+        self._reference = c_full.copy()
+        self.n_builds += 1
+
+    @profiler.stage("extract_octa_frame", arg=1)
+    def extract(self, c_full):
+        """
+        Extract octahedra of all followed metals from one frame.
+
+        Parameters
+        ----------
+        c_full : array
+            Atomic coordinates of all atoms, shape (N, 3).
+
+        Returns
+        -------
+        c_octas : array
+            Atomic coordinates of octahedral structures, shape (M, 7, 3).
+            For periodic structures ligands are unwrapped around the metal.
+        l_index : array
+            Indices (0-based) of ligand atoms, shape (M, 6), sorted by distance.
+
+        """
+        c_full = np.asarray(c_full, dtype=float)
+
+        if self._reference is None or self._reference.shape != c_full.shape:
+            self.build(c_full)
+
+        moved = np.sqrt(np.max(np.sum((c_full - self._reference) ** 2, axis=1), initial=0))
+        if moved > self.skin / 2:
+            self.build(c_full)
+            moved = 0.0
+
+        result = self._select(c_full, moved)
+        if result is None:
+            self.build(c_full)
+            result = self._select(c_full, 0.0)
+
+        self.n_frames += 1
+
+        return result
+
+    def _select(self, c_full, moved):
+        """
+        Six nearest candidates of every metal, or None if the lists might miss an atom.
+
+        """
+        c_metal = c_full[self.m_index]
+        pos = c_full[self.candidates] + self.offsets
+
+        dist = np.linalg.norm(pos - c_metal[:, np.newaxis, :], axis=-1)
+        # The metal itself and padding
+        dist[~self.mask | (self.candidates == self.m_index[:, np.newaxis]) & (dist < 1e-8)] = np.inf
+
+        nearest = np.argpartition(dist, 5, axis=1)[:, :6]
+        rows = np.arange(len(dist))[:, np.newaxis]
+        nearest = nearest[rows, np.argsort(dist[rows, nearest], axis=1, kind='stable')]
+
+        # Atoms outside the lists are at least radius - 2 * moved away
+        if np.any(dist[rows[:, 0], nearest[:, 5]] > self.radius - 2 * moved):
+            return None
+
+        c_octas = np.concatenate((c_metal[:, np.newaxis, :], pos[rows, nearest]), axis=1)
+        l_index = self.candidates[rows, nearest]
+
+        return c_octas, l_index
+
+
+class LigandTracker:
+    """
+    Follow the ligand atoms of every metal with fixed order across trajectory frames.
+
+    Ligands keep the position (slot) they had in the first frame,
+    so per-bond time series stay consistent when bond lengths cross.
+    A slot changes its atom only when the coordination shell really changes:
+    an atom that is not a ligand replaces a ligand only if it is closer
+    to the metal by more than tolerance. Every replacement is recorded
+    as an exchange event.
+
+    Ligands are identified by atom index, so periodic cells must be larger
+    than twice the metal-ligand distance (no ligand bonded through two images).
+
+    Parameters
+    ----------
+    a_full : list
+        Atomic labels of all atoms, the same in every frame.
+    m_index : list, optional
+        Indices (0-based) of metal atoms to follow. Default is all metals.
+    tolerance : float
+        Distance in Angstrom an entering atom must be closer than the leaving ligand,
+        to avoid flickering between two nearly equidistant atoms. Default value is 0.1.
+    extractor : dict
+        Keyword arguments passed to OctaExtractor, e.g. skin or lattice.
+
+    Examples
+    --------
+    >>> tracker = LigandTracker(a_full)
+    >>> for frame in frames:
+    ...     c_octas, l_index = tracker.update(frame)
+    ...     bond_dist = np.linalg.norm(c_octas[:, 1:] - c_octas[:, :1], axis=-1)
+    >>> tracker.events
+    [ExchangeEvent(frame=812, metal=0, slot=4, old=37, new=52)]
+
+    """
+
+    def __init__(self, a_full, m_index=None, tolerance=0.1, **extractor):
+        self.extractor = OctaExtractor(a_full, m_index, **extractor)
+        self.m_index = self.extractor.m_index
+        self.tolerance = tolerance
+
+        self.l_index = None
+        self.events = []
+        self.n_frames = 0
+
+    def _displacement(self, c_full, atoms, sites=None):
+        """
+        Vectors from followed metals (or only metals at positions sites) to atoms, shape (M, K, 3),
+        under minimum image if periodic.
+
+        """
+        metals = self.m_index if sites is None else self.m_index[sites]
+        d = c_full[atoms] - c_full[metals][:, np.newaxis, :]
+
+        lattice = self.extractor.lattice
+        if lattice is not None:
+            d_frac = periodic.cart_to_frac(d, lattice).reshape(-1, 3)
+            d = periodic.minimum_image(d_frac, lattice)[0].reshape(atoms.shape + (3,))
+
+        return d
+
+    @profiler.stage("track_ligands", arg=1)
+    def update(self, c_full):
+        """
+        Add one frame.
+
+        Parameters
+        ----------
+        c_full : array
+            Atomic coordinates of all atoms, shape (N, 3).
+
+        Returns
+        -------
+        c_octas : array
+            Atomic coordinates of octahedral structures, shape (M, 7, 3),
+            ligands in the fixed order of l_index.
+        l_index : array
+            Indices (0-based) of ligand atoms, shape (M, 6).
+
+        """
+        c_full = np.asarray(c_full, dtype=float)
+        _, nearest = self.extractor.extract(c_full)
+
+        if self.l_index is None:
+            self.l_index = nearest.copy()
+        else:
+            # Sites whose six nearest atoms are not the followed ligands
+            changed = np.flatnonzero(np.any(np.sort(nearest, axis=1) != np.sort(self.l_index, axis=1), axis=1))
+            if len(changed):
+                self._exchange(c_full, changed, nearest[changed])
+
+        d = self._displacement(c_full, self.l_index)
+        c_metal = c_full[self.m_index][:, np.newaxis, :]
+        c_octas = np.concatenate((c_metal, c_metal + d), axis=1)
+
+        self.n_frames += 1
+
+        return c_octas, self.l_index.copy()
+
+    def _exchange(self, c_full, sites, nearest):
+        """
+        Replace leaving ligands of sites by entering atoms that are clearly closer.
+
+        """
+        d_old = np.linalg.norm(self._displacement(c_full, self.l_index[sites], sites), axis=-1)
+        d_new = np.linalg.norm(self._displacement(c_full, nearest, sites), axis=-1)
+
+        for n, site in enumerate(sites):
+            ligands = self.l_index[site]
+
+            leaving = np.flatnonzero(~np.isin(ligands, nearest[n]))
+            entering = np.flatnonzero(~np.isin(nearest[n], ligands))
+
+            # Farthest ligand leaves first, closest atom enters first
+            leaving = leaving[np.argsort(-d_old[n, leaving], kind='stable')]
+            entering = entering[np.argsort(d_new[n, entering], kind='stable')]
+
+            for slot, k in zip(leaving, entering):
+                if d_new[n, k] < d_old[n, slot] - self.tolerance:
+                    self.events.append(ExchangeEvent(self.n_frames, int(self.m_index[site]), int(slot),
+                                                     int(ligands[slot]), int(nearest[n, k])))
+                    ligands[slot] = nearest[n, k]
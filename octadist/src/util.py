@@ -15,6 +15,7 @@
 # ++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++++
 
 import functools
+import itertools
 
 import numpy as np
 import rmsd
@@ -288,3 +289,148 @@ def calc_rmsd(acf):
     rmsd_rotate = rmsd.rmsd(coord_strct_1, coord_strct_2)
 
     return rmsd_normal, rmsd_translate, rmsd_rotate
+
+
+def _find_octa_perms():
+    """
+    Find the ligand permutations generated by the 48 symmetry operations of octahedron.
+
+    Vertices of ideal octahedron are labelled in the order of +x, -x, +y, -y, +z, and -z.
+    Every symmetry operation of O_h group is a signed permutation matrix,
+    which maps one vertex onto another.
+
+    Returns
+    -------
+    perms : array
+        Array of shape (48, 6) containing the new order of vertices.
+
+    """
+    vertices = np.array([[1, 0, 0], [-1, 0, 0],
+                         [0, 1, 0], [0, -1, 0],
+                         [0, 0, 1], [0, 0, -1]])
+
+    perms = []
+    for axes in itertools.permutations(range(3)):
+        for signs in itertools.product([1, -1], repeat=3):
+            op = np.zeros((3, 3), dtype=int)
+            op[range(3), axes] = signs
+            new_vertices = vertices @ op.T
+            match = np.all(new_vertices[:, np.newaxis, :] == vertices[np.newaxis, :, :], axis=-1)
+            perms.append(np.argmax(match, axis=1))
+
+    return np.asarray(perms)
+
+
+_OCTA_PERMS = _find_octa_perms()
+
+
+def _sort_trans_pairs(c_octa):
+    """
+    Reorder six ligand atoms so that trans ligands are listed next to each other.
+
+    The most linear L-M-L pair is picked first, then the most linear pair among
+    the four remaining ligands, and the last two ligands form the third pair.
+
+    Parameters
+    ----------
+    c_octa : array
+        Atomic coordinates of octahedral structures, shape (..., 7, 3).
+
+    Returns
+    -------
+    c_sorted : array
+        Atomic coordinates with metal first and ligands in (+x, -x, +y, -y, +z, -z) order.
+
+    """
+    vec = c_octa[..., 1:, :] - c_octa[..., :1, :]
+    vec = vec / np.linalg.norm(vec, axis=-1, keepdims=True)
+    cos = np.einsum('...ik,...jk->...ij', vec, vec)
+    cos[..., range(6), range(6)] = np.inf
+
+    batch = cos.shape[:-2]
+    cos = cos.reshape(-1, 6, 6)
+    rows = np.arange(len(cos))
+    order = np.empty((len(cos), 6), dtype=int)
+
+    for k in range(3):
+        flat = np.argmin(cos.reshape(-1, 36), axis=1)
+        i, j = np.divmod(flat, 6)
+        order[:, 2 * k] = i
+        order[:, 2 * k + 1] = j
+        for n in (i, j):
+            cos[rows, n, :] = np.inf
+            cos[rows, :, n] = np.inf
+
+    order = order.reshape(batch + (6,))
+    ligands = np.take_along_axis(c_octa[..., 1:, :], order[..., np.newaxis], axis=-2)
+    c_sorted = np.concatenate((c_octa[..., :1, :], ligands), axis=-2)
+
+    return c_sorted
+
+
+def calc_rmsd_octa(c_octa_1, c_octa_2):
+    """
+    Calculate RMSD between two octahedral structures regardless of the order of ligand atoms.
+
+    1) Put trans ligands of each structure next to each other.
+    2) Generate 48 ligand correspondences from the symmetry operations of octahedron.
+    3) Superimpose the structures for all correspondences at once using Kabsch algorithm.
+    4) Take the lowest RMSD.
+
+    Both arguments can be a single octahedron or a stack of octahedra,
+    the leading dimensions are broadcast against each other.
+
+    Parameters
+    ----------
+    c_octa_1 : array
+        Atomic coordinates of octahedral structure, shape (7, 3) or (N, 7, 3).
+    c_octa_2 : array
+        Atomic coordinates of octahedral structure, shape (7, 3) or (N, 7, 3).
+
+    Returns
+    -------
+    rmsd_octa : float or array
+        Kabsch RMSD of the best ligand correspondence.
+
+    References
+    ----------
+    W. Kabsch, Acta Cryst. 1976, A32, 922-923.
+
+    Examples
+    --------
+    >>> coord
+    [[2.298354000, 5.161785000, 7.971898000],  # <- Metal atom
+     [1.885657000, 4.804777000, 6.183726000],
+     [1.747515000, 6.960963000, 7.932784000],
+     [4.094380000, 5.807257000, 7.588689000],
+     [0.539005000, 4.482809000, 8.460004000],
+     [2.812425000, 3.266553000, 8.131637000],
+     [2.886404000, 5.392925000, 9.848966000]]
+    >>> shuffled = [coord[0], coord[4], coord[2], coord[6], coord[1], coord[5], coord[3]]
+    >>> calc_rmsd_octa(coord, shuffled)
+    0.0
+
+    """
+    c_octa_1 = _sort_trans_pairs(np.asarray(c_octa_1, dtype=float))
+    c_octa_2 = _sort_trans_pairs(np.asarray(c_octa_2, dtype=float))
+
+    # Metal stays at the first position in every correspondence
+    perms = np.concatenate((np.zeros((48, 1), dtype=int), _OCTA_PERMS + 1), axis=1)
+
+    a = c_octa_1 - c_octa_1.mean(axis=-2, keepdims=True)
+    b = c_octa_2 - c_octa_2.mean(axis=-2, keepdims=True)
+    b = b[..., perms, :]
+
+    # Covariance matrices of all correspondences, shape (..., 48, 3, 3)
+    h = np.einsum('...ki,...pkj->...pij', a, b)
+    u, s, vt = np.linalg.svd(h)
+    d = np.sign(np.linalg.det(u) * np.linalg.det(vt))
+
+    e0 = np.einsum('...ij,...ij->...', a, a)[..., np.newaxis] + np.einsum('...pij,...pij->...p', b, b)
+    msd = (e0 - 2 * (s[..., 0] + s[..., 1] + d * s[..., 2])) / 7
+    rmsd_octa = np.sqrt(np.clip(msd.min(axis=-1), 0, None))
+
+    if rmsd_octa.ndim == 0:
+        return float(rmsd_octa)
+
+    return rmsd_octa
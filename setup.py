@@ -34,6 +34,9 @@ setuptools.setup(
         'matplotlib',
         'rmsd'
     ],
+    extras_require={
+        'export': ['pyarrow'],
+    },
     classifiers=[
         "Programming Language :: Python",
         "Programming Language :: Python :: 3",
@@ -0,0 +1,45 @@
+import itertools
+
+import numpy as np
+
+from octadist.src import cif, periodic
+
+
+def p21c(n_sites=60, seed=0):
+    rng = np.random.default_rng(seed)
+    ops = ["x,y,z", "-x,y+1/2,-z+1/2", "-x,-y,-z", "x,-y+1/2,z+1/2"]
+    rotations, translations = zip(*[cif.parse_symop(op) for op in ops])
+    atoms = ["Fe"] * 5 + ["O"] * (n_sites - 5)
+    return cif.CifStructure((11, 12, 13, 90, 101, 90), atoms, atoms, rng.random((n_sites, 3)), rotations, translations)
+
+
+def perovskite():
+    rotations = [np.eye(3)[list(p)] * np.array(s)[:, np.newaxis]
+                 for p in itertools.permutations(range(3)) for s in itertools.product([1, -1], repeat=3)]
+    return cif.CifStructure((3.905, 3.905, 3.905, 90, 90, 90), ["Sr", "Ti", "O"], ["Sr", "Ti", "O"],
+                            [[0.5, 0.5, 0.5], [0, 0, 0], [0.5, 0, 0]], rotations, np.zeros((48, 3)))
+
+
+def test_neighbourhood_matches_expanded_cell():
+    structure = p21c()
+    _, c_full, site_full = structure.expand()
+    frac_full = periodic.cart_to_frac(c_full, structure.lattice)
+
+    for i in structure.metal_sites():
+        for cutoff in (3.5, 7.0):
+            site, d_cart, dist = structure.neighbourhood(structure.frac[i], cutoff)
+            k, _, ref = periodic.images_within(frac_full - structure.frac[i], structure.lattice, cutoff)
+
+            assert np.all(np.diff(dist) >= 0)
+            assert np.allclose(dist, np.sort(ref))
+            assert sorted(site.tolist()) == sorted(site_full[k].tolist())
+
+
+def test_neighbourhood_special_positions():
+    structure = perovskite()
+    site, _, dist = structure.neighbourhood(structure.frac[1], 3.5)
+
+    # Ti, six O, and eight Sr, each generated once
+    assert site.tolist()[:7] == [1] + [2] * 6
+    assert sorted(site.tolist()[7:]) == [0] * 8
+    assert np.allclose(dist[1:7], 3.905 / 2)
@@ -0,0 +1,45 @@
+import os
+
+import numpy as np
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+
+from octadist.src.export import ResultWriter
+
+
+def write(path, file_format, n_rows, batch=5000):
+    rng = np.random.default_rng(0)
+    with ResultWriter(path, file_format, row_group_size=4096) as writer:
+        for start in range(0, n_rows, batch):
+            n = min(batch, n_rows - start)
+            z = rng.random(n)
+            files = ["struct_%08d.xyz" % i for i in range(start, start + n)]
+            writer.write_batch(files, "Fe", 0, z, z, z, z)
+    return os.path.getsize(path)
+
+
+def read(path, file_format):
+    if file_format == "parquet":
+        import pyarrow.parquet as pq
+        return pq.read_table(path)
+    return pa.ipc.open_file(path).read_all()
+
+
+@pytest.mark.parametrize("file_format", ["parquet", "arrow"])
+def test_size_grows_linearly_with_rows(tmp_path, file_format):
+    small = write(str(tmp_path / "small"), file_format, 40000)
+    large = write(str(tmp_path / "large"), file_format, 160000)
+
+    assert large / small < 4.4
+
+
+@pytest.mark.parametrize("file_format", ["parquet", "arrow"])
+def test_round_trip_labels(tmp_path, file_format):
+    path = str(tmp_path / "out")
+    write(path, file_format, 12345)
+    table = read(path, file_format)
+
+    assert table.num_rows == 12345
+    assert table.column("file").to_pylist() == ["struct_%08d.xyz" % i for i in range(12345)]
+    assert set(table.column("metal").to_pylist()) == {"Fe"}
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from octadist.src import calc, generate, gradient
+
+CASES = [
+    (calc.calc_zeta, gradient.grad_zeta),
+    (calc.calc_delta, gradient.grad_delta),
+    (calc.calc_sigma, gradient.grad_sigma),
+]
+
+
+@pytest.fixture(scope="module")
+def octas():
+    _, c_octa = generate.ideal_octa()
+    return generate.perturb_octa(c_octa, 20, stretch=0.05, angle=5.0, elongation=0.1, seed=7)
+
+
+@pytest.mark.parametrize("func, grad", CASES)
+def test_matches_finite_differences(octas, func, grad):
+    for c_octa in octas:
+        assert gradient.check_grad(func, grad, c_octa) < 1e-5
+
+
+@pytest.mark.parametrize("func, grad", CASES)
+def test_values_match_calc(octas, func, grad):
+    values, grads = grad(octas, return_value=True)
+    assert grads.shape == octas.shape
+    np.testing.assert_allclose(values, [func(c) for c in octas], rtol=1e-10, atol=1e-12)
+
+    value, single = grad(octas[0], return_value=True)
+    assert isinstance(value, float)
+    np.testing.assert_allclose(value, func(octas[0]), rtol=1e-10, atol=1e-12)
+    np.testing.assert_allclose(single, grads[0])
+
+
+@pytest.mark.parametrize("func, grad", CASES)
+def test_translation_invariance(octas, func, grad):
+    # Moving all atoms together does not change the parameter
+    np.testing.assert_allclose(grad(octas).sum(axis=1), 0, atol=1e-9)
@@ -0,0 +1,42 @@
+import numpy as np
+
+from octadist.src import stats
+
+
+def step_series(n_frames=3000, n_sites=4, jump=1000, seed=0):
+    rng = np.random.default_rng(seed)
+    x = rng.normal(0.3, 0.02, (n_frames, n_sites))
+    x[jump:] += 0.15
+    return x
+
+
+def test_change_detector_finds_jump():
+    events = stats.ChangeDetector(4).update(step_series())
+
+    assert sorted(e.site for e in events) == [(0,), (1,), (2,), (3,)]
+    for e in events:
+        assert e.direction == 1
+        assert e.onset == 1000
+        assert abs(e.before - 0.3) < 0.01
+        assert abs(e.after - 0.45) < 0.03
+
+
+def test_change_detector_nan_keeps_state():
+    x = step_series()
+    detector = stats.ChangeDetector(4)
+    detector.update(x[:1002])
+
+    state = {k: v.copy() for k, v in vars(detector).items() if isinstance(v, np.ndarray)}
+    detector.update(np.full(4, np.nan))
+    for key, value in state.items():
+        np.testing.assert_array_equal(getattr(detector, key), value, err_msg=key)
+
+
+def test_change_detector_nan_after_jump():
+    x = step_series()
+    x[1001:1006, 1] = np.nan
+
+    events = {e.site: e for e in stats.ChangeDetector(4).update(x)}
+
+    assert events[(1,)].onset == 1000
+    assert abs(events[(1,)].after - 0.45) < 0.03
@@ -0,0 +1,56 @@
+import numpy as np
+
+from octadist.src import timeseries
+
+
+def ar1(phi, n_frames, n_series, seed=0):
+    rng = np.random.default_rng(seed)
+    noise = rng.normal(size=(n_frames, n_series))
+    x = np.empty_like(noise)
+    x[0] = noise[0] / np.sqrt(1 - phi ** 2)
+    for t in range(1, n_frames):
+        x[t] = phi * x[t - 1] + noise[t]
+    return x
+
+
+def direct_acf(x, max_lag):
+    mean = np.nanmean(x, axis=0)
+    acf = np.empty((max_lag + 1,) + x.shape[1:])
+    for k in range(max_lag + 1):
+        acf[k] = np.nanmean((x[:len(x) - k] - mean) * (x[k:] - mean), axis=0)
+    return acf / acf[0]
+
+
+def test_autocorrelation_matches_direct_sum():
+    x = ar1(0.8, 500, 3)
+
+    assert np.allclose(timeseries.autocorrelation(x, max_lag=50), direct_acf(x, 50))
+
+
+def test_autocorrelation_skips_nan_frames():
+    x = ar1(0.8, 500, 3)
+    rng = np.random.default_rng(1)
+    x[rng.random(x.shape) < 0.1] = np.nan
+    x[100:120, 0] = np.nan
+
+    assert np.allclose(timeseries.autocorrelation(x, max_lag=50), direct_acf(x, 50))
+
+
+def test_ar1_relaxation_time():
+    phi = 0.9
+    acf = timeseries.autocorrelation(ar1(phi, 100000, 4), max_lag=500)
+
+    tau_int = timeseries.integrated_time(acf, dt=0.5)
+    tau_fit = timeseries.fit_relaxation(acf, dt=0.5)
+
+    assert np.allclose(tau_int, 0.5 * (1 + phi) / (2 * (1 - phi)), rtol=0.1)
+    assert np.allclose(tau_fit, -0.5 / np.log(phi), rtol=0.1)
+
+
+def test_integrated_time_not_below_half_frame():
+    rng = np.random.default_rng(0)
+    acf = timeseries.autocorrelation(rng.normal(size=(5, 200)))
+    tau = timeseries.integrated_time(acf, dt=2.0)
+
+    assert np.all(tau >= 1.0)
+    assert np.any(tau == 1.0)
@@ -0,0 +1,72 @@
+import numpy as np
+
+from octadist.src import generate, trajectory
+
+
+def make_sites(n_sites, spacing=10.0):
+    """
+    Isolated Fe octahedra, each with a seventh O atom at 2.6 Angstrom along +x+y.
+
+    """
+    a_octa, c_octa = generate.ideal_octa(bond=2.0)
+    extra = np.array([1.0, 1.0, 0.0]) / np.sqrt(2) * 2.6
+
+    a_full, c_full = [], []
+    for n in range(n_sites):
+        center = np.array([n * spacing, 0.0, 0.0])
+        a_full += a_octa + ["O"]
+        c_full += list(c_octa + center) + [center + extra]
+
+    return a_full, np.array(c_full)
+
+
+def exchange(c_full, site, slot, bond=2.8, entering=1.8):
+    """
+    Move ligand slot of site out and the extra O atom of site in.
+
+    """
+    c_full = c_full.copy()
+    center = c_full[8 * site]
+    ligand = 8 * site + 1 + slot
+    c_full[ligand] = center + (c_full[ligand] - center) / 2.0 * bond
+    c_full[8 * site + 7] = center + (c_full[8 * site + 7] - center) / 2.6 * entering
+
+    return c_full
+
+
+def test_follows_ligands_without_exchange():
+    a_full, c_full = make_sites(3)
+    tracker = trajectory.LigandTracker(a_full)
+
+    c_octas, l_index = tracker.update(c_full)
+    assert c_octas.shape == (3, 7, 3)
+
+    # Bond lengths cross but the shell does not change
+    moved = c_full.copy()
+    moved[1] += [0.1, 0, 0]
+    moved[2] -= [0, 0.1, 0]
+    _, l_moved = tracker.update(moved)
+
+    np.testing.assert_array_equal(l_moved, l_index)
+    assert tracker.events == []
+
+
+def test_several_sites_exchange_in_same_frame():
+    a_full, c_full = make_sites(3)
+    tracker = trajectory.LigandTracker(a_full)
+    _, l_index = tracker.update(c_full)
+
+    changed = exchange(exchange(c_full, 0, 0), 2, 1)
+    c_octas, l_new = tracker.update(changed)
+
+    events = sorted(tracker.events)
+    assert [(e.frame, e.metal, e.old, e.new) for e in events] == [(1, 0, 1, 7), (1, 16, 18, 23)]
+
+    for e in events:
+        site = e.metal // 8
+        np.testing.assert_array_equal(np.delete(l_new[site], e.slot), np.delete(l_index[site], e.slot))
+        assert l_new[site, e.slot] == e.new
+    np.testing.assert_array_equal(l_new[1], l_index[1])
+
+    # Coordinates follow the fixed ligand order
+    np.testing.assert_allclose(c_octas[:, 1:], changed[l_new])